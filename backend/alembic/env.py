@@ -0,0 +1,68 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool, text
+
+from app.core.config import settings
+from app.db.base import Base
+
+# --- CRUCIAL: Import ALL models so that autogenerate knows about every table ---
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+
+config = context.config
+
+# Only configure logging when run from the command line; when migrations are applied
+# on API startup the server's own logging configuration is left alone.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Arbitrary key for the PostgreSQL advisory lock that serializes concurrent upgrades,
+# e.g. when several API workers start at the same time.
+MIGRATION_LOCK_KEY = 7_240_915
+
+def get_url() -> str:
+    url = settings.SQLALCHEMY_DATABASE_URI
+    if url is None:
+        raise RuntimeError("SQLALCHEMY_DATABASE_URI must be set in settings")
+    return url
+
+def run_migrations_offline() -> None:
+    """
+    Emit the migration SQL to stdout instead of running it against a database.
+    """
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """
+    Run the migrations against the configured database.
+    """
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Released automatically when the connection closes.
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite cannot ALTER most things in place; batch mode recreates the table.
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+        connection.commit()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,113 @@
+"""baseline schema
+
+The schema as it was created by Base.metadata.create_all() before migrations were
+introduced. Databases created that way should be stamped with this revision
+(`alembic stamp 0001`) and then upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("role", sa.Enum("ADMIN", "TEACHER", "STUDENT", name="userrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_full_name", "users", ["full_name"])
+
+    op.create_table(
+        "instruments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False, comment="The common name"),
+        sa.Column("model", sa.String(), nullable=True, comment="The specific model"),
+        sa.Column("location", sa.String(), nullable=False, comment="The physical location"),
+        sa.Column("description", sa.String(), nullable=True, comment="Detailed capabilities"),
+        sa.Column("is_active", sa.Boolean(), nullable=False, comment="Is available for booking"),
+        sa.Column(
+            "status",
+            sa.Enum("AVAILABLE", "IN_USE", "MAINTENANCE", name="instrumentstatus"),
+            nullable=False,
+        ),
+        sa.Column("ip_address", sa.String(), nullable=True, comment="Static IP address"),
+        sa.Column("mac_address", sa.String(), nullable=True, comment="MAC address"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("ip_address"),
+        sa.UniqueConstraint("mac_address"),
+    )
+    op.create_index("ix_instruments_id", "instruments", ["id"])
+    op.create_index("ix_instruments_name", "instruments", ["name"])
+    op.create_index("ix_instruments_model", "instruments", ["model"])
+
+    op.create_table(
+        "user_instrument_permission",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("instrument_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["instrument_id"], ["instruments.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "instrument_id"),
+    )
+
+    op.create_table(
+        "reservations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "CONFIRMED", "CANCELLED", "COMPLETED", "MISSED", name="reservationstatus"),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("instrument_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["instrument_id"], ["instruments.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_reservations_id", "reservations", ["id"])
+
+    op.create_table(
+        "access_logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("details", sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_access_logs_id", "access_logs", ["id"])
+    op.create_index("ix_access_logs_action", "access_logs", ["action"])
+
+
+def downgrade() -> None:
+    op.drop_table("access_logs")
+    op.drop_table("reservations")
+    op.drop_table("user_instrument_permission")
+    op.drop_table("instruments")
+    op.drop_table("users")
+    if op.get_bind().dialect.name == "postgresql":
+        sa.Enum(name="reservationstatus").drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name="instrumentstatus").drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""reject overlapping active reservations
+
+Adds the PostgreSQL exclusion constraint that keeps pending and confirmed reservations
+of one instrument from overlapping. Other databases rely on locking in the CRUD layer.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # This fails if overlapping active reservations already exist; resolve them first.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(
+        "ALTER TABLE reservations ADD CONSTRAINT reservations_no_overlap "
+        "EXCLUDE USING gist (instrument_id WITH =, tsrange(start_time, end_time) WITH &&) "
+        "WHERE (status IN ('PENDING', 'CONFIRMED'))"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_constraint("reservations_no_overlap", "reservations")
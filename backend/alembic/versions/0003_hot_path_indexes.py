@@ -0,0 +1,56 @@
+"""composite and partial indexes for the reservation and log hot paths
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text("status IN ('PENDING', 'CONFIRMED')")
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_reservations_instrument_status_start",
+        "reservations",
+        ["instrument_id", "status", "start_time"],
+    )
+    op.create_index(
+        "ix_reservations_user_start",
+        "reservations",
+        ["user_id", sa.text("start_time DESC")],
+    )
+    op.create_index(
+        "ix_reservations_active_instrument_start",
+        "reservations",
+        ["instrument_id", "start_time", "end_time"],
+        postgresql_where=ACTIVE,
+        sqlite_where=ACTIVE,
+    )
+    op.create_index("ix_access_logs_timestamp", "access_logs", ["timestamp"])
+    op.create_index("ix_access_logs_user_timestamp", "access_logs", ["user_id", "timestamp"])
+    op.create_index(
+        "ix_user_instrument_permission_instrument",
+        "user_instrument_permission",
+        ["instrument_id", "user_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_instrument_permission_instrument", "user_instrument_permission")
+    op.drop_index("ix_access_logs_user_timestamp", "access_logs")
+    op.drop_index("ix_access_logs_timestamp", "access_logs")
+    op.drop_index("ix_reservations_active_instrument_start", "reservations")
+    op.drop_index("ix_reservations_user_start", "reservations")
+    op.drop_index("ix_reservations_instrument_status_start", "reservations")
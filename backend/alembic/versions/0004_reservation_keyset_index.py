@@ -0,0 +1,25 @@
+"""index for keyset pagination over all reservations
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_reservations_start_id", "reservations", ["start_time", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reservations_start_id", "reservations")
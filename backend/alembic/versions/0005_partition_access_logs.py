@@ -0,0 +1,118 @@
+"""partition the access log by month
+
+On PostgreSQL, `access_logs` becomes a table partitioned by range of `timestamp`,
+with one partition per month (access_logs_y2026m10 holds October 2026) and a default
+partition for anything outside them. Old months can then be archived and dropped
+whole (scripts/archive_access_logs.py) instead of deleted row by row. The primary key
+becomes (id, timestamp), since a partitioned table's keys must include the partition
+column; ids still come from the same sequence.
+
+On every database, the action index is replaced by one on (action, timestamp) for
+audit queries filtering both.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created past the current one; the application keeps creating them from then on.
+MONTHS_AHEAD = 2
+
+LOG_COLUMNS = "id, timestamp, user_id, action, details"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index("ix_access_logs_action", "access_logs")
+        op.create_index("ix_access_logs_action_timestamp", "access_logs", ["action", "timestamp"])
+        return
+
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_unpartitioned")
+    for index in ("ix_access_logs_id", "ix_access_logs_action", "ix_access_logs_timestamp",
+                  "ix_access_logs_user_timestamp"):
+        op.execute(f"DROP INDEX {index}")
+    op.execute("ALTER TABLE access_logs_unpartitioned RENAME CONSTRAINT access_logs_pkey TO access_logs_unpartitioned_pkey")
+    op.execute("""
+        CREATE TABLE access_logs (
+            id INTEGER NOT NULL DEFAULT nextval('access_logs_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER REFERENCES users (id),
+            action VARCHAR NOT NULL,
+            details JSON,
+            CONSTRAINT access_logs_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    op.execute("CREATE TABLE access_logs_default PARTITION OF access_logs DEFAULT")
+    # One partition per month from the oldest entry to a few months ahead.
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month timestamp := date_trunc('month', LEAST(
+                (SELECT min(timestamp) FROM access_logs_unpartitioned), now()::timestamp
+            ));
+        BEGIN
+            WHILE month <= date_trunc('month', now()::timestamp) + interval '{MONTHS_AHEAD} months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF access_logs FOR VALUES FROM (%L) TO (%L)',
+                    'access_logs_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+                    month, month + interval '1 month'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute(
+        f"INSERT INTO access_logs ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM access_logs_unpartitioned"
+    )
+    op.execute("DROP TABLE access_logs_unpartitioned")
+
+    # Indexes on the parent are created on every partition, present and future.
+    op.create_index("ix_access_logs_id", "access_logs", ["id"])
+    op.create_index("ix_access_logs_timestamp", "access_logs", ["timestamp"])
+    op.create_index("ix_access_logs_user_timestamp", "access_logs", ["user_id", "timestamp"])
+    op.create_index("ix_access_logs_action_timestamp", "access_logs", ["action", "timestamp"])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index("ix_access_logs_action_timestamp", "access_logs")
+        op.create_index("ix_access_logs_action", "access_logs", ["action"])
+        return
+
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_partitioned")
+    op.execute("ALTER TABLE access_logs_partitioned RENAME CONSTRAINT access_logs_pkey TO access_logs_partitioned_pkey")
+    for index in ("ix_access_logs_id", "ix_access_logs_timestamp", "ix_access_logs_user_timestamp",
+                  "ix_access_logs_action_timestamp"):
+        op.execute(f"DROP INDEX {index}")
+    op.execute("""
+        CREATE TABLE access_logs (
+            id INTEGER NOT NULL DEFAULT nextval('access_logs_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER REFERENCES users (id),
+            action VARCHAR NOT NULL,
+            details JSON,
+            CONSTRAINT access_logs_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    op.execute(
+        f"INSERT INTO access_logs ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM access_logs_partitioned"
+    )
+    # Drops every partition with it.
+    op.execute("DROP TABLE access_logs_partitioned")
+    op.create_index("ix_access_logs_id", "access_logs", ["id"])
+    op.create_index("ix_access_logs_action", "access_logs", ["action"])
+    op.create_index("ix_access_logs_timestamp", "access_logs", ["timestamp"])
+    op.create_index("ix_access_logs_user_timestamp", "access_logs", ["user_id", "timestamp"])
@@ -0,0 +1,56 @@
+"""instrument telemetry table and the status reported by instrument PCs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "instrument_telemetry",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("instrument_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("in_use", sa.Boolean(), nullable=True),
+        sa.Column("counters", sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_instrument_telemetry_instrument_timestamp",
+        "instrument_telemetry",
+        ["instrument_id", "timestamp"],
+    )
+    op.create_index(
+        "ix_instrument_telemetry_timestamp",
+        "instrument_telemetry",
+        ["timestamp"],
+        postgresql_using="brin",
+    )
+    with op.batch_alter_table("instruments") as batch_op:
+        batch_op.add_column(sa.Column(
+            "reported_in_use", sa.Boolean(), nullable=True,
+            comment="In use as reported by the instrument PC",
+        ))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("instruments") as batch_op:
+        batch_op.drop_column("reported_in_use")
+    op.drop_index("ix_instrument_telemetry_timestamp", "instrument_telemetry")
+    op.drop_index("ix_instrument_telemetry_instrument_timestamp", "instrument_telemetry")
+    op.drop_table("instrument_telemetry")
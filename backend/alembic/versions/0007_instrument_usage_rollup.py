@@ -0,0 +1,57 @@
+"""daily and weekly instrument utilization rollups
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00.000000
+
+Fill the table with `python -m scripts.rebuild_usage_rollups` after upgrading.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _measures() -> list:
+    return [
+        sa.Column("booked_seconds", sa.Integer(), nullable=False),
+        sa.Column("reservations", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+        sa.Column("missed", sa.Integer(), nullable=False),
+        sa.Column("cancelled", sa.Integer(), nullable=False),
+        *[sa.Column(f"hour_{hour:02d}_seconds", sa.Integer(), nullable=False) for hour in range(24)],
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "instrument_usage_daily",
+        sa.Column("instrument_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("week", sa.Date(), nullable=False),
+        *_measures(),
+        sa.PrimaryKeyConstraint("instrument_id", "day"),
+    )
+    op.create_index("ix_instrument_usage_daily_day", "instrument_usage_daily", ["day"])
+    op.create_table(
+        "instrument_usage_weekly",
+        sa.Column("instrument_id", sa.Integer(), nullable=False),
+        sa.Column("week", sa.Date(), nullable=False),
+        *_measures(),
+        sa.PrimaryKeyConstraint("instrument_id", "week"),
+    )
+    op.create_index("ix_instrument_usage_weekly_week", "instrument_usage_weekly", ["week"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_instrument_usage_weekly_week", "instrument_usage_weekly")
+    op.drop_table("instrument_usage_weekly")
+    op.drop_index("ix_instrument_usage_daily_day", "instrument_usage_daily")
+    op.drop_table("instrument_usage_daily")
@@ -0,0 +1,31 @@
+"""cover the weekly utilization query with an index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00.000000
+
+The utilization query reads a range of weeks of every instrument; with all of its
+columns in the index it is answered by an index-only scan.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOTALS = ["week", "instrument_id", "booked_seconds", "reservations", "completed", "missed", "cancelled"]
+
+
+def upgrade() -> None:
+    op.drop_index("ix_instrument_usage_weekly_week", "instrument_usage_weekly")
+    op.create_index("ix_instrument_usage_weekly_week_totals", "instrument_usage_weekly", TOTALS)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_instrument_usage_weekly_week_totals", "instrument_usage_weekly")
+    op.create_index("ix_instrument_usage_weekly_week", "instrument_usage_weekly", ["week"])
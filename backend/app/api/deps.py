@@ -1,11 +1,26 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence, Tuple
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.security import decode_access_token
+from app.core.security import decode_access_token_claims
 from app.crud import crud_user
-from app.db.session import get_db
+from app.crud.availability import naive_utc
+from app.crud.crud_user import Principal
+from app.crud.pagination import TotalMode
+from app.db.session import AsyncReadSessionLocal, AsyncSessionLocal, get_async_db, get_db
 from app.models.user import User
 
 # This is a "dependency" that can be injected into our path operations.
@@ -16,20 +31,17 @@ from app.models.user import User
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/users/login/access-token"
 )
+# The same, for endpoints that serve anonymous clients as well.
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/users/login/access-token", auto_error=False
+)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+async def _token_principal(db: AsyncSession, token: str) -> Principal:
     """
-    Dependency to get the current user from a token.
-    1. Decodes the token to get the user ID.
-    2. Fetches the user from the database.
-    3. Checks if the user exists and is active.
-    4. Returns the user object.
-    Raises HTTPException if any step fails.
+    Resolve a token to the authorization data of its user, via the principal cache.
     """
     try:
-        user_id_str = decode_access_token(token)
+        user_id_str, token_id = decode_access_token_claims(token)
         # It's possible the user_id is not a valid integer
         user_id = int(user_id_str)
     except (ValueError, TypeError):
@@ -38,25 +50,63 @@ def get_current_user(
             detail="Invalid user ID in token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    user = crud_user.get(db, id=user_id)
-    
+
+    principal = await crud_user.aget_principal(db, user_id=user_id, token_id=token_id)
+
     # First, check if the user exists at all.
-    if not user:
+    if not principal:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
     # Then, perform the explicit check on the is_active attribute.
-    if user.is_active is False:
+    if principal.is_active is False:
         raise HTTPException(status_code=400, detail="Inactive user")
-        
+
+    return principal
+
+async def get_current_principal(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> Principal:
+    """
+    Dependency to get the id and role of the current user from a token.
+    Use it instead of get_current_user when the endpoint doesn't need the full user;
+    it is answered from the principal cache without touching the users table.
+    Raises HTTPException if the token is invalid or the user is missing or inactive.
+    """
+    return await _token_principal(db, token)
+
+async def get_optional_principal(
+    db: AsyncSession = Depends(get_async_db), token: Optional[str] = Depends(optional_oauth2)
+) -> Optional[Principal]:
+    """
+    Dependency to get the id and role of the current user, or None without a token.
+    A token that is sent must be valid, as with get_current_principal.
+    """
+    if token is None:
+        return None
+    return await _token_principal(db, token)
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> User:
+    """
+    Dependency to get the current user from a token.
+    1. Decodes the token and checks the user exists and is active (cached).
+    2. Fetches the full user from the database.
+    3. Returns the user object.
+    Raises HTTPException if any step fails.
+    """
+    principal = await _token_principal(db, token)
+    user = await crud_user.aget(db, principal.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     return user
 
 def get_current_active_admin(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
     """
     Dependency to get the current user and check if they are an admin.
-    - Reuses the 'get_current_user' dependency.
+    - Reuses the 'get_current_principal' dependency.
     - Checks the 'role' attribute of the user.
     - Raises HTTPException 403 if the user is not an admin.
     """
@@ -65,3 +115,206 @@ def get_current_active_admin(
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+
+# --- Read Routing ---
+# GET endpoints read through get_read_db, which uses the read replica when one is
+# configured. Write endpoints depend on pin_reads_to_primary, so that the writer's
+# reads go to the primary for READ_YOUR_WRITES_SECONDS and a fresh booking shows up
+# on /my-reservations even if the replica lags behind. The pin is kept per user in
+# this worker, and in a signed cookie so that the other workers honour it as well.
+# It is only set by ReadYourWritesMiddleware once the write has succeeded.
+PRIMARY_READS_COOKIE = "primary_reads_until"
+
+_primary_pins = TTLCache(
+    maxsize=10000, ttl=settings.READ_YOUR_WRITES_SECONDS, name="read_your_writes"
+)
+
+def pin_reads_to_primary(
+    request: Request, current_user: Principal = Depends(get_current_principal)
+) -> None:
+    """
+    Dependency for write endpoints: read from the primary for a while afterwards,
+    if the write succeeds.
+    """
+    request.state.primary_reads_user_id = current_user.id
+
+def _cookie_signature(until: str) -> str:
+    return hmac.new(
+        settings.SECRET_KEY.encode(), f"{PRIMARY_READS_COOKIE}:{until}".encode(), hashlib.sha256
+    ).hexdigest()
+
+def _pin_cookie(user_id: int) -> str:
+    """
+    Pin the user's reads to the primary and return the Set-Cookie header that pins
+    them on the other workers.
+    """
+    _primary_pins.set(user_id, True)
+    until = f"{time.time() + settings.READ_YOUR_WRITES_SECONDS:.3f}"
+    cookie = Response()
+    cookie.set_cookie(
+        PRIMARY_READS_COOKIE,
+        f"{until}.{_cookie_signature(until)}",
+        max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1,
+        httponly=True,
+        samesite="lax",
+    )
+    return cookie.headers["set-cookie"]
+
+def _cookie_pinned(value: str) -> bool:
+    until, _, signature = value.rpartition(".")
+    if not hmac.compare_digest(signature, _cookie_signature(until)):
+        return False
+    try:
+        return float(until) > time.time()
+    except ValueError:
+        return False
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the read pin of pin_reads_to_primary on successful responses only, so that
+    a rejected or failed write doesn't move the user's reads to the primary.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_pinned(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                user_id = scope.get("state", {}).get("primary_reads_user_id")
+                if user_id is not None:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("set-cookie", _pin_cookie(user_id))
+            await send(message)
+
+        await self.app(scope, receive, send_pinned)
+
+def _reads_pinned(request: Request) -> bool:
+    if _cookie_pinned(request.cookies.get(PRIMARY_READS_COOKIE, "")):
+        return True
+    # The token is only used to find the pin here; it is verified by the auth dependencies.
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user_id, _ = decode_access_token_claims(token)
+        return _primary_pins.get(int(user_id), False)
+    except (HTTPException, ValueError, TypeError):
+        return False
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    FastAPI dependency that provides an async session for reading: on the read
+    replica if one is configured, unless the user has written recently.
+    """
+    if AsyncReadSessionLocal is AsyncSessionLocal or _reads_pinned(request):
+        session_factory = AsyncSessionLocal
+    else:
+        session_factory = AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+def read_routing_stats() -> dict:
+    return {
+        "replica_configured": AsyncReadSessionLocal is not AsyncSessionLocal,
+        "pinned_users": _primary_pins.stats(),
+    }
+
+
+# --- Field Projection ---
+# List endpoints accept `fields=` and `expand=` query parameters. When either is
+# present the endpoint answers with a compact summary that only contains the
+# requested columns, instead of the full nested ORM graph.
+class Projection:
+    """
+    The parsed `fields=` / `expand=` parameters of a list request.
+    """
+    def __init__(self, fields: List[str], expand: List[str]):
+        self.fields = fields
+        self.expand = expand
+
+    def response(self, payload: Any) -> JSONResponse:
+        """
+        Serialize a summary payload, leaving out every field that was not requested.
+        """
+        return JSONResponse(content=jsonable_encoder(payload, exclude_unset=True))
+
+def _split_csv(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+def get_projection(
+    summary_fields: Sequence[str], expandable: Sequence[str]
+) -> Callable[..., Optional[Projection]]:
+    """
+    Build a dependency that parses `fields=` / `expand=` against the allowed names.
+    The dependency returns None when neither parameter is given, so endpoints keep
+    their existing full response by default.
+    """
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated summary fields: {', '.join(summary_fields)}"
+        ),
+        expand: Optional[str] = Query(
+            None, description=f"Comma-separated related objects to nest: {', '.join(expandable)}"
+        ),
+    ) -> Optional[Projection]:
+        if fields is None and expand is None:
+            return None
+
+        requested_fields = _split_csv(fields) or list(summary_fields)
+        requested_expand = _split_csv(expand)
+
+        unknown = [f for f in requested_fields if f not in summary_fields]
+        unknown += [e for e in requested_expand if e not in expandable]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields requested: {', '.join(unknown)}"
+            )
+
+        # The id is always returned so that clients can address the rows.
+        if "id" not in requested_fields:
+            requested_fields.insert(0, "id")
+        return Projection(
+            fields=list(dict.fromkeys(requested_fields)),
+            expand=list(dict.fromkeys(requested_expand)),
+        )
+
+    return dependency
+
+
+# --- Pagination ---
+def resolve_total_mode(total: Optional[TotalMode], cursor: Optional[str]) -> TotalMode:
+    """
+    Offset pages count exactly by default, as they always have; keyset (cursor) pages
+    reuse a cached count unless the client asks for something else.
+    """
+    if total is not None:
+        return total
+    return TotalMode.CACHED if cursor else TotalMode.EXACT
+
+
+# --- Time Windows ---
+def get_time_window(
+    start: Optional[datetime] = Query(None, alias="from", description="Defaults to now"),
+    end: Optional[datetime] = Query(None, alias="to", description="Defaults to a week after `from`"),
+) -> Tuple[datetime, datetime]:
+    """
+    Parse the `from` / `to` parameters of an availability query, in UTC.
+    """
+    start = naive_utc(start or datetime.now(timezone.utc))
+    end = naive_utc(end) if end else start + timedelta(days=7)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    if end - start > timedelta(days=settings.AVAILABILITY_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"A window may span at most {settings.AVAILABILITY_MAX_WINDOW_DAYS} days",
+        )
+    return start, end
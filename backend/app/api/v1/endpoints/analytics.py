@@ -0,0 +1,91 @@
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Awaitable, Callable, Dict, Hashable, Literal, Optional, Tuple, Type
+
+from app.core.config import settings
+from app.crud import analytics
+from app.schemas.analytics import PeakHours, UtilizationSeries
+from app.api import deps
+
+router = APIRouter()
+
+def get_day_range(
+    start: Optional[date] = Query(None, alias="from", description="Defaults to 30 days before `to`"),
+    end: Optional[date] = Query(None, alias="to", description="Exclusive; defaults to tomorrow (UTC)"),
+) -> Tuple[date, date]:
+    """
+    Parse the `from` / `to` days of an analytics query.
+    """
+    end = end or datetime.utcnow().date() + timedelta(days=1)
+    start = start or end - timedelta(days=30)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    if (end - start).days > settings.ANALYTICS_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A range may span at most {settings.ANALYTICS_MAX_DAYS} days",
+        )
+    return start, end
+
+async def _cached_response(
+    key: Hashable, schema: Type[BaseModel], load: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Response:
+    """
+    Answer from the analytics cache; on a miss, `load` runs the query and the result
+    is serialized once for every later request of the same rollup version.
+    """
+    version = await analytics.results_cache.aversion()
+    body = analytics.results_cache.get(key, version) if version is not None else None
+    if body is None:
+        body = schema.model_validate(await load()).model_dump_json().encode()
+        if version is not None:
+            analytics.results_cache.set(key, version, body)
+    return Response(content=body, media_type="application/json")
+
+@router.get(
+    "/utilization",
+    response_model=UtilizationSeries,
+    dependencies=[Depends(deps.get_current_active_admin)],
+)
+async def read_utilization(
+    db: AsyncSession = Depends(deps.get_read_db),
+    days: Tuple[date, date] = Depends(get_day_range),
+    granularity: Literal["day", "week"] = "week",
+    instrument_id: Optional[int] = None,
+) -> Any:
+    """
+    Booked hours, utilization and no-show rate per instrument and day or week
+    (Admins only), optionally of one instrument. Periods without reservations are
+    left out. Days are UTC days; weeks start on Monday.
+    """
+    start, end = days
+    return await _cached_response(
+        ("utilization", start, end, granularity, instrument_id),
+        UtilizationSeries,
+        lambda: analytics.aget_utilization(
+            db, start=start, end=end, granularity=granularity, instrument_id=instrument_id
+        ),
+    )
+
+@router.get(
+    "/peak-hours",
+    response_model=PeakHours,
+    dependencies=[Depends(deps.get_current_active_admin)],
+)
+async def read_peak_hours(
+    db: AsyncSession = Depends(deps.get_read_db),
+    days: Tuple[date, date] = Depends(get_day_range),
+    instrument_id: Optional[int] = None,
+) -> Any:
+    """
+    Booked hours per hour of the day (UTC) and the busiest hours, per instrument and
+    overall (Admins only), optionally of one instrument.
+    """
+    start, end = days
+    return await _cached_response(
+        ("peak-hours", start, end, instrument_id),
+        PeakHours,
+        lambda: analytics.aget_peak_hours(db, start=start, end=end, instrument_id=instrument_id),
+    )
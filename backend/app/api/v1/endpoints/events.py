@@ -0,0 +1,63 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+
+from app.core import events
+from app.core.config import settings
+from app.api import deps
+
+router = APIRouter()
+
+def _format(event: events.Event) -> str:
+    data = json.dumps(event, default=str, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    instrument_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    current_user: Optional[deps.Principal] = Depends(deps.get_optional_principal),
+) -> StreamingResponse:
+    """
+    Stream reservation and instrument changes as server-sent events, each with the
+    event type (e.g. `reservation.created`, `instrument.updated`) and a JSON object
+    holding the ids and status of what changed.
+    - `instrument_id`: the changes of one instrument and its reservations (Public).
+    - `user_id`: the changes of one user's reservations (that user or Admins).
+    - neither: every change (Admins only).
+    Events are notifications: after (re)connecting, fetch the current state, then
+    apply or refetch on each event. The stream ends if the client reads too slowly.
+    """
+    is_admin = current_user is not None and current_user.role == "admin"
+    if user_id is not None:
+        if current_user is None:
+            raise HTTPException(status_code=401, detail="Not authenticated",
+                                headers={"WWW-Authenticate": "Bearer"})
+        if current_user.id != user_id and not is_admin:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+    elif instrument_id is None and not is_admin:
+        raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    if not events.broker.running:
+        raise HTTPException(status_code=503, detail="Change events are not available")
+
+    async def body() -> AsyncIterator[str]:
+        subscription = events.broker.subscribe(instrument_id=instrument_id, user_id=user_id)
+        # Tell EventSource clients how soon to reconnect after the stream ends.
+        yield f"retry: {int(settings.EVENTS_KEEPALIVE_SECONDS * 1000)}\n\n"
+        stream = events.broker.listen(subscription, keepalive=settings.EVENTS_KEEPALIVE_SECONDS)
+        try:
+            async for event in stream:
+                if await request.is_disconnected():
+                    break
+                # A comment line keeps proxies from closing an idle stream.
+                yield ": keepalive\n\n" if event is None else _format(event)
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
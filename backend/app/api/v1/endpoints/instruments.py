@@ -1,80 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Awaitable, Callable, Hashable, List, Optional, Tuple
 
-from app.crud import crud_instrument
-from app.schemas.instrument import Instrument, InstrumentCreate, InstrumentUpdate
+from app.crud import availability, crud_instrument
+from app.models.instrument import InstrumentStatus
+from app.models.user import UserRole
+from app.schemas.instrument import (
+    FreeSlot, Instrument, InstrumentAvailability, InstrumentCreate, InstrumentUpdate, TimeWindow,
+)
 from app.api import deps
-from app.models.user import User
 
 router = APIRouter()
 
-@router.post("/", response_model=Instrument, status_code=201)
-def create_instrument(
+_instrument_list = TypeAdapter(List[Instrument])
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def _catalog_response(
+    request: Request, key: Hashable, load: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """
+    Answer a catalog read from the catalog cache, with an ETag. A client that sends
+    the current ETag in If-None-Match gets 304 without any database or serialization
+    work; on a miss, `load` reads and serializes the response body.
+    """
+    version = await crud_instrument.acatalog_version()
+    entry = crud_instrument.get_cached_catalog(key, version)
+    if entry is None:
+        entry = crud_instrument.catalog_entry(await load())
+        crud_instrument.set_cached_catalog(key, version, entry)
+
+    # no-cache: clients may keep the response but must revalidate it before use.
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@router.post(
+    "/",
+    response_model=Instrument,
+    status_code=201,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def create_instrument(
     instrument_in: InstrumentCreate,
-    db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ):
     """
     Create a new instrument in the system (Admins only).
     """
-    instrument = crud_instrument.create(db=db, obj_in=instrument_in)
+    instrument = await crud_instrument.acreate(db=db, obj_in=instrument_in)
     return instrument
 
+# Catalog reads use the primary: misses are rare, and a cache filled from a lagging
+# replica right after a change would keep serving the old catalog under the new version.
 @router.get("/", response_model=List[Instrument])
-def read_instruments(
-    db: Session = Depends(deps.get_db),
+async def read_instruments(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
     skip: int = 0,
     limit: int = 100,
 ):
     """
     Retrieve a list of all instruments.
+    Cached until the catalog changes; send If-None-Match to revalidate.
+    """
+    async def load() -> bytes:
+        instruments = await crud_instrument.aget_multi(db, skip=skip, limit=limit)
+        return _instrument_list.dump_json(_instrument_list.validate_python(instruments))
+
+    return await _catalog_response(request, ("list", skip, limit), load)
+
+@router.get("/free-slots", response_model=List[FreeSlot])
+async def find_free_slots(
+    duration: int = Query(..., ge=1, le=24 * 60, description="Booking length in minutes"),
+    window: Tuple[datetime, datetime] = Depends(deps.get_time_window),
+    model: Optional[str] = None,
+    location: Optional[str] = None,
+    status: Optional[InstrumentStatus] = None,
+    is_active: Optional[bool] = True,
+    granularity: int = Query(15, ge=1, le=1440, description="Slot length in minutes"),
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+):
+    """
+    Find instruments the current user may book that are free for `duration`
+    minutes between `from` and `to`, filtered by model, location, status and
+    whether they are active. Returns (instrument, start) candidates, earliest first.
     """
-    instruments = crud_instrument.get_multi(db, skip=skip, limit=limit)
-    return instruments
+    start, end = window
+    instruments = {
+        row.id: row
+        for row in await crud_instrument.asearch_bookable(
+            db,
+            user_id=None if current_user.role == UserRole.ADMIN else current_user.id,
+            model=model,
+            location=location,
+            status=status,
+            is_active=is_active,
+        )
+    }
+    timelines = await availability.aget_timelines(db, instrument_ids=list(instruments))
+    candidates = availability.find_free_slots(
+        timelines,
+        start=availability.to_seconds(start),
+        end=availability.to_seconds(end),
+        duration=duration * 60,
+        granularity=granularity * 60,
+        limit=limit,
+    )
+    return [
+        FreeSlot(
+            instrument_id=candidate.instrument_id,
+            instrument_name=instruments[candidate.instrument_id].name,
+            location=instruments[candidate.instrument_id].location,
+            start=availability.to_datetime(candidate.start),
+            end=availability.to_datetime(candidate.start + duration * 60),
+            free_until=availability.to_datetime(candidate.free_until),
+        )
+        for candidate in candidates
+    ]
 
 @router.get("/{instrument_id}", response_model=Instrument)
-def read_instrument(
+async def read_instrument(
     instrument_id: int,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
 ):
     """
     Get a specific instrument by its ID.
+    Cached until the catalog changes; send If-None-Match to revalidate.
     """
-    instrument = crud_instrument.get(db=db, id=instrument_id)
-    if not instrument:
+    async def load() -> bytes:
+        instrument = await crud_instrument.aget(db=db, id=instrument_id)
+        if not instrument:
+            raise HTTPException(status_code=404, detail="Instrument not found")
+        return Instrument.model_validate(instrument).model_dump_json().encode()
+
+    return await _catalog_response(request, ("item", instrument_id), load)
+
+@router.get("/{instrument_id}/availability", response_model=InstrumentAvailability)
+async def read_instrument_availability(
+    instrument_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    window: Tuple[datetime, datetime] = Depends(deps.get_time_window),
+    granularity: int = Query(15, ge=1, le=1440, description="Slot length in minutes"),
+):
+    """
+    Busy intervals and free windows of an instrument between `from` and `to`.
+    Answered from the instrument's in-memory timeline; only its first load reads
+    the database (the primary, so that it holds every booking made so far).
+    """
+    start, end = window
+    timelines = await availability.aget_timelines(db, instrument_ids=[instrument_id])
+    if instrument_id not in timelines:
         raise HTTPException(status_code=404, detail="Instrument not found")
-    return instrument
 
-@router.put("/{instrument_id}", response_model=Instrument)
-def update_instrument(
+    start_seconds, end_seconds = availability.to_seconds(start), availability.to_seconds(end)
+    busy, free = availability.availability(
+        timelines[instrument_id].busy(start_seconds, end_seconds),
+        start_seconds,
+        end_seconds,
+        granularity * 60,
+    )
+    return InstrumentAvailability(
+        instrument_id=instrument_id,
+        start=start,
+        end=end,
+        granularity_minutes=granularity,
+        busy=_time_windows(busy),
+        free=_time_windows(free),
+    )
+
+def _time_windows(intervals: List[Tuple[int, int]]) -> List[TimeWindow]:
+    return [
+        TimeWindow(start=availability.to_datetime(start), end=availability.to_datetime(end))
+        for start, end in intervals
+    ]
+
+@router.put(
+    "/{instrument_id}",
+    response_model=Instrument,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def update_instrument(
     instrument_id: int,
     instrument_in: InstrumentUpdate,
-    db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ):
     """
     Update an existing instrument (Admins only).
     """
-    instrument = crud_instrument.get(db=db, id=instrument_id)
+    instrument = await crud_instrument.aget(db=db, id=instrument_id)
     if not instrument:
         raise HTTPException(status_code=404, detail="Instrument not found")
     
-    instrument = crud_instrument.update(db=db, db_obj=instrument, obj_in=instrument_in)
+    instrument = await crud_instrument.aupdate(db=db, db_obj=instrument, obj_in=instrument_in)
     return instrument
 
-@router.delete("/{instrument_id}", response_model=Instrument)
-def delete_instrument(
+@router.delete(
+    "/{instrument_id}",
+    response_model=Instrument,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def delete_instrument(
     instrument_id: int,
-    db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ):
     """
     Delete an instrument from the system (Admins only).
     """
-    instrument = crud_instrument.get(db=db, id=instrument_id)
+    instrument = await crud_instrument.aget(db=db, id=instrument_id)
     if not instrument:
         raise HTTPException(status_code=404, detail="Instrument not found")
         
-    deleted_instrument = crud_instrument.remove(db=db, id=instrument_id)
+    deleted_instrument = await crud_instrument.aremove(db=db, id=instrument_id)
     return deleted_instrument
\ No newline at end of file
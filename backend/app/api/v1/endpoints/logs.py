@@ -0,0 +1,40 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Any, Optional
+
+from app.crud import crud_log
+from app.crud.availability import naive_utc
+from app.schemas.log import AccessLogList
+from app.api import deps
+
+router = APIRouter()
+
+@router.get(
+    "/",
+    response_model=AccessLogList,
+    dependencies=[Depends(deps.get_current_active_admin)],
+)
+def read_access_logs(
+    db: Session = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+) -> Any:
+    """
+    Retrieve access log entries, newest first (Admins only), optionally only those of
+    `user_id`, of `action` and/or from the time range [`from`, `to`).
+    Pass the returned `next_cursor` as `cursor`, with the same filters, to fetch older
+    entries. Months past the retention period are only in the archive files.
+    """
+    start = naive_utc(start) if start else None
+    end = naive_utc(end) if end else None
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    page = crud_log.get_multi(
+        db, cursor=cursor, limit=limit, user_id=user_id, action=action, start=start, end=end
+    )
+    return {"data": page.data, "next_cursor": page.next_cursor}
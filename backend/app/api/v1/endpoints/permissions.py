@@ -3,38 +3,84 @@ from sqlalchemy.orm import Session
 from typing import Any
 
 from app.crud import crud_permission
-from app.schemas.permission import PermissionGrant
-from app.schemas.user import User
+from app.core.config import settings
+from app.schemas.permission import PermissionGrant, PermissionBulkChange, PermissionChange, PermissionDiff
 from app.api import deps
 
 router = APIRouter()
 
-@router.post("/grant", response_model=User)
+@router.post(
+    "/grant",
+    response_model=PermissionChange,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
 def grant_permission_to_user(
     permission_in: PermissionGrant,
     db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ) -> Any:
     """
     Grant a user permission for an instrument using their ID (Admins only).
     """
     # --- CRUCIAL FIX: Call the correct function name ---
-    updated_user = crud_permission.grant_permission(db=db, permission_in=permission_in)
-    if not updated_user:
+    changed = crud_permission.grant_permission(db=db, permission_in=permission_in)
+    if changed is None:
         raise HTTPException(status_code=404, detail="User or Instrument not found")
-    return updated_user
+    return PermissionChange(**permission_in.model_dump(), changed=changed)
 
-@router.post("/revoke", response_model=User)
+@router.post(
+    "/revoke",
+    response_model=PermissionChange,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
 def revoke_permission_from_user(
     permission_in: PermissionGrant,
     db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ) -> Any:
     """
     Revoke a user's permission for an instrument using their ID (Admins only).
     """
     # --- CRUCIAL FIX: Call the correct function name ---
-    updated_user = crud_permission.revoke_permission(db=db, permission_in=permission_in)
-    if not updated_user:
+    changed = crud_permission.revoke_permission(db=db, permission_in=permission_in)
+    if changed is None:
         raise HTTPException(status_code=404, detail="User or Instrument not found")
-    return updated_user
\ No newline at end of file
+    return PermissionChange(**permission_in.model_dump(), changed=changed)
+
+@router.post(
+    "/bulk",
+    response_model=PermissionDiff,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+def change_permissions_bulk(
+    change_in: PermissionBulkChange,
+    db: Session = Depends(deps.get_db),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
+) -> Any:
+    """
+    Grant or revoke every listed user x instrument pair, or replace each listed user's
+    instruments with exactly the listed ones, in one transaction (Admins only).
+    Returns only the pairs that actually changed.
+    """
+    pairs = len(set(change_in.user_ids)) * len(set(change_in.instrument_ids))
+    if pairs > settings.PERMISSION_BULK_MAX_PAIRS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A bulk change may cover at most {settings.PERMISSION_BULK_MAX_PAIRS} pairs.",
+        )
+
+    missing_users, missing_instruments = crud_permission.find_missing_ids(
+        db, user_ids=change_in.user_ids, instrument_ids=change_in.instrument_ids
+    )
+    if missing_users or missing_instruments:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "Some users or instruments were not found; nothing was changed.",
+                "user_ids": missing_users,
+                "instrument_ids": missing_instruments,
+            },
+        )
+
+    granted, revoked = crud_permission.apply_bulk_change(db, change_in=change_in)
+    return {"granted": granted, "revoked": revoked}
@@ -1,40 +1,57 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Any, Optional
 
-from app.models.user import User, UserRole
+from app.models.user import UserRole
 from app.crud import crud_reservation
-from app.schemas.reservation import Reservation, ReservationCreate, ReservationUpdate, ReservationList
+from app.core.config import settings
+from app.schemas.reservation import (
+    Reservation, ReservationCreate, ReservationUpdate, ReservationList,
+    ReservationSummary, ReservationSummaryList, ReservationBatchCreate, ReservationBatchResult,
+)
 from app.api import deps
+from app.crud.pagination import TotalMode
 from app.models.reservation import ReservationStatus
-from app.crud import crud_reservation, crud_instrument
+from app.crud import crud_reservation, crud_instrument, crud_permission
 from app.crud import crud_reservation, crud_instrument, crud_log
 
 router = APIRouter()
 
-@router.post("/", response_model=Reservation, status_code=201)
-def create_reservation(
+reservation_projection = deps.get_projection(
+    crud_reservation.SUMMARY_FIELDS, crud_reservation.SUMMARY_EXPANSIONS
+)
+
+@router.post(
+    "/",
+    response_model=Reservation,
+    status_code=201,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def create_reservation(
     reservation_in: ReservationCreate,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Create a new reservation for the current logged-in user.
     """
     # --- 1. NEW: Authorization Check ---
     # First, check if the instrument exists
-    instrument = crud_instrument.get(db, id=reservation_in.instrument_id)
+    instrument = await crud_instrument.aget(db, id=reservation_in.instrument_id)
     if not instrument:
         raise HTTPException(status_code=404, detail="Instrument not found")
         
-    # Then, check if the current user is in the instrument's list of authorized users
-    if current_user not in instrument.authorized_users and current_user.role != UserRole.ADMIN:
-        # Allow admins to bypass this check
+    # Then, check if the current user is authorized for the instrument
+    # Allow admins to bypass this check
+    if current_user.role != UserRole.ADMIN and not await crud_permission.ahas_permission(
+        db, user_id=current_user.id, instrument_id=instrument.id
+    ):
         raise HTTPException(status_code=403, detail="User not authorized for this instrument")
 
     # --- 2. Existing Logic ---
     # Check if the requested timeslot is available
-    is_available = crud_reservation.is_timeslot_available(
+    is_available = await crud_reservation.ais_timeslot_available(
         db,
         instrument_id=reservation_in.instrument_id,
         start_time=reservation_in.start_time,
@@ -46,12 +63,20 @@ def create_reservation(
             detail="The requested timeslot is already booked.",
         )
     
-    reservation = crud_reservation.create_with_owner(
-        db=db, obj_in=reservation_in, user_id=current_user.id
-    )
+    # The check above is a cheap early exit; the insert itself is what guarantees
+    # that two concurrent bookings cannot both take the slot.
+    try:
+        reservation = await crud_reservation.acreate_with_owner(
+            db=db, obj_in=reservation_in, user_id=current_user.id
+        )
+    except crud_reservation.ReservationConflictError:
+        raise HTTPException(
+            status_code=409,
+            detail="The requested timeslot is already booked.",
+        )
 
     # log the reservation creation event
-    crud_log.create_log_entry(
+    await crud_log.acreate_log_entry(
         db=db,
         user_id=current_user.id,
         action="RESERVATION_CREATED",
@@ -66,49 +91,159 @@ def create_reservation(
     return reservation
 
 
+@router.post(
+    "/batch",
+    response_model=ReservationBatchResult,
+    status_code=201,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def create_reservation_batch(
+    batch_in: ReservationBatchCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Book many slots of one instrument at once: explicit `slots`, and/or a first slot
+    (`start_time`/`end_time`) repeated by a `recurrence` rule, such as weekly for a
+    semester. With `atomic` (the default) either every occurrence is booked or none
+    is, and a conflict answers 409 with the per-occurrence results; otherwise the
+    free occurrences are booked and the conflicting ones reported, or 409 answered if
+    none was free.
+    """
+    try:
+        occurrences = crud_reservation.expand_occurrences(
+            batch_in, limit=settings.RESERVATION_BATCH_MAX_OCCURRENCES
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    instrument = await crud_instrument.aget(db, id=batch_in.instrument_id)
+    if not instrument:
+        raise HTTPException(status_code=404, detail="Instrument not found")
+    if current_user.role != UserRole.ADMIN and not await crud_permission.ahas_permission(
+        db, user_id=current_user.id, instrument_id=instrument.id
+    ):
+        raise HTTPException(status_code=403, detail="User not authorized for this instrument")
+
+    try:
+        results = await crud_reservation.acreate_batch_with_owner(
+            db,
+            instrument_id=instrument.id,
+            occurrences=occurrences,
+            user_id=current_user.id,
+            atomic=batch_in.atomic,
+        )
+    except crud_reservation.ReservationConflictError:
+        raise HTTPException(
+            status_code=409,
+            detail="A requested timeslot was booked meanwhile; nothing was booked.",
+        )
+
+    created = [item for item in results if item.status == "created"]
+    result = ReservationBatchResult(
+        created=len(created),
+        conflicts=sum(item.status == "conflict" for item in results),
+        results=results,
+    )
+    # Also when a non-atomic batch found no free occurrence at all.
+    if result.conflicts and (batch_in.atomic or not created):
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Some occurrences conflict with existing bookings; nothing was booked.",
+                **jsonable_encoder(result),
+            },
+        )
+
+    if created:
+        # One entry for the whole batch
+        await crud_log.acreate_log_entry(
+            db=db,
+            user_id=current_user.id,
+            action="RESERVATION_BATCH_CREATED",
+            details={
+                "instrument_id": instrument.id,
+                "count": len(created),
+                "reservation_ids": [item.reservation_id for item in created],
+                "first_start_time": created[0].start_time.isoformat(),
+                "last_start_time": created[-1].start_time.isoformat(),
+                "recurrence": batch_in.recurrence.dict() if batch_in.recurrence else None,
+            },
+        )
+    return result
+
+
 @router.get("/instrument/{instrument_id}", response_model=List[Reservation])
-def read_reservations_for_instrument(
+async def read_reservations_for_instrument(
     instrument_id: int,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_read_db),
     skip: int = 0,
     limit: int = 100,
+    projection: Optional[deps.Projection] = Depends(reservation_projection),
 ):
     """
     Retrieve all active reservations for a specific instrument. (Public endpoint)
+    Pass `fields=` / `expand=` to receive compact summaries instead of full objects.
     """
-    reservations = crud_reservation.get_multi_by_instrument(
+    if projection:
+        rows = await crud_reservation.aget_multi_by_instrument_summary(
+            db,
+            instrument_id=instrument_id,
+            fields=projection.fields,
+            expand=projection.expand,
+            skip=skip,
+            limit=limit,
+        )
+        return projection.response([ReservationSummary(**row) for row in rows])
+
+    reservations = await crud_reservation.aget_multi_by_instrument(
         db, instrument_id=instrument_id, skip=skip, limit=limit
     )
     return reservations
 
 
 @router.get("/my-reservations", response_model=ReservationList)
-def read_my_reservations(
-    db: Session = Depends(deps.get_db),
+async def read_my_reservations(
+    db: AsyncSession = Depends(deps.get_read_db),
     skip: int = 0, # <-- Add skip and limit
     limit: int = 10,
-    current_user: User = Depends(deps.get_current_user),
+    cursor: Optional[str] = None,
+    total: Optional[TotalMode] = None,
+    current_user: deps.Principal = Depends(deps.get_current_principal),
 ):
-    reservations, total = crud_reservation.get_multi_by_user( # <-- 2. Unpack
-        db, user_id=current_user.id, skip=skip, limit=limit
+    """
+    Retrieve the current user's reservations, newest first.
+    Page with `skip`/`limit`, or pass the returned `next_cursor` as `cursor`.
+    """
+    page = await crud_reservation.aget_multi_by_user(
+        db,
+        user_id=current_user.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        total_mode=deps.resolve_total_mode(total, cursor),
     )
-    return {"data": reservations, "total": total} # <-- 3. Return the dict
+    return {"data": page.data, "total": page.total, "next_cursor": page.next_cursor}
 
 
-@router.delete("/{reservation_id}", response_model=Reservation)
-def cancel_reservation(
+@router.delete(
+    "/{reservation_id}",
+    response_model=Reservation,
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def cancel_reservation(
     # Path parameters (without defaults) come first.
     reservation_id: int,
     # Dependency injections (with defaults) follow.
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.Principal = Depends(deps.get_current_principal),
 ):
     """
     Cancel a reservation.
     - A regular user can only cancel their own reservations.
     - An admin can cancel any user's reservation.
     """
-    reservation = crud_reservation.get(db=db, id=reservation_id)
+    reservation = await crud_reservation.aget(db=db, id=reservation_id)
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
@@ -123,12 +258,12 @@ def cancel_reservation(
         )
 
     update_schema = ReservationUpdate(status=ReservationStatus.CANCELLED)
-    cancelled_reservation = crud_reservation.update(
+    cancelled_reservation = await crud_reservation.aupdate(
         db=db, db_obj=reservation, obj_in=update_schema
     )
 
     # log the reservation cancellation event
-    crud_log.create_log_entry(
+    await crud_log.acreate_log_entry(
         db=db,
         user_id=current_user.id,
         action="RESERVATION_CANCELLED",
@@ -146,18 +281,47 @@ def cancel_reservation(
     tags=["Reservations"],
     dependencies=[Depends(deps.get_current_active_admin)],
 )
-def read_all_reservations(
-    db: Session = Depends(deps.get_db),
+async def read_all_reservations(
+    db: AsyncSession = Depends(deps.get_read_db),
     user_id: Optional[int] = None,
     instrument_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-    current_admin: User = Depends(deps.get_current_active_admin), # Use the dependency, not just in dependencies
+    cursor: Optional[str] = None,
+    total: Optional[TotalMode] = None,
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin), # Use the dependency, not just in dependencies
+    projection: Optional[deps.Projection] = Depends(reservation_projection),
 ) -> Any:
     """
     Retrieve all reservations in the system (Admins only), with optional filters.
+    Pass `fields=` / `expand=` to receive compact summaries instead of full objects.
+    Page with `skip`/`limit`, or pass the returned `next_cursor` as `cursor`; deep
+    pages should use the cursor. `total` selects how the total is computed.
     """
-    reservations, total = crud_reservation.get_multi_all(
-        db, user_id=user_id, instrument_id=instrument_id, skip=skip, limit=limit
+    total_mode = deps.resolve_total_mode(total, cursor)
+    if projection:
+        page = await crud_reservation.aget_multi_all_summary(
+            db,
+            fields=projection.fields,
+            expand=projection.expand,
+            user_id=user_id,
+            instrument_id=instrument_id,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode,
+        )
+        return projection.response(
+            ReservationSummaryList(data=page.data, total=page.total, next_cursor=page.next_cursor)
+        )
+
+    page = await crud_reservation.aget_multi_all(
+        db,
+        user_id=user_id,
+        instrument_id=instrument_id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        total_mode=total_mode,
     )
-    return {"data": reservations, "total": total}
\ No newline at end of file
+    return {"data": page.data, "total": page.total, "next_cursor": page.next_cursor}
\ No newline at end of file
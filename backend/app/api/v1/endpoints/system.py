@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from typing import Any
+
+from app.api import deps
+from app.core import events
+from app.crud import (
+    analytics, availability, crud_instrument, crud_log, crud_permission, crud_telemetry, crud_user,
+    lifecycle,
+)
+from app.crud.pagination import count_cache_stats
+from app.db.session import async_pool_stats, replica_pool_stats, sync_pool_stats
+
+router = APIRouter()
+
+@router.get("/metrics", dependencies=[Depends(deps.get_current_active_admin)])
+def read_metrics() -> Any:
+    """
+    In-process runtime metrics of this API worker (Admins only).
+    """
+    return {
+        "access_log_writer": crud_log.log_writer.stats(),
+        "count_cache": count_cache_stats(),
+        "principal_cache": crud_user.principal_cache_stats(),
+        "permission_cache": crud_permission.permission_cache_stats(),
+        "catalog_cache": crud_instrument.catalog_cache_stats(),
+        "availability_timelines": availability.timeline_cache_stats(),
+        "lifecycle_scheduler": lifecycle.scheduler.stats(),
+        "usage_rollups": analytics.analytics_stats(),
+        "events": events.broker.stats(),
+        "telemetry": crud_telemetry.telemetry_stats(),
+        "db_pool": {
+            "sync": sync_pool_stats.snapshot(),
+            "async": async_pool_stats.snapshot(),
+            "replica": replica_pool_stats.snapshot() if replica_pool_stats else None,
+        },
+        "read_routing": deps.read_routing_stats(),
+    }
@@ -0,0 +1,45 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.core.config import settings
+from app.crud import crud_telemetry
+from app.schemas.telemetry import TelemetryReport
+from app.api import deps
+
+router = APIRouter()
+
+def verify_telemetry_key(x_telemetry_key: Optional[str] = Header(None)) -> None:
+    """
+    Dependency checking the key shared by the instrument PCs, which report while
+    nobody is logged in and so have no user token.
+    """
+    if not settings.TELEMETRY_INGEST_KEY:
+        raise HTTPException(status_code=503, detail="Telemetry ingestion is not configured")
+    if x_telemetry_key is None or not hmac.compare_digest(
+        x_telemetry_key.encode(), settings.TELEMETRY_INGEST_KEY.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid telemetry key")
+
+@router.post("/", status_code=204, dependencies=[Depends(verify_telemetry_key)])
+async def ingest_telemetry(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    report_in: TelemetryReport,
+) -> Response:
+    """
+    Report a heartbeat, or the start or end of a session, of an instrument PC
+    (X-Telemetry-Key header). The instrument's status follows what its PC reports
+    until the PC falls silent for TELEMETRY_OFFLINE_SECONDS.
+    """
+    found = await crud_telemetry.aingest(
+        db,
+        instrument_id=report_in.instrument_id,
+        kind=report_in.kind,
+        in_use=report_in.in_use,
+        counters=report_in.counters,
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="Instrument not found")
+    return Response(status_code=204)
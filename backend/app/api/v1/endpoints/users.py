@@ -1,57 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import codecs
+import csv
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Any, List, Optional
-from pydantic import EmailStr # <-- Added import
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from pydantic import EmailStr, ValidationError # <-- Added import
+from starlette.concurrency import run_in_threadpool
 
 from app.crud import crud_user
-from app.schemas.user import User, UserCreate, UserBulkCreate, UserUpdate, UserList
+from app.core.config import settings
+from app.models.user import UserRole
+from app.schemas.user import (
+    User, UserCreate, UserBulkCreate, UserUpdate, UserList, UserSummaryList,
+    UserImportRow, UserImportResult,
+)
 from app.schemas.token import Token
 from app.api import deps
+from app.crud.pagination import TotalMode
 from app.core.security import create_access_token
 from app.crud import crud_user, crud_log
 
 router = APIRouter()
 
+user_projection = deps.get_projection(crud_user.SUMMARY_FIELDS, crud_user.SUMMARY_EXPANSIONS)
+
+# Upload formats accepted by /bulk-import.
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
 @router.get(
     "/",
     response_model=UserList, 
     tags=["Users"],
     dependencies=[Depends(deps.get_current_active_admin)],
 )
-def read_users(
-    db: Session = Depends(deps.get_db),
+async def read_users(
+    db: AsyncSession = Depends(deps.get_read_db),
     search: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    total: Optional[TotalMode] = None,
     # current_admin is implicitly used by the dependency, so we can remove it from the signature
     # for cleaner code, though keeping it is also fine.
+    projection: Optional[deps.Projection] = Depends(user_projection),
 ) -> Any:
     """
     Retrieve all users, with optional search filter (Admins only).
+    Pass `fields=` / `expand=` to receive compact summaries instead of full objects.
+    Page with `skip`/`limit`, or pass the returned `next_cursor` as `cursor`.
     """
-    users, total = crud_user.get_multi(db, search=search, skip=skip, limit=limit)
-    return {"data": users, "total": total}
+    total_mode = deps.resolve_total_mode(total, cursor)
+    if projection:
+        page = await crud_user.aget_multi_summary(
+            db,
+            fields=projection.fields,
+            expand=projection.expand,
+            search=search,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode,
+        )
+        return projection.response(
+            UserSummaryList(data=page.data, total=page.total, next_cursor=page.next_cursor)
+        )
+
+    page = await crud_user.aget_multi(
+        db, search=search, skip=skip, limit=limit, cursor=cursor, total_mode=total_mode
+    )
+    return {"data": page.data, "total": page.total, "next_cursor": page.next_cursor}
 @router.post(
     "/",
     response_model=User, 
     tags=["Users"],
-    dependencies=[Depends(deps.get_current_active_admin)] # If there is no admin, comment out this line to create the first admin
+    dependencies=[Depends(deps.get_current_active_admin), Depends(deps.pin_reads_to_primary)] # If there is no admin, comment out this line to create the first admin
 )
-def create_user(
+async def create_user(
     user_in: UserCreate,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
 ) -> Any:
     """
     Create new user (Admins only).
     """
-    user = crud_user.get_user_by_email(db, email=user_in.email)
+    user = await crud_user.aget_user_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-    user = crud_user.create_user(db=db, obj_in=user_in)
+    user = await crud_user.acreate_user(db=db, obj_in=user_in)
     return user
 
 @router.post(
@@ -60,14 +104,15 @@ def create_user(
     tags=["Users"],
     description="获取访问令牌以进行后续请求。**注意**: 'username' 字段需要填写您注册时使用的 **电子邮件地址**。"
 )
-def login_for_access_token(
-    db: Session = Depends(deps.get_db), 
+async def login_for_access_token(
+    db: AsyncSession = Depends(deps.get_async_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
+    The password check runs in the hashing pool, so logins don't hold request threads.
     """
-    user = crud_user.authenticate_user(
+    user = await crud_user.aauthenticate_user(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -79,7 +124,7 @@ def login_for_access_token(
     access_token = create_access_token(subject=user.id)
 
     # Log the successful login event.
-    crud_log.create_log_entry(
+    await crud_log.acreate_log_entry(
         db=db,
         user_id=user.id,
         action="USER_LOGIN",
@@ -93,9 +138,9 @@ def login_for_access_token(
 
 @router.post(
     "/bulk-create",
-    response_model=List[User],
+    response_model=UserImportResult,
     tags=["Users"],
-    dependencies=[Depends(deps.get_current_active_admin)],
+    dependencies=[Depends(deps.get_current_active_admin), Depends(deps.pin_reads_to_primary)],
 )
 def create_users_bulk(
     users_in: UserBulkCreate,
@@ -103,37 +148,161 @@ def create_users_bulk(
 ) -> Any:
     """
     Create multiple new users in the system (Admins only).
+    All new users are inserted in one transaction; existing emails are skipped.
+    Returns the outcome of every row.
+    """
+    _check_import_size(len(users_in.users))
+    rows = list(enumerate(users_in.users, start=1))
+    return _import_result(_import_users(db, rows), [])
+
+@router.post(
+    "/bulk-import",
+    response_model=UserImportResult,
+    tags=["Users"],
+    dependencies=[Depends(deps.get_current_active_admin), Depends(deps.pin_reads_to_primary)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                content_type: {"schema": {"type": "string"}}
+                for content_type in IMPORT_CONTENT_TYPES
+            },
+        }
+    },
+)
+async def import_users_stream(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Import users from a streamed CSV (with a header row) or NDJSON upload (Admins only).
+    Columns/keys are those of user creation; a missing role defaults to student.
+    Rows are parsed as they arrive. Invalid rows are reported and skipped, the rest
+    are inserted in one transaction. Returns the outcome of every row.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in IMPORT_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Upload one of: {', '.join(IMPORT_CONTENT_TYPES)}",
+        )
+    rows, invalid = await _read_import_rows(request, IMPORT_CONTENT_TYPES[content_type])
+    results = await run_in_threadpool(_import_users, db, rows)
+    return _import_result(results, invalid)
+
+# --- Bulk Import Helpers ---
+def _check_import_size(rows: int) -> None:
+    if rows > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"An import may contain at most {settings.USER_IMPORT_MAX_ROWS} rows.",
+        )
+
+def _import_users(db: Session, rows: List[Tuple[int, UserCreate]]) -> List[UserImportRow]:
+    try:
+        return crud_user.import_users(db, rows=rows)
+    except IntegrityError:
+        # Another request registered one of the emails between our check and the insert.
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Some of these users were created concurrently; nothing was imported, please retry.",
+        )
+
+def _import_result(results: List[UserImportRow], invalid: List[UserImportRow]) -> UserImportResult:
+    rows = sorted(results + invalid, key=lambda result: result.row)
+    created = sum(1 for result in rows if result.status == "created")
+    return UserImportResult(created=created, skipped=len(rows) - created, results=rows)
+
+async def _stream_lines(request: Request) -> AsyncIterator[str]:
+    """
+    Yield the lines of the request body as they arrive, without reading it whole.
     """
-    created_users = crud_user.create_multi(db=db, users_in=users_in.users)
-    return created_users
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in request.stream():
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="The upload must be UTF-8 encoded.")
+    if pending:
+        yield pending.rstrip("\r")
+
+async def _read_import_rows(
+    request: Request, fmt: str
+) -> Tuple[List[Tuple[int, UserCreate]], List[UserImportRow]]:
+    """
+    Parse an upload into numbered valid rows and results for the invalid ones.
+    CSV fields may not contain line breaks.
+    """
+    rows: List[Tuple[int, UserCreate]] = []
+    invalid: List[UserImportRow] = []
+    header: Optional[List[str]] = None
+    row = 0
+    async for line in _stream_lines(request):
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            record: Any = {name: value for name, value in zip(header, values) if value != ""}
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+        row += 1
+        _check_import_size(row)
+        if not isinstance(record, dict):
+            invalid.append(UserImportRow(row=row, status="invalid", detail="Not a JSON object"))
+            continue
+        record.setdefault("role", UserRole.STUDENT)
+        try:
+            rows.append((row, UserCreate(**record)))
+        except ValidationError as exc:
+            detail = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in exc.errors()
+            )
+            email = record.get("email")
+            invalid.append(UserImportRow(
+                row=row, email=email if isinstance(email, str) else None,
+                status="invalid", detail=detail,
+            ))
+    return rows, invalid
 
 # --- NEW FUNCTION ADDED HERE ---
 @router.delete(
     "/{user_email}",
     response_model=User,
     tags=["Users"],
-    dependencies=[Depends(deps.get_current_active_admin)],
+    dependencies=[Depends(deps.get_current_active_admin), Depends(deps.pin_reads_to_primary)],
 )
-def delete_user(
+async def delete_user(
     user_email: EmailStr,
-    db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ) -> Any:
     """
     Delete a user by their email (Admins only).
     """
-    user_to_delete = crud_user.get_user_by_email(db, email=user_email)
+    user_to_delete = await crud_user.aget_user_by_email(db, email=user_email)
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="User with this email not found")
     
     if user_to_delete.id == current_admin.id:
         raise HTTPException(status_code=400, detail="Admins cannot delete their own account")
         
-    deleted_user = crud_user.remove(db=db, id=user_to_delete.id)
+    deleted_user = await crud_user.aremove(db=db, id=user_to_delete.id)
     return deleted_user
 \
 @router.get("/me", response_model=User, tags=["Users"])
-def read_user_me(
+async def read_user_me(
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
@@ -141,19 +310,24 @@ def read_user_me(
     """
     return current_user
 
-@router.put("/{user_email}", response_model=User, tags=["Users"])
-def update_user(
+@router.put(
+    "/{user_email}",
+    response_model=User,
+    tags=["Users"],
+    dependencies=[Depends(deps.pin_reads_to_primary)],
+)
+async def update_user(
     user_email: EmailStr,
     user_in: UserUpdate,
-    db: Session = Depends(deps.get_db),
-    current_admin: User = Depends(deps.get_current_active_admin),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_admin: deps.Principal = Depends(deps.get_current_active_admin),
 ) -> Any:
     """
     Update a user's information (Admins only).
     """
-    user_to_update = crud_user.get_user_by_email(db, email=user_email)
+    user_to_update = await crud_user.aget_user_by_email(db, email=user_email)
     if not user_to_update:
         raise HTTPException(status_code=404, detail="User not found")
         
-    updated_user = crud_user.update(db=db, db_obj=user_to_update, obj_in=user_in)
+    updated_user = await crud_user.aupdate(db=db, db_obj=user_to_update, obj_in=user_in)
     return updated_user
\ No newline at end of file
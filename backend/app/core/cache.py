@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """
+    A small thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Hits and misses are counted so that callers can report how well a cache works.
+    """
+    def __init__(self, *, maxsize: int, ttl: float, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for `key`, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+        The factory runs outside the lock, so concurrent misses may both compute it.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drop every entry whose key matches `predicate`. Returns how many were dropped.
+        """
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class RedisVersion:
+    """
+    A version counter kept in Redis, so that every worker sees a bump made by any of
+    them. Needs the optional `redis` package.
+    """
+    def __init__(self, url: str, *, key: str):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as exc:
+            raise RuntimeError("A shared cache version needs the 'redis' package") from exc
+        self.key = key
+        self._client = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+
+    def bump(self) -> None:
+        self._client.incr(self.key)
+
+    async def abump(self) -> None:
+        await self._async_client.incr(self.key)
+
+    async def aget(self) -> int:
+        return int(await self._async_client.get(self.key) or 0)
+
+class VersionedCache:
+    """
+    Cached values that are all invalidated at once by bumping a version number.
+    Callers read the version first and pass it to `get` and `set`, so a value computed
+    while the version changed is never served under the new one.
+
+    Without a shared version, a bump only reaches this worker; entries also expire
+    after `ttl` seconds, which bounds how long changes made through other workers
+    stay invisible here.
+    """
+    def __init__(self, *, maxsize: int, ttl: float, name: str, shared: Optional[RedisVersion] = None):
+        self.name = name
+        self.shared = shared
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl, name=name)
+        self._version = 0
+        self._lock = threading.Lock()
+
+    async def aversion(self) -> Optional[int]:
+        """
+        The current version, or None if the shared version can't be read right now,
+        in which case the caller should bypass the cache.
+        """
+        if self.shared is None:
+            return self._version
+        try:
+            return await self.shared.aget()
+        except Exception:
+            logger.warning("%s cache: shared version unavailable", self.name, exc_info=True)
+            return None
+
+    def get(self, key: Hashable, version: int) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, version: int, value: Any) -> None:
+        self._entries.set(key, (version, value))
+
+    def _bump_local(self) -> None:
+        with self._lock:
+            self._version += 1
+        self._entries.clear()
+
+    def bump(self) -> None:
+        self._bump_local()
+        if self.shared is not None:
+            self.shared.bump()
+
+    async def abump(self) -> None:
+        self._bump_local()
+        if self.shared is not None:
+            await self.shared.abump()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._entries.stats(), "version": self._version, "shared": self.shared is not None}
@@ -12,11 +12,170 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    # URI for the async engine used by the API. Derived from SQLALCHEMY_DATABASE_URI
+    # (asyncpg / aiosqlite driver) when not set.
+    ASYNC_SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    # Optional read replica for the GET endpoints, in the same form as
+    # SQLALCHEMY_DATABASE_URI. Without it every request uses the primary.
+    READ_REPLICA_DATABASE_URI: Optional[str] = None
+    # After a write, that user's reads go to the primary for this long, so they see
+    # their own changes while the replica catches up. Keep it above the replica lag.
+    READ_YOUR_WRITES_SECONDS: float = 5
+    # Apply pending Alembic migrations when the API starts. Disable this when
+    # migrations are run as a separate deployment step (`alembic upgrade head`).
+    RUN_MIGRATIONS_ON_STARTUP: bool = True
+
+    # --- Connection Pool Settings ---
+    # Applied to the sync and the async engine alike; each API worker process holds up
+    # to DB_POOL_SIZE + DB_MAX_OVERFLOW connections per engine.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # How long a checkout waits for a free connection before failing.
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    # Connections older than this are replaced at checkout. -1 keeps them forever.
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Test each connection with a round-trip at checkout. Off by default: it costs one
+    # round-trip per request, and DB_POOL_RECYCLE_SECONDS already retires connections
+    # before idle timeouts drop them. Without it, a connection the server dropped (a
+    # restart or failover) fails one request and is then discarded with the rest of the
+    # pool. Turn it on where connections are cut often, e.g. behind a proxy that closes
+    # idle ones sooner than the recycle age.
+    DB_POOL_PRE_PING: bool = False
+    # Checkouts slower than this are logged as a warning.
+    DB_POOL_SLOW_CHECKOUT_MS: float = 100
+    # Connect through PgBouncer in transaction pooling mode: no prepared statements are
+    # kept between transactions. Run migrations against the server directly then, since
+    # their advisory lock is held per session.
+    DB_PGBOUNCER: bool = False
+
+    # --- Pagination Settings ---
+    # How long a list total may be reused when a client asks for `total=cached`.
+    COUNT_CACHE_TTL_SECONDS: int = 10
+
+    # --- Instrument Catalog Cache ---
+    # Serialized catalog responses are kept until the catalog changes, and at most
+    # this long, which bounds staleness after changes made through other workers when
+    # no shared version is configured.
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    CATALOG_CACHE_SIZE: int = 256
+    # Optional Redis URL (needs the `redis` package) holding the catalog version, so a
+    # change through any worker invalidates the cache of every worker at once.
+    CATALOG_CACHE_REDIS_URL: Optional[str] = None
+
+    # --- Availability Settings ---
+    # In-memory instrument timelines are reloaded after this long, which is how long
+    # bookings made through other workers can take to show up in availability.
+    AVAILABILITY_TIMELINE_TTL_SECONDS: int = 30
+    AVAILABILITY_TIMELINE_CACHE_SIZE: int = 4096
+    # Longest time window one availability query may cover.
+    AVAILABILITY_MAX_WINDOW_DAYS: int = 92
+    # Most occurrences one batch or recurring booking may create.
+    RESERVATION_BATCH_MAX_OCCURRENCES: int = 200
+
+    # --- Reservation Lifecycle Settings ---
+    # Move ended reservations to completed or missed, and mark instruments in use while
+    # a reservation runs, from a background thread of each worker.
+    RESERVATION_LIFECYCLE_ENABLED: bool = True
+    # How far ahead upcoming starts and ends are loaded, and how often they are re-read:
+    # the longest a booking made through another worker can wait to be scheduled here.
+    RESERVATION_LIFECYCLE_HORIZON_SECONDS: int = 120
+    # Most reservations ended by one UPDATE.
+    RESERVATION_LIFECYCLE_BATCH_SIZE: int = 500
+
+    # --- Change Event Settings ---
+    # Broker fanning change events out to GET /events/stream subscribers: "postgres"
+    # (LISTEN/NOTIFY, reaches every worker) or "memory" (this worker only). Defaults to
+    # "postgres" on PostgreSQL.
+    EVENTS_BACKEND: Optional[str] = None
+    # Database for LISTEN/NOTIFY if not SQLALCHEMY_DATABASE_URI, e.g. the server itself
+    # when the API connects through PgBouncer in transaction pooling mode.
+    EVENTS_DATABASE_URI: Optional[str] = None
+    EVENTS_CHANNEL: str = "dcs_changes"
+    # Events waiting per subscriber; a client that falls further behind is disconnected.
+    EVENTS_QUEUE_SIZE: int = 256
+    # A comment line is sent this often on an idle stream, so proxies keep it open.
+    EVENTS_KEEPALIVE_SECONDS: float = 15
+
+    # --- Analytics Settings ---
+    # Utilization rollups of changed reservations are refreshed this long after the
+    # first change, together with the changes made meanwhile.
+    ANALYTICS_ROLLUP_DELAY_SECONDS: float = 5
+    # Longest range an analytics query may cover.
+    ANALYTICS_MAX_DAYS: int = 731
+    # Busiest hours of the day listed per instrument.
+    ANALYTICS_PEAK_HOURS: int = 3
+    # Analytics responses are cached until the rollups change; refreshes made by other
+    # workers or the rebuild script show after this long at the latest.
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60
+    ANALYTICS_CACHE_SIZE: int = 64
+
+    # --- Telemetry Settings ---
+    # Key the instrument PCs send in the X-Telemetry-Key header; without one, telemetry
+    # ingestion is disabled, and ended reservations can't be told apart as no-shows.
+    TELEMETRY_INGEST_KEY: Optional[str] = None
+    # An instrument PC that sent no heartbeat for this long counts as offline, and its
+    # instrument's status follows its reservations again.
+    TELEMETRY_OFFLINE_SECONDS: float = 60
+    # Heartbeats without counters are stored at most this often per instrument (and
+    # worker). Keep it well below TELEMETRY_OFFLINE_SECONDS.
+    TELEMETRY_HEARTBEAT_SAMPLE_SECONDS: float = 20
+    TELEMETRY_BATCH_SIZE: int = 1000
+    TELEMETRY_FLUSH_INTERVAL_SECONDS: float = 2.0
+    TELEMETRY_QUEUE_SIZE: int = 20000
+
+    # --- Access Log Settings ---
+    # Write access log entries from a background thread in batches instead of
+    # committing each one inside the request.
+    ACCESS_LOG_ASYNC: bool = True
+    ACCESS_LOG_BATCH_SIZE: int = 500
+    ACCESS_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+    # How long a request waits for room in a full queue before writing its entry itself.
+    ACCESS_LOG_ENQUEUE_TIMEOUT_SECONDS: float = 0.05
+    # Months of access log kept in the database; older months are exported to files and
+    # removed by scripts/archive_access_logs.py.
+    ACCESS_LOG_RETENTION_MONTHS: int = 12
+    ACCESS_LOG_ARCHIVE_DIR: str = "log_archive"
+    # Monthly access log partitions (PostgreSQL) kept created ahead of the current month.
+    ACCESS_LOG_PARTITIONS_AHEAD: int = 2
+
+    # --- Background Writer Settings ---
+    # Access log and telemetry batches that fail to write are retried this many times,
+    # BATCH_WRITE_RETRY_BACKOFF_SECONDS apart and doubling, then appended to a file in
+    # BATCH_WRITE_DEAD_LETTER_DIR; scripts/replay_dead_letters.py writes them later.
+    BATCH_WRITE_RETRIES: int = 3
+    BATCH_WRITE_RETRY_BACKOFF_SECONDS: float = 0.5
+    BATCH_WRITE_DEAD_LETTER_DIR: str = "dead_letters"
 
     # --- Security Settings (will be loaded from .env file) ---
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Authorization data (id, role, is_active) of recently seen tokens is kept in
+    # memory for this long. Changes made through this worker invalidate it at once;
+    # other workers pick them up within the TTL.
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    # Set above 0 to keep each user's set of bookable instruments in memory for this
+    # long, instead of checking the permission table on every booking.
+    PERMISSION_CACHE_TTL_SECONDS: int = 0
+    PERMISSION_CACHE_SIZE: int = 10000
+    # Largest user x instrument matrix accepted by one bulk permission change.
+    PERMISSION_BULK_MAX_PAIRS: int = 200000
+
+    # --- Password Hashing Settings ---
+    # Changing the rounds makes existing hashes outdated; they are rehashed on next login.
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # Processes dedicated to bcrypt. 0 hashes in the regular thread pool instead.
+    PASSWORD_HASH_WORKERS: int = 2
+    # Hashing calls that may be queued or running at once; more callers wait their turn.
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Processes used to hash a bulk import. 0 uses one per CPU core.
+    PASSWORD_IMPORT_WORKERS: int = 0
+
+    # --- Bulk Import Settings ---
+    # Largest number of rows accepted by one bulk user import.
+    USER_IMPORT_MAX_ROWS: int = 20000
 
     def model_post_init(self, __context):
         """
@@ -0,0 +1,285 @@
+"""
+Change events for server push.
+
+The CRUD layer publishes a small event after every committed change to a reservation
+or an instrument, and GET /events/stream sends them to subscribed clients as
+server-sent events, so kiosks and dashboards no longer poll for changes.
+
+Events go through a broker:
+- MemoryBroker delivers them to the subscribers of this worker only (one worker,
+  tests).
+- PostgresBroker sends them with NOTIFY and delivers whatever arrives through
+  LISTEN, so the subscribers of every API worker receive the changes made through
+  any of them. LISTEN needs a session of its own: through PgBouncer in transaction
+  pooling mode, point EVENTS_DATABASE_URI at the server directly.
+
+Events are notifications, not a log: a client that reconnects, or whose queue
+overflowed, should refetch what it shows.
+
+In-process caches register with `on_remote_event` to hear about the changes made
+through other workers (see availability.py).
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Event = Dict[str, Any]
+
+# NOTIFY payloads are limited to 8000 bytes.
+MAX_PAYLOAD_BYTES = 7900
+
+class Subscription:
+    """
+    The events one client receives: those of one instrument and/or one user, or all.
+    """
+    def __init__(self, *, instrument_id: Optional[int], user_id: Optional[int], maxsize: int):
+        self.instrument_id = instrument_id
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=maxsize)
+        # Set when events were dropped because the client reads too slowly.
+        self.overflowed = False
+
+    def matches(self, event: Event) -> bool:
+        return (
+            (self.instrument_id is None or event.get("instrument_id") == self.instrument_id)
+            and (self.user_id is None or event.get("user_id") == self.user_id)
+        )
+
+class MemoryBroker:
+    """
+    Fans events out to the subscribers of this process. `publish` may be called from
+    any thread; events are delivered on the event loop the broker was started on.
+    """
+    backend = "memory"
+
+    def __init__(self, *, queue_size: int):
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscriptions: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+        # Tells this worker's events apart from the others' once they come back.
+        self.origin = uuid.uuid4().hex
+        self._remote_listeners: List[Callable[[Event], None]] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0, "overflowed_subscribers": 0}
+
+    # --- Lifecycle ---
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self._loop = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    # --- Publishing ---
+    def publish(self, event: Event) -> None:
+        """
+        Publish an event after the change it describes was committed. Does nothing
+        while the broker isn't running (scripts, background jobs without an API).
+        """
+        loop = self._loop
+        if loop is None:
+            return
+        event = {**event, "at": datetime.utcnow().isoformat()}
+        self._count("published")
+        try:
+            loop.call_soon_threadsafe(self._send, event)
+        except RuntimeError:  # the loop was closed meanwhile
+            pass
+
+    def _send(self, event: Event) -> None:
+        self._deliver(event)
+
+    def _deliver(self, event: Event) -> None:
+        """
+        Queue an event for every matching subscriber; runs on the event loop.
+        """
+        event = {**event, "id": next(self._ids)}
+        for subscription in list(self._subscriptions):
+            if subscription.overflowed or not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+                self._count("delivered")
+            except asyncio.QueueFull:
+                # The client falls behind: end its stream so that it reconnects and refetches.
+                subscription.overflowed = True
+                self._count("overflowed_subscribers")
+
+    # --- Subscribing ---
+    def on_remote_event(self, listener: Callable[[Event], None]) -> None:
+        """
+        Call `listener` on the event loop with every event published through another
+        worker. The memory broker never receives any.
+        """
+        self._remote_listeners.append(listener)
+
+    def _notify_remote_listeners(self, event: Event) -> None:
+        for listener in self._remote_listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Remote event listener failed on %s", event.get("type"))
+
+    def subscribe(self, *, instrument_id: Optional[int] = None, user_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(
+            instrument_id=instrument_id, user_id=user_id, maxsize=self.queue_size
+        )
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    async def listen(self, subscription: Subscription, *, keepalive: float) -> AsyncIterator[Optional[Event]]:
+        """
+        Yield the subscription's events as they arrive, and None every `keepalive`
+        seconds without one. Ends when the subscription overflows.
+        """
+        try:
+            while not subscription.overflowed or not subscription.queue.empty():
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.unsubscribe(subscription)
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "backend": self.backend,
+            "running": self.running,
+            "subscribers": len(self._subscriptions),
+        }
+
+class PostgresBroker(MemoryBroker):
+    """
+    Sends events with NOTIFY on `channel` and delivers those received with LISTEN,
+    through one asyncpg connection per worker that is re-opened when it drops.
+    """
+    backend = "postgres"
+
+    def __init__(self, url: str, *, channel: str, queue_size: int, reconnect_seconds: float = 2.0):
+        super().__init__(queue_size=queue_size)
+        self.url = url
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._outbox: "Optional[asyncio.Queue[Event]]" = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats.update({"notify_failures": 0, "reconnects": 0})
+
+    async def start(self) -> None:
+        await super().start()
+        self._outbox = asyncio.Queue(maxsize=10_000)
+        self._task = asyncio.create_task(self._run(), name="events-listener")
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _send(self, event: Event) -> None:
+        assert self._outbox is not None
+        try:
+            self._outbox.put_nowait({**event, "origin": self.origin})
+        except asyncio.QueueFull:
+            self._count("dropped")
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.url)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _connection: closed.set())
+                await connection.add_listener(self.channel, self._received)
+                # One connection both listens and notifies; asyncpg runs one query at a time.
+                while not closed.is_set():
+                    assert self._outbox is not None
+                    try:
+                        event = await asyncio.wait_for(self._outbox.get(), timeout=self.reconnect_seconds)
+                    except asyncio.TimeoutError:
+                        continue
+                    await self._notify(connection, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Event listener connection failed; reconnecting", exc_info=True)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            self._count("reconnects")
+            await asyncio.sleep(self.reconnect_seconds)
+
+    async def _notify(self, connection: Any, event: Event) -> None:
+        payload = json.dumps(event, default=str, separators=(",", ":"))
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            logger.warning("Dropping %s event: payload too large", event.get("type"))
+            self._count("dropped")
+            return
+        try:
+            await connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception:
+            self._count("notify_failures")
+            raise
+
+    def _received(self, _connection: Any, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed event payload")
+            return
+        if event.pop("origin", None) != self.origin:
+            self._notify_remote_listeners(event)
+        self._deliver(event)
+
+def _create_broker() -> MemoryBroker:
+    backend = settings.EVENTS_BACKEND
+    url = settings.EVENTS_DATABASE_URI or settings.SQLALCHEMY_DATABASE_URI
+    parsed = make_url(url) if url else None
+    if backend is None:
+        backend = "postgres" if parsed is not None and parsed.get_backend_name() == "postgresql" else "memory"
+    if backend == "memory":
+        return MemoryBroker(queue_size=settings.EVENTS_QUEUE_SIZE)
+    if backend != "postgres" or parsed is None:
+        raise RuntimeError(f"Unknown or unconfigured EVENTS_BACKEND: {backend}")
+    # asyncpg takes a plain libpq-style URL.
+    return PostgresBroker(
+        parsed.set(drivername="postgresql").render_as_string(hide_password=False),
+        channel=settings.EVENTS_CHANNEL,
+        queue_size=settings.EVENTS_QUEUE_SIZE,
+    )
+
+# Started and stopped with the application (see main.py).
+broker = _create_broker()
+
+def publish(event: Event) -> None:
+    broker.publish(event)
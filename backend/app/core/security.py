@@ -1,5 +1,9 @@
+import asyncio
+import os
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, List, Union, Optional, Sequence, Tuple, TypeVar
 from jose import jwt
 from passlib.context import CryptContext
 
@@ -7,16 +11,88 @@ from app.core.config import settings
 
 # --- Password Hashing ---
 # We use passlib to handle password hashing. 'bcrypt' is the chosen algorithm.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with older parameters (e.g. fewer rounds) are upgraded on the next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a plain password against its hashed version."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password. If it matches but the stored hash uses outdated parameters,
+    also returns a fresh hash that should replace it; otherwise the second value is None.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
     return pwd_context.hash(password)
 
+def get_password_hashes(passwords: Sequence[str]) -> List[str]:
+    """
+    Hashes many passwords in parallel across cores, for bulk imports.
+    Uses its own short-lived pool so that an import doesn't queue up logins.
+    """
+    workers = min(settings.PASSWORD_IMPORT_WORKERS or os.cpu_count() or 1, len(passwords))
+    if workers <= 1:
+        return [get_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(get_password_hash, passwords, chunksize=chunksize))
+
+
+# --- Password Hashing Pool ---
+# bcrypt costs ~250 ms of CPU per call by design. The async endpoints hand it to a
+# dedicated process pool instead of a request thread, so a login storm is limited to
+# PASSWORD_HASH_WORKERS cores and the rest of the API keeps its threads.
+T = TypeVar("T")
+
+_hash_pool: Optional[Executor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+def _get_hash_pool() -> Optional[Executor]:
+    global _hash_pool
+    if _hash_pool is None and settings.PASSWORD_HASH_WORKERS > 0:
+        _hash_pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_pool
+
+async def _run_hashing(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a hashing function in the pool. At most PASSWORD_HASH_MAX_PENDING calls are
+    queued or running at once; further callers wait here without holding a worker.
+    """
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+    async with _hash_slots:
+        pool = _get_hash_pool()
+        if pool is None:
+            # PASSWORD_HASH_WORKERS=0 hashes in the default thread pool instead.
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+async def averify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Async version of verify_and_update_password, run in the hashing pool."""
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
+
+async def aget_password_hash(password: str) -> str:
+    """Async version of get_password_hash, run in the hashing pool."""
+    return await _run_hashing(get_password_hash, password)
+
+def shutdown_hash_pool() -> None:
+    """Stops the hashing processes; called when the application shuts down."""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
+
 
 # --- JWT Token Handling ---
 def create_access_token(
@@ -35,7 +111,8 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # The unique token id ("jti") lets the principal cache tell tokens apart.
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -49,6 +126,15 @@ def decode_access_token(token: str) -> str:
     Decodes a JWT access token and returns its subject (user ID).
     Raises HTTPException if the token is invalid or expired.
     """
+    subject, _ = decode_access_token_claims(token)
+    return subject
+
+def decode_access_token_claims(token: str) -> Tuple[str, Optional[str]]:
+    """
+    Decodes a JWT access token and returns its subject (user ID) and token id.
+    The token id is None for tokens issued before tokens carried one.
+    Raises HTTPException if the token is invalid or expired.
+    """
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -67,7 +153,8 @@ def decode_access_token(token: str) -> str:
         
         # If it exists, we can now safely return it as a string.
         # Pydantic and SQLAlchemy can handle the string representation of the user ID.
-        return str(sub)
+        jti: Any = payload.get("jti")
+        return str(sub), (str(jti) if jti is not None else None)
 
     except JWTError:
         # This catches errors like invalid signature, token has expired, etc.
@@ -0,0 +1,455 @@
+"""
+Utilization analytics.
+
+Reservations are rolled up into instrument_usage_daily (see app/models/usage.py):
+booked seconds per UTC day and hour of the day, and reservation counts by outcome;
+instrument_usage_weekly holds the sums of each week. The analytics endpoints
+aggregate those rows instead of the reservations: for a year of 300 instruments,
+some 16,000 weekly rows rather than hundreds of thousands of reservations.
+
+Rollups are computed with NumPy over column arrays: `usage_rows` splits every
+reservation into its hours at once with np.repeat, and sums them per instrument and
+day with np.bincount. They are kept up to date incrementally: a change to a
+reservation marks its instrument's days dirty, and a RollupMaintainer thread
+recomputes the dirty days from the reservations a few seconds later, so a burst of
+changes costs one refresh. A refresh recomputes from the source, so a repeated one
+does no harm; a lost one (a worker killed in between, a change made outside the
+API) is put right by scripts/rebuild_usage_rollups.py.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Select, String, cast, delete, func, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import VersionedCache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.usage import hour_column, instrument_usage_daily as daily, instrument_usage_weekly as weekly
+
+logger = logging.getLogger(__name__)
+
+# Key of the PostgreSQL advisory lock serializing rollup refreshes across workers.
+ADVISORY_LOCK_KEY = 0x55534147  # "USAG"
+
+# After a failed refresh, the dirty days are retried this soon.
+_RETRY_SECONDS = 30
+
+_HOUR = 3600
+_DAY = 86400
+# (instrument, day) pairs are packed into one int64 key: instrument * _DAY_SPAN + day.
+_DAY_SPAN = 1 << 20
+
+COUNTED_STATUSES = ("completed", "missed", "cancelled")
+HOUR_NAMES = [hour_column(hour) for hour in range(24)]
+MEASURES = ["booked_seconds", "reservations", *COUNTED_STATUSES, *HOUR_NAMES]
+
+# --- Rollup Computation ---
+def _epoch_seconds(moments: Sequence[datetime]) -> np.ndarray:
+    return np.array(moments, dtype="datetime64[s]").astype(np.int64)
+
+def usage_rows(
+    instrument_ids: Sequence[int],
+    starts: Sequence[datetime],
+    ends: Sequence[datetime],
+    statuses: Sequence[ReservationStatus],
+    *,
+    window_start: datetime,
+    window_end: datetime,
+) -> List[Dict[str, Any]]:
+    """
+    The rollup rows of the days in [window_start, window_end) (both midnights), given
+    the columns of every reservation overlapping the window. Booked time is clipped
+    to the window; reservations are counted on the day they start.
+    """
+    instruments = np.asarray(instrument_ids, dtype=np.int64)
+    start = _epoch_seconds(starts)
+    end = _epoch_seconds(ends)
+    status = np.array([s.value for s in statuses], dtype=object)
+    window_from, window_to = _epoch_seconds([window_start, window_end])
+    cancelled = status == ReservationStatus.CANCELLED.value
+
+    # Booked seconds: split each reservation, clipped to the window, into the hours it covers.
+    clipped_start = np.maximum(start, window_from)
+    clipped_end = np.minimum(end, window_to)
+    booked = ~cancelled & (clipped_end > clipped_start)
+    b_start, b_end, b_instrument = clipped_start[booked], clipped_end[booked], instruments[booked]
+    first_hour = b_start // _HOUR
+    spans = (b_end - 1) // _HOUR - first_hour + 1
+    owner = np.repeat(np.arange(len(b_start)), spans)
+    hour = first_hour[owner] + np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+    seconds = np.minimum(b_end[owner], (hour + 1) * _HOUR) - np.maximum(b_start[owner], hour * _HOUR)
+    hour_keys = b_instrument[owner] * _DAY_SPAN + hour // 24
+
+    # Counts: the reservations starting within the window, by start day.
+    starting = (start >= window_from) & (start < window_to)
+    count_keys = instruments[starting] * _DAY_SPAN + start[starting] // _DAY
+    count_status = status[starting]
+
+    keys, inverse = np.unique(np.concatenate([hour_keys, count_keys]), return_inverse=True)
+    n = len(keys)
+    if n == 0:
+        return []
+    hour_index, count_index = inverse[:len(hour_keys)], inverse[len(hour_keys):]
+    hours = np.bincount(
+        hour_index * 24 + hour % 24, weights=seconds, minlength=n * 24
+    ).reshape(n, 24).round().astype(np.int64)
+    columns: Dict[str, Any] = {
+        "instrument_id": (keys // _DAY_SPAN).tolist(),
+        "day": (keys % _DAY_SPAN).astype("datetime64[D]").tolist(),
+        # Day 0 (1970-01-01) was a Thursday, three days after a Monday.
+        "week": (keys % _DAY_SPAN - (keys % _DAY_SPAN + 3) % 7).astype("datetime64[D]").tolist(),
+        "booked_seconds": hours.sum(axis=1).tolist(),
+        "reservations": np.bincount(
+            count_index[count_status != ReservationStatus.CANCELLED.value], minlength=n
+        ).tolist(),
+    }
+    for name in COUNTED_STATUSES:
+        columns[name] = np.bincount(count_index[count_status == name], minlength=n).tolist()
+    for hour_of_day in range(24):
+        columns[hour_column(hour_of_day)] = hours[:, hour_of_day].tolist()
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+def _midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+def _monday(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+def _lock_rollups(db: Session) -> None:
+    """
+    Wait for other workers refreshing rollups; released when the transaction ends.
+    Elsewhere the database's write lock serializes them.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_KEY)))
+
+def rebuild(
+    db: Session, *, start: date, end: date, instrument_ids: Optional[Collection[int]] = None
+) -> int:
+    """
+    Recompute the daily rollup rows of the days in [start, end), and the weekly rows
+    of their weeks, of the given instruments or all of them. Returns the number of
+    daily rows written. The caller commits.
+    """
+    _lock_rollups(db)
+    window_start, window_end = _midnight(start), _midnight(end)
+    query = select(
+        Reservation.instrument_id, Reservation.start_time, Reservation.end_time, Reservation.status
+    ).where(Reservation.start_time < window_end, Reservation.end_time > window_start)
+    first_week, end_week = _monday(start), _monday(end - timedelta(days=1)) + timedelta(days=7)
+    stale = delete(daily).where(daily.c.day >= start, daily.c.day < end)
+    stale_weeks = delete(weekly).where(weekly.c.week >= first_week, weekly.c.week < end_week)
+    week_sums = (
+        select(daily.c.instrument_id, daily.c.week, *[func.sum(daily.c[name]) for name in MEASURES])
+        .where(daily.c.week >= first_week, daily.c.week < end_week)
+        .group_by(daily.c.instrument_id, daily.c.week)
+    )
+    if instrument_ids is not None:
+        query = query.where(Reservation.instrument_id.in_(list(instrument_ids)))
+        stale = stale.where(daily.c.instrument_id.in_(list(instrument_ids)))
+        stale_weeks = stale_weeks.where(weekly.c.instrument_id.in_(list(instrument_ids)))
+        week_sums = week_sums.where(daily.c.instrument_id.in_(list(instrument_ids)))
+    reservations = db.execute(query).all()
+    rows = usage_rows(
+        *(zip(*reservations) if reservations else ([], [], [], [])),
+        window_start=window_start,
+        window_end=window_end,
+    )
+    db.execute(stale)
+    if rows:
+        db.execute(insert(daily), rows)
+    db.execute(stale_weeks)
+    db.execute(insert(weekly).from_select(["instrument_id", "week", *MEASURES], week_sums))
+    return len(rows)
+
+def _days(start: datetime, end: datetime) -> List[date]:
+    first, last = start.date(), (end - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+def _day_runs(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """
+    Consecutive days as [start, end) ranges.
+    """
+    runs: List[Tuple[date, date]] = []
+    for day in sorted(days):
+        if runs and runs[-1][1] == day:
+            runs[-1] = (runs[-1][0], day + timedelta(days=1))
+        else:
+            runs.append((day, day + timedelta(days=1)))
+    return runs
+
+# --- Incremental Maintenance ---
+class RollupMaintainer:
+    """
+    Recomputes the rollup days of changed reservations from a background thread,
+    `delay` seconds after the first change, together with every change made meanwhile.
+    """
+    def __init__(self, *, session_factory: Callable[[], Session], delay: float, name: str):
+        self.session_factory = session_factory
+        self.delay = delay
+        self.name = name
+        self._dirty: Dict[int, Set[date]] = {}
+        self._wakeup = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "refreshes": 0,
+            "failures": 0,
+            "days_refreshed": 0,
+            "last_refresh_seconds": None,
+        }
+
+    # --- Lifecycle ---
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-maintainer", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Refresh whatever is still dirty and stop the background thread.
+        """
+        if not self.running:
+            return
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify()
+        assert self._thread is not None
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Producer side ---
+    def mark(self, instrument_id: int, start: datetime, end: datetime) -> None:
+        """
+        Note that the rollup of the instrument's days from `start` to `end` changed.
+        """
+        if not self.running:
+            return
+        with self._wakeup:
+            self._dirty.setdefault(instrument_id, set()).update(_days(start, end))
+            self._wakeup.notify()
+
+    # --- Worker side ---
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            with self._wakeup:
+                while not self._dirty and not self._stopping.is_set():
+                    self._wakeup.wait()
+            # Let the changes of the next few seconds join this refresh.
+            if self._stopping.wait(self.delay):
+                break
+            if not self._refresh_dirty():
+                self._stopping.wait(_RETRY_SECONDS)
+        # Once more for the changes made since, before the worker exits.
+        self._refresh_dirty()
+
+    def _refresh_dirty(self) -> bool:
+        with self._wakeup:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return True
+        try:
+            self.refresh(dirty)
+        except Exception:
+            self._count("failures")
+            logger.exception("%s rollup refresh failed; retrying", self.name)
+            with self._wakeup:
+                for instrument_id, days in dirty.items():
+                    self._dirty.setdefault(instrument_id, set()).update(days)
+            return False
+        return True
+
+    def refresh(self, dirty: Dict[int, Set[date]]) -> None:
+        """
+        Recompute the given days of the given instruments.
+        """
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            for instrument_id, days in dirty.items():
+                for start, end in _day_runs(days):
+                    rebuild(db, start=start, end=end, instrument_ids=[instrument_id])
+            db.commit()
+        results_cache.bump()
+        with self._stats_lock:
+            self._stats["refreshes"] += 1
+            self._stats["days_refreshed"] += sum(len(days) for days in dirty.values())
+            self._stats["last_refresh_seconds"] = round(time.perf_counter() - started, 6)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._wakeup:
+            stats["dirty_days"] = sum(len(days) for days in self._dirty.values())
+        return {**stats, "running": self.running}
+
+# Started and stopped with the application (see main.py).
+maintainer = RollupMaintainer(
+    session_factory=SessionLocal,
+    delay=settings.ANALYTICS_ROLLUP_DELAY_SECONDS,
+    name="usage",
+)
+
+def analytics_stats() -> Dict[str, Any]:
+    return {**maintainer.stats(), "cache": results_cache.stats()}
+
+# --- Queries ---
+# Serialized responses are cached per rollup version (see app/api/v1/endpoints/analytics.py),
+# so a dashboard reloading a year of every instrument costs no query. The refreshes of
+# this worker bump the version; those of other workers and of the rebuild script show
+# after ANALYTICS_CACHE_TTL_SECONDS, as the rollups already trail the reservations.
+results_cache = VersionedCache(
+    maxsize=settings.ANALYTICS_CACHE_SIZE,
+    ttl=settings.ANALYTICS_CACHE_TTL_SECONDS,
+    name="analytics",
+)
+
+def _week_rows(*, start: date, end: date, instrument_id: Optional[int], names: Sequence[str]):
+    """
+    One row per instrument and week with the sums of `names` over the days of the week
+    in [start, end): the weekly rollup rows of the whole weeks, and the daily rows of
+    the days before and after them, summed per week.
+    """
+    first_whole = start + timedelta(days=-start.weekday() % 7)
+    end_whole = max(_monday(end), first_whole)
+
+    def edge(first: date, last: date) -> Select:
+        # Each edge is one range of at most six days, read through the day index.
+        statement = select(
+            daily.c.instrument_id, daily.c.week, *[func.sum(daily.c[name]).label(name) for name in names]
+        ).where(daily.c.day >= first, daily.c.day < last).group_by(daily.c.instrument_id, daily.c.week)
+        if instrument_id is not None:
+            statement = statement.where(daily.c.instrument_id == instrument_id)
+        return statement
+
+    if first_whole >= end_whole:
+        return edge(start, end).subquery()
+    whole_weeks = select(
+        weekly.c.instrument_id, weekly.c.week, *[weekly.c[name] for name in names]
+    ).where(weekly.c.week >= first_whole, weekly.c.week < end_whole)
+    if instrument_id is not None:
+        whole_weeks = whole_weeks.where(weekly.c.instrument_id == instrument_id)
+    parts = [whole_weeks]
+    if start < first_whole:
+        parts.append(edge(start, first_whole))
+    if end_whole < end:
+        parts.append(edge(end_whole, end))
+    # The edge days lie outside the whole weeks, so no week appears twice.
+    return (union_all(*parts) if len(parts) > 1 else whole_weeks).subquery()
+
+async def aget_utilization(
+    db: AsyncSession,
+    *,
+    start: date,
+    end: date,
+    granularity: str,
+    instrument_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Utilization per instrument and day or week (starting Monday) of [start, end), as
+    columns of equal length. Periods without any reservation are left out; partial
+    weeks at the ends of the range are measured against their days in the range.
+    The no-show rate is None throughout without telemetry, which tells no-shows apart
+    (see lifecycle.py).
+    """
+    # Periods are read as ISO text and parsed as one array: converting a Date column
+    # row by row costs more than the query itself.
+    if granularity == "day":
+        statement = select(
+            daily.c.instrument_id, cast(daily.c.day, String), daily.c.booked_seconds, daily.c.reservations,
+            *[daily.c[name] for name in COUNTED_STATUSES],
+        ).where(daily.c.day >= start, daily.c.day < end)
+        if instrument_id is not None:
+            statement = statement.where(daily.c.instrument_id == instrument_id)
+        statement = statement.order_by(daily.c.instrument_id, daily.c.day)
+    else:
+        rows = _week_rows(
+            start=start,
+            end=end,
+            instrument_id=instrument_id,
+            names=("booked_seconds", "reservations", *COUNTED_STATUSES),
+        )
+        statement = select(
+            rows.c.instrument_id,
+            cast(rows.c.week, String),
+            *[rows.c[name] for name in ("booked_seconds", "reservations", *COUNTED_STATUSES)],
+        ).order_by(rows.c.instrument_id, rows.c.week)
+    result = (await db.execute(statement)).all()
+    instruments, periods, booked, reservations, completed, missed, cancelled = (
+        zip(*result) if result else ([],) * 7
+    )
+    period_start = np.array(periods, dtype="datetime64[D]")
+    if granularity == "day":
+        days = np.ones(len(result), dtype=np.int64)
+    else:
+        days = (
+            np.minimum(period_start + 7, np.datetime64(end, "D"))
+            - np.maximum(period_start, np.datetime64(start, "D"))
+        ).astype(np.int64)
+    booked_seconds = np.array(booked, dtype=np.float64)
+    missed_count = np.array(missed, dtype=np.int64)
+    ended = np.array(completed, dtype=np.int64) + missed_count
+    no_show_rate = (missed_count / np.maximum(ended, 1)).round(4).astype(object)
+    no_show_rate[ended == 0] = None
+    if not settings.TELEMETRY_INGEST_KEY:
+        no_show_rate[:] = None
+    return {
+        "granularity": granularity,
+        "instrument_id": list(instruments),
+        "period_start": period_start.tolist(),
+        "days": days.tolist(),
+        "booked_hours": (booked_seconds / _HOUR).round(3).tolist(),
+        "utilization": (booked_seconds / (days * _DAY)).round(4).tolist(),
+        "reservations": list(reservations),
+        "completed": list(completed),
+        "missed": list(missed),
+        "cancelled": list(cancelled),
+        "no_show_rate": no_show_rate.tolist(),
+    }
+
+def _hour_profile(seconds: np.ndarray, instrument_id: Optional[int]) -> Dict[str, Any]:
+    ranked = np.argsort(-seconds, kind="stable")[:settings.ANALYTICS_PEAK_HOURS]
+    return {
+        "instrument_id": instrument_id,
+        "booked_hours": (seconds / _HOUR).round(3).tolist(),
+        "peak_hours": [int(hour) for hour in ranked if seconds[hour] > 0],
+    }
+
+async def aget_peak_hours(
+    db: AsyncSession, *, start: date, end: date, instrument_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Booked hours per hour of the day (UTC) over [start, end), per instrument and for
+    all of them together, with the busiest hours first.
+    """
+    rows = _week_rows(start=start, end=end, instrument_id=instrument_id, names=HOUR_NAMES)
+    result = (await db.execute(
+        select(rows.c.instrument_id, *[func.sum(rows.c[name]) for name in HOUR_NAMES])
+        .group_by(rows.c.instrument_id)
+        .order_by(rows.c.instrument_id)
+    )).all()
+    matrix = np.array([row[1:] for row in result], dtype=np.float64).reshape(len(result), 24)
+    return {
+        "overall": _hour_profile(matrix.sum(axis=0), instrument_id),
+        "instruments": [
+            _hour_profile(seconds, row[0]) for row, seconds in zip(result, matrix)
+        ],
+    }
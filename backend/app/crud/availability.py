@@ -0,0 +1,344 @@
+"""
+In-memory availability timelines.
+
+Each instrument's active (pending or confirmed) reservations are kept as intervals
+sorted by start time. A timeline is loaded from the database on first use and kept
+up to date by the reservation CRUD functions whenever a booking is created, changed
+or removed, so availability is answered with a binary search and a merge instead of
+reading and serializing reservations.
+
+Changes made through other workers drop the instrument's timeline when their event
+arrives through the PostgreSQL broker, and otherwise show up when a timeline expires
+(AVAILABILITY_TIMELINE_TTL_SECONDS). Bookings are always checked against the
+database, so a stale timeline can at worst show a slot as free that is taken.
+"""
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.instrument import Instrument
+from app.models.reservation import Reservation, ReservationStatus
+
+# Times are kept as whole seconds since _GRID_ORIGIN: integers bisect, compare and
+# round to the slot grid several times faster than datetimes.
+Interval = Tuple[int, int]
+
+ACTIVE_STATUSES = (ReservationStatus.PENDING, ReservationStatus.CONFIRMED)
+
+# Slots of every granularity are aligned to midnight.
+_GRID_ORIGIN = datetime(2000, 1, 1)
+
+def naive_utc(moment: datetime) -> datetime:
+    """
+    Reservation times are stored in UTC without a zone: convert times with a zone to
+    that, and take times without one as UTC already.
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def to_seconds(moment: datetime) -> int:
+    return (moment - _GRID_ORIGIN) // timedelta(seconds=1)
+
+def to_datetime(seconds: int) -> datetime:
+    return _GRID_ORIGIN + timedelta(seconds=seconds)
+
+class Timeline:
+    """
+    The active reservations of one instrument, sorted by start time.
+    """
+    def __init__(self, rows: Iterable[Tuple[int, datetime, datetime]] = ()):
+        self._lock = threading.Lock()
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._ids: List[int] = []
+        self._start_by_id: Dict[int, int] = {}
+        # Longest reservation seen; bounds how far back an overlapping one can start.
+        self._longest = 0
+        for reservation_id, start, end in sorted(rows, key=lambda row: (row[1], row[0])):
+            self._append(reservation_id, to_seconds(start), to_seconds(end))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _append(self, reservation_id: int, start: int, end: int) -> None:
+        self._starts.append(start)
+        self._ends.append(end)
+        self._ids.append(reservation_id)
+        self._start_by_id[reservation_id] = start
+        self._longest = max(self._longest, end - start)
+
+    def add(self, reservation_id: int, start_time: datetime, end_time: datetime) -> None:
+        start, end = to_seconds(start_time), to_seconds(end_time)
+        with self._lock:
+            self._discard(reservation_id)
+            index = bisect_right(self._starts, start)
+            self._starts.insert(index, start)
+            self._ends.insert(index, end)
+            self._ids.insert(index, reservation_id)
+            self._start_by_id[reservation_id] = start
+            self._longest = max(self._longest, end - start)
+
+    def discard(self, reservation_id: int) -> None:
+        with self._lock:
+            self._discard(reservation_id)
+
+    def _discard(self, reservation_id: int) -> None:
+        start = self._start_by_id.pop(reservation_id, None)
+        if start is None:
+            return
+        index = bisect_left(self._starts, start)
+        while self._ids[index] != reservation_id:
+            index += 1
+        del self._starts[index], self._ends[index], self._ids[index]
+
+    def overlapping(self, start: int, end: int) -> Tuple[List[int], List[int]]:
+        """
+        Copies of the starts and ends of the reservations that may overlap [start, end).
+        """
+        with self._lock:
+            first = bisect_left(self._starts, start - self._longest)
+            last = bisect_left(self._starts, end)
+            return self._starts[first:last], self._ends[first:last]
+
+    def busy(self, start: int, end: int) -> List[Interval]:
+        """
+        The merged busy intervals overlapping [start, end), clipped to it.
+        """
+        merged: List[Interval] = []
+        for busy_start, busy_end in zip(*self.overlapping(start, end)):
+            busy_end = min(busy_end, end)
+            if busy_end <= start:
+                continue
+            busy_start = max(busy_start, start)
+            if merged and busy_start <= merged[-1][1]:
+                if busy_end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], busy_end)
+            else:
+                merged.append((busy_start, busy_end))
+        return merged
+
+# --- Slot Grid ---
+def _free_windows(
+    busy: Iterable[Interval], start: int, end: int, granularity: int
+) -> Iterator[Interval]:
+    """
+    The free windows between busy intervals sorted by start, within [start, end),
+    shrunk to slot boundaries. Lazy, so that a search can stop early.
+    """
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_end <= cursor:
+            continue
+        free_start = cursor + -cursor % granularity
+        free_end = min(busy_start, end)
+        free_end -= free_end % granularity
+        if free_end > free_start:
+            yield free_start, free_end
+        cursor = busy_end
+        if cursor >= end:
+            return
+    free_start = cursor + -cursor % granularity
+    free_end = end - end % granularity
+    if free_end > free_start:
+        yield free_start, free_end
+
+def availability(
+    busy: Sequence[Interval], start: int, end: int, granularity: int
+) -> Tuple[List[Interval], List[Interval]]:
+    """
+    Widen busy intervals to whole slots of `granularity` seconds and return them with
+    the free windows between them. Both are clipped to [start, end); free windows
+    start and end on slot boundaries, so windows shorter than one slot are left out.
+    """
+    snapped: List[Interval] = []
+    for busy_start, busy_end in busy:
+        busy_start = max(busy_start - busy_start % granularity, start)
+        busy_end = min(busy_end + -busy_end % granularity, end)
+        if snapped and busy_start <= snapped[-1][1]:
+            snapped[-1] = (snapped[-1][0], max(snapped[-1][1], busy_end))
+        else:
+            snapped.append((busy_start, busy_end))
+    return snapped, list(_free_windows(snapped, start, end, granularity))
+
+class SlotCandidate(NamedTuple):
+    start: int
+    # Free time left in the window after the booking; less is a tighter fit.
+    slack: int
+    instrument_id: int
+    free_until: int
+
+def find_free_slots(
+    timelines: Dict[int, Timeline], *, start: int, end: int, duration: int, granularity: int,
+    limit: int,
+) -> List[SlotCandidate]:
+    """
+    Sweep the timelines of many instruments for free windows of at least `duration`
+    seconds within [start, end). Every fitting window offers its first slot; the
+    earliest candidates come first, ties going to the tightest fit, so that long
+    free windows stay open for long bookings.
+
+    Each timeline is only walked until it can no longer beat the candidates found
+    so far, so a search over months of bookings mostly touches their first days.
+    """
+    best: List[SlotCandidate] = []
+    # Candidates starting after this can't make the list any more.
+    cutoff = end
+    for instrument_id, timeline in timelines.items():
+        starts, ends = timeline.overlapping(start, end)
+        found = 0
+        for free_start, free_end in _free_windows(zip(starts, ends), start, end, granularity):
+            if free_start > cutoff:
+                break
+            if free_end - free_start >= duration:
+                best.append(SlotCandidate(
+                    free_start, free_end - free_start - duration, instrument_id, free_end
+                ))
+                found += 1
+                if found == limit:
+                    break
+        if len(best) >= limit:
+            best = heapq.nsmallest(limit, best)
+            cutoff = best[-1].start
+    return sorted(best)[:limit]
+
+# --- Timeline Cache ---
+_timelines = TTLCache(
+    maxsize=settings.AVAILABILITY_TIMELINE_CACHE_SIZE,
+    ttl=settings.AVAILABILITY_TIMELINE_TTL_SECONDS,
+    name="availability",
+)
+
+# Bumped by every change to an instrument's reservations. A timeline whose loading
+# overlapped a change is not cached, since it may or may not contain the change.
+_generations: Dict[int, int] = {}
+_generations_lock = threading.Lock()
+
+def _generation(instrument_id: int) -> int:
+    with _generations_lock:
+        return _generations.get(instrument_id, 0)
+
+def _bump_generation(instrument_id: int) -> None:
+    with _generations_lock:
+        _generations[instrument_id] = _generations.get(instrument_id, 0) + 1
+
+def _instruments_statement(instrument_ids: Sequence[int]) -> Select:
+    return select(Instrument.id).where(Instrument.id.in_(instrument_ids))
+
+def _reservations_statement(instrument_ids: Sequence[int]) -> Select:
+    return select(
+        Reservation.instrument_id, Reservation.id, Reservation.start_time, Reservation.end_time
+    ).where(
+        Reservation.instrument_id.in_(instrument_ids),
+        Reservation.status.in_(ACTIVE_STATUSES),
+    )
+
+def _cached(instrument_ids: Iterable[int]) -> Tuple[Dict[int, Timeline], List[int]]:
+    found: Dict[int, Timeline] = {}
+    missing: List[int] = []
+    for instrument_id in dict.fromkeys(instrument_ids):
+        timeline = _timelines.get(instrument_id)
+        if timeline is None:
+            missing.append(instrument_id)
+        else:
+            found[instrument_id] = timeline
+    return found, missing
+
+def _build(
+    existing: Iterable[int], rows: Iterable[Tuple[int, int, datetime, datetime]],
+    generations: Dict[int, int],
+) -> Dict[int, Timeline]:
+    grouped: Dict[int, List[Tuple[int, datetime, datetime]]] = {
+        instrument_id: [] for instrument_id in existing
+    }
+    for instrument_id, reservation_id, start, end in rows:
+        grouped[instrument_id].append((reservation_id, start, end))
+    timelines = {}
+    for instrument_id, intervals in grouped.items():
+        timelines[instrument_id] = timeline = Timeline(intervals)
+        if _generation(instrument_id) == generations[instrument_id]:
+            _timelines.set(instrument_id, timeline)
+    return timelines
+
+def get_timelines(db: Session, *, instrument_ids: Sequence[int]) -> Dict[int, Timeline]:
+    """
+    The timelines of the given instruments, loading the missing ones with one query.
+    Instruments that don't exist are left out.
+    """
+    timelines, missing = _cached(instrument_ids)
+    if missing:
+        generations = {instrument_id: _generation(instrument_id) for instrument_id in missing}
+        existing = list(db.scalars(_instruments_statement(missing)))
+        rows = db.execute(_reservations_statement(existing)).all() if existing else []
+        timelines.update(_build(existing, rows, generations))
+    return timelines
+
+async def aget_timelines(db: AsyncSession, *, instrument_ids: Sequence[int]) -> Dict[int, Timeline]:
+    """
+    Async version of get_timelines.
+    """
+    timelines, missing = _cached(instrument_ids)
+    if missing:
+        generations = {instrument_id: _generation(instrument_id) for instrument_id in missing}
+        existing = list(await db.scalars(_instruments_statement(missing)))
+        rows = (await db.execute(_reservations_statement(existing))).all() if existing else []
+        timelines.update(_build(existing, rows, generations))
+    return timelines
+
+# --- Change Hooks ---
+# Called by the reservation and instrument CRUD functions after they commit.
+def record_reservation(reservation: Reservation) -> None:
+    """
+    Bring the cached timeline up to date after a reservation was created or changed.
+    """
+    _bump_generation(reservation.instrument_id)
+    timeline = _timelines.get(reservation.instrument_id)
+    if timeline is None:
+        return
+    if reservation.status in ACTIVE_STATUSES:
+        timeline.add(reservation.id, reservation.start_time, reservation.end_time)
+    else:
+        timeline.discard(reservation.id)
+
+def record_bookings(instrument_id: int, bookings: Iterable[Tuple[int, datetime, datetime]]) -> None:
+    """
+    Add newly created active reservations, given as (id, start, end), to the cached timeline.
+    """
+    _bump_generation(instrument_id)
+    timeline = _timelines.get(instrument_id)
+    if timeline is not None:
+        for reservation_id, start, end in bookings:
+            timeline.add(reservation_id, start, end)
+
+def forget_reservation(*, instrument_id: int, reservation_id: int) -> None:
+    _bump_generation(instrument_id)
+    timeline = _timelines.get(instrument_id)
+    if timeline is not None:
+        timeline.discard(reservation_id)
+
+def forget_instrument(instrument_id: int) -> None:
+    _bump_generation(instrument_id)
+    _timelines.pop(instrument_id)
+
+def timeline_cache_stats() -> dict:
+    return _timelines.stats()
+
+def _forget_remote_change(event: events.Event) -> None:
+    """
+    Drop the timelines a change made through another worker touched.
+    """
+    if event["type"].startswith("reservation.") or event["type"] == "instrument.deleted":
+        for key in ("instrument_id", "previous_instrument_id"):
+            if event.get(key) is not None:
+                forget_instrument(event[key])
+
+events.broker.on_remote_event(_forget_remote_change)
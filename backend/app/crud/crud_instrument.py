@@ -1,60 +1,146 @@
-from sqlalchemy.orm import Session
-from typing import List
+import hashlib
 
-from app.models.instrument import Instrument
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional
+
+from app.core import events
+from app.core.cache import RedisVersion, VersionedCache
+from app.crud import availability
+from app.core.config import settings
+from app.models.instrument import Instrument, InstrumentStatus
+from app.models.permission import user_instrument_permission
 from app.schemas.instrument import InstrumentCreate, InstrumentUpdate
 
-def get(db: Session, id: int) -> Instrument | None:
+# --- Catalog Cache ---
+# The catalog changes a few times a week but every dashboard and kiosk polls it.
+# Serialized responses are cached per catalog version, which every create, update
+# and remove bumps; the ETag of a response is the hash of its body.
+class CatalogEntry(NamedTuple):
+    etag: str
+    body: bytes
+
+catalog_cache = VersionedCache(
+    maxsize=settings.CATALOG_CACHE_SIZE,
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+    name="catalog",
+    shared=(
+        RedisVersion(settings.CATALOG_CACHE_REDIS_URL, key="catalog:version")
+        if settings.CATALOG_CACHE_REDIS_URL
+        else None
+    ),
+)
+
+def catalog_entry(body: bytes) -> CatalogEntry:
+    return CatalogEntry(etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body=body)
+
+async def acatalog_version() -> Optional[int]:
+    return await catalog_cache.aversion()
+
+def get_cached_catalog(key: Hashable, version: Optional[int]) -> Optional[CatalogEntry]:
+    if version is None:
+        return None
+    return catalog_cache.get(key, version)
+
+def set_cached_catalog(key: Hashable, version: Optional[int], entry: CatalogEntry) -> None:
+    if version is not None:
+        catalog_cache.set(key, version, entry)
+
+def catalog_cache_stats() -> dict:
+    return catalog_cache.stats()
+
+def instrument_event(change: str, instrument: Instrument) -> Dict[str, Any]:
+    """
+    The change event published for an instrument (see app/core/events.py).
+    """
+    return {
+        "type": f"instrument.{change}",
+        "instrument_id": instrument.id,
+        "status": instrument.status,
+        "is_active": instrument.is_active,
+    }
+
+async def aget(db: AsyncSession, id: int) -> Instrument | None:
     """
     Get a single instrument by its ID.
     """
-    return db.query(Instrument).filter(Instrument.id == id).first()
+    return await db.get(Instrument, id)
 
-def get_multi(db: Session, *, skip: int = 0, limit: int = 100) -> List[Instrument]:
+async def aget_multi(db: AsyncSession, *, skip: int = 0, limit: int = 100) -> List[Instrument]:
     """
     Get a list of instruments, with pagination.
     """
-    return db.query(Instrument).offset(skip).limit(limit).all()
+    return list(await db.scalars(select(Instrument).offset(skip).limit(limit)))
+
+async def asearch_bookable(
+    db: AsyncSession,
+    *,
+    user_id: Optional[int],
+    model: Optional[str] = None,
+    location: Optional[str] = None,
+    status: Optional[InstrumentStatus] = None,
+    is_active: Optional[bool] = None,
+) -> List[Row]:
+    """
+    The id, name and location of every instrument matching the filters that a user
+    may book (any instrument if `user_id` is None), in one query. `model` and
+    `location` match case-insensitive substrings.
+    """
+    statement = select(Instrument.id, Instrument.name, Instrument.location)
+    if user_id is not None:
+        statement = statement.where(Instrument.id.in_(
+            select(user_instrument_permission.c.instrument_id)
+            .where(user_instrument_permission.c.user_id == user_id)
+        ))
+    if model:
+        statement = statement.where(Instrument.model.ilike(f"%{model}%"))
+    if location:
+        statement = statement.where(Instrument.location.ilike(f"%{location}%"))
+    if status is not None:
+        statement = statement.where(Instrument.status == status)
+    if is_active is not None:
+        statement = statement.where(Instrument.is_active == is_active)
+    return list(await db.execute(statement))
 
-def create(db: Session, *, obj_in: InstrumentCreate) -> Instrument:
+async def acreate(db: AsyncSession, *, obj_in: InstrumentCreate) -> Instrument:
     """
     Create a new instrument in the database.
     """
-    # Convert Pydantic model to a dictionary for SQLAlchemy model creation
     db_obj = Instrument(**obj_in.dict())
-    
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await db.commit()
+    await catalog_cache.abump()
+    await db.refresh(db_obj)
+    events.publish(instrument_event("created", db_obj))
     return db_obj
 
-def update(
-    db: Session, *, db_obj: Instrument, obj_in: InstrumentUpdate
+async def aupdate(
+    db: AsyncSession, *, db_obj: Instrument, obj_in: InstrumentUpdate
 ) -> Instrument:
     """
     Update an existing instrument.
     """
-    # Get the dictionary of the existing database object
-    obj_data = db_obj.__dict__
-    
-    # Get the dictionary of the update data, excluding unset fields
     update_data = obj_in.dict(exclude_unset=True)
-    
-    for field in obj_data:
-        if field in update_data:
-            setattr(db_obj, field, update_data[field])
-            
+    for field, value in update_data.items():
+        if hasattr(db_obj, field):
+            setattr(db_obj, field, value)
+
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await db.commit()
+    await catalog_cache.abump()
+    await db.refresh(db_obj)
+    events.publish(instrument_event("updated", db_obj))
     return db_obj
 
-def remove(db: Session, *, id: int) -> Instrument | None:
+async def aremove(db: AsyncSession, *, id: int) -> Instrument | None:
     """
     Delete an instrument from the database.
     """
-    db_obj = db.query(Instrument).get(id)
+    db_obj = await db.get(Instrument, id)
     if db_obj:
-        db.delete(db_obj)
-        db.commit()
-    return db_obj
\ No newline at end of file
+        await db.delete(db_obj)
+        await db.commit()
+        await catalog_cache.abump()
+        availability.forget_instrument(id)
+        events.publish(instrument_event("deleted", db_obj))
+    return db_obj
@@ -1,7 +1,31 @@
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
+from datetime import datetime
+from pathlib import Path
 
+from app.core.config import settings
+from app.db.batch_writer import BatchWriter
+from app.db.session import SessionLocal
 from app.models.log import AccessLog
+from app.crud.pagination import Page, decode_cursor, next_cursor
+
+# --- Background Writer ---
+# Started and stopped with the application (see main.py). While it runs, log entries
+# are queued and written in batches instead of being committed inside the request.
+log_writer = BatchWriter(
+    AccessLog.__table__,
+    session_factory=SessionLocal,
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_SECONDS,
+    max_queue=settings.ACCESS_LOG_QUEUE_SIZE,
+    enqueue_timeout=settings.ACCESS_LOG_ENQUEUE_TIMEOUT_SECONDS,
+    retries=settings.BATCH_WRITE_RETRIES,
+    retry_backoff=settings.BATCH_WRITE_RETRY_BACKOFF_SECONDS,
+    dead_letter_path=Path(settings.BATCH_WRITE_DEAD_LETTER_DIR) / "access_log.jsonl",
+    name="access-log",
+)
 
 def create_log_entry(
     db: Session,
@@ -12,13 +36,90 @@ def create_log_entry(
 ) -> AccessLog:
     """
     Create a new entry in the access log.
+    While the background writer runs, the entry is only queued: the returned object is
+    not persisted yet and has no id. Otherwise it is committed right away.
     """
     log_entry = AccessLog(
+        # Stamp the event now, not when the batch reaches the database.
+        timestamp=datetime.utcnow(),
         user_id=user_id,
         action=action,
         details=details,
     )
+    if log_writer.running:
+        log_writer.submit({
+            "timestamp": log_entry.timestamp,
+            "user_id": user_id,
+            "action": action,
+            "details": details,
+        })
+        return log_entry
+
     db.add(log_entry)
     db.commit()
     db.refresh(log_entry)
-    return log_entry
\ No newline at end of file
+    return log_entry
+
+async def acreate_log_entry(
+    db: AsyncSession,
+    *,
+    user_id: Optional[int],
+    action: str,
+    details: Optional[Dict[str, Any]] = None,
+) -> AccessLog:
+    """
+    Async version of create_log_entry. It never blocks the event loop: when the
+    writer's queue is full, the entry is committed through `db` instead.
+    """
+    log_entry = AccessLog(
+        timestamp=datetime.utcnow(),
+        user_id=user_id,
+        action=action,
+        details=details,
+    )
+    if log_writer.running and log_writer.submit_nowait({
+        "timestamp": log_entry.timestamp,
+        "user_id": user_id,
+        "action": action,
+        "details": details,
+    }):
+        return log_entry
+
+    db.add(log_entry)
+    await db.commit()
+    return log_entry
+
+def get_multi(
+    db: Session,
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Page:
+    """
+    Get access log entries, newest first, one keyset page at a time, optionally only
+    those of a user, of an action and/or from [start, end). A time range lets
+    PostgreSQL skip the monthly partitions outside it.
+    The log only grows, so there is no offset pagination and no total count.
+    """
+    query = db.query(AccessLog)
+    if user_id is not None:
+        query = query.filter(AccessLog.user_id == user_id)
+    if action is not None:
+        query = query.filter(AccessLog.action == action)
+    if start is not None:
+        query = query.filter(AccessLog.timestamp >= start)
+    if end is not None:
+        query = query.filter(AccessLog.timestamp < end)
+    if cursor:
+        timestamp, log_id = decode_cursor(cursor, (datetime, int))
+        query = query.filter(tuple_(AccessLog.timestamp, AccessLog.id) < (timestamp, log_id))
+    data = (
+        query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return Page(data, None, next_cursor(data, limit, lambda entry: (entry.timestamp, entry.id)))
@@ -1,33 +1,191 @@
+from sqlalchemy import delete, exists, select, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import List, Sequence, Set, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.models.user import User
 from app.models.instrument import Instrument
-from app.schemas.permission import PermissionGrant # <-- Import the new schema
+from app.models.permission import user_instrument_permission
+from app.schemas.permission import PermissionGrant, PermissionBulkChange # <-- Import the new schema
 from . import crud_user # Import crud_user to find user by email
 
-def grant_permission(db: Session, *, permission_in: PermissionGrant) -> User | None:
-    user = db.query(User).filter(User.id == permission_in.user_id).first()
-    instrument = db.query(Instrument).filter(Instrument.id == permission_in.instrument_id).first()
-    
-    if not user or not instrument:
-        return None
+# Permission checks and changes work on the association table directly, so they never
+# load a user's or an instrument's whole list of permissions.
 
-    if instrument not in user.authorized_instruments:
-        user.authorized_instruments.append(instrument)
-        db.commit()
-        db.refresh(user)
-        
-    return user
+# --- Permission Checks ---
+async def ahas_permission(db: AsyncSession, *, user_id: int, instrument_id: int) -> bool:
+    """
+    Whether a user may book an instrument: one primary-key lookup, or a cache hit
+    when PERMISSION_CACHE_TTL_SECONDS is set.
+    """
+    if settings.PERMISSION_CACHE_TTL_SECONDS > 0:
+        cached = _permission_cache.get(user_id)
+        if cached is None:
+            cached = frozenset(await db.scalars(_instrument_ids_statement(user_id)))
+            _permission_cache.set(user_id, cached)
+        return instrument_id in cached
+    return await db.scalar(_has_permission_statement(user_id, instrument_id))
+
+def _has_permission_statement(user_id: int, instrument_id: int):
+    return select(
+        exists().where(
+            user_instrument_permission.c.user_id == user_id,
+            user_instrument_permission.c.instrument_id == instrument_id,
+        )
+    )
+
+def _instrument_ids_statement(user_id: int):
+    return select(user_instrument_permission.c.instrument_id).where(
+        user_instrument_permission.c.user_id == user_id
+    )
+
+# Optional per-user permission sets. Grants and revokes through this worker update
+# them at once; other workers pick changes up within the TTL.
+_permission_cache = TTLCache(
+    maxsize=settings.PERMISSION_CACHE_SIZE,
+    ttl=settings.PERMISSION_CACHE_TTL_SECONDS,
+    name="permission",
+)
+
+def invalidate_permissions(user_id: int) -> None:
+    _permission_cache.pop(user_id)
+
+def permission_cache_stats() -> dict:
+    return _permission_cache.stats()
+
+# --- Grant / Revoke ---
+def _user_and_instrument_exist(db: Session, *, user_id: int, instrument_id: int) -> bool:
+    row = db.execute(
+        select(
+            exists().where(User.id == user_id),
+            exists().where(Instrument.id == instrument_id),
+        )
+    ).one()
+    return row[0] and row[1]
 
-def revoke_permission(db: Session, *, permission_in: PermissionGrant) -> User | None:
-    user = db.query(User).filter(User.id == permission_in.user_id).first()
-    instrument = db.query(Instrument).filter(Instrument.id == permission_in.instrument_id).first()
+def _insert_ignoring_duplicates(db: Session, *, user_id: int, instrument_id: int) -> bool:
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    result = db.execute(
+        dialect_insert(user_instrument_permission)
+        .values(user_id=user_id, instrument_id=instrument_id)
+        .on_conflict_do_nothing()
+    )
+    return result.rowcount > 0
 
-    if not user or not instrument:
+# grant_permission and revoke_permission return whether the permission changed, or
+# None if the user or the instrument doesn't exist.
+def grant_permission(db: Session, *, permission_in: PermissionGrant) -> bool | None:
+    if not _user_and_instrument_exist(
+        db, user_id=permission_in.user_id, instrument_id=permission_in.instrument_id
+    ):
         return None
 
-    if instrument in user.authorized_instruments:
-        user.authorized_instruments.remove(instrument)
+    changed = _insert_ignoring_duplicates(
+        db, user_id=permission_in.user_id, instrument_id=permission_in.instrument_id
+    )
+    db.commit()
+    invalidate_permissions(permission_in.user_id)
+    return changed
+
+def revoke_permission(db: Session, *, permission_in: PermissionGrant) -> bool | None:
+    if not _user_and_instrument_exist(
+        db, user_id=permission_in.user_id, instrument_id=permission_in.instrument_id
+    ):
+        return None
+
+    result = db.execute(
+        delete(user_instrument_permission).where(
+            user_instrument_permission.c.user_id == permission_in.user_id,
+            user_instrument_permission.c.instrument_id == permission_in.instrument_id,
+        )
+    )
+    db.commit()
+    invalidate_permissions(permission_in.user_id)
+    return result.rowcount > 0
+
+# --- Bulk Changes ---
+def find_missing_ids(
+    db: Session, *, user_ids: Sequence[int], instrument_ids: Sequence[int]
+) -> Tuple[List[int], List[int]]:
+    """
+    Return the user ids and instrument ids that don't exist.
+    """
+    users = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+    instruments = set(db.scalars(select(Instrument.id).where(Instrument.id.in_(instrument_ids))))
+    return (
+        sorted(set(user_ids) - users),
+        sorted(set(instrument_ids) - instruments),
+    )
+
+def apply_bulk_change(
+    db: Session, *, change_in: PermissionBulkChange
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Apply a user x instrument permission change in one transaction, with one
+    set-based INSERT and/or DELETE. The ids must exist (see find_missing_ids).
+    Returns the (user_id, instrument_id) pairs that were granted and revoked.
+    """
+    user_ids = sorted(set(change_in.user_ids))
+    instrument_ids = sorted(set(change_in.instrument_ids))
+    wanted = {(user_id, instrument_id) for user_id in user_ids for instrument_id in instrument_ids}
+
+    table = user_instrument_permission
+    current: Set[Tuple[int, int]] = {
+        (row.user_id, row.instrument_id)
+        for row in db.execute(
+            select(table.c.user_id, table.c.instrument_id).where(table.c.user_id.in_(user_ids))
+        )
+    }
+
+    to_grant: Set[Tuple[int, int]] = set()
+    to_revoke: Set[Tuple[int, int]] = set()
+    try:
+        if change_in.action in ("grant", "replace"):
+            to_grant = wanted - current
+            if to_grant:
+                _insert_matrix_ignoring_duplicates(db, user_ids=user_ids, instrument_ids=instrument_ids)
+        if change_in.action == "revoke":
+            to_revoke = wanted & current
+            if to_revoke:
+                db.execute(
+                    delete(table).where(
+                        table.c.user_id.in_(user_ids), table.c.instrument_id.in_(instrument_ids)
+                    )
+                )
+        elif change_in.action == "replace":
+            to_revoke = current - wanted
+            if to_revoke:
+                criteria = [table.c.user_id.in_(user_ids)]
+                if instrument_ids:
+                    criteria.append(table.c.instrument_id.not_in(instrument_ids))
+                db.execute(delete(table).where(*criteria))
         db.commit()
-        db.refresh(user)
-        
-    return user
\ No newline at end of file
+    except Exception:
+        db.rollback()
+        raise
+
+    for user_id in user_ids:
+        invalidate_permissions(user_id)
+    return sorted(to_grant), sorted(to_revoke)
+
+def _insert_matrix_ignoring_duplicates(
+    db: Session, *, user_ids: Sequence[int], instrument_ids: Sequence[int]
+) -> None:
+    """
+    INSERT every user x instrument pair with a single INSERT ... SELECT.
+    """
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    matrix = (
+        select(User.id, Instrument.id)
+        .join(Instrument, true())  # explicit cross join
+        .where(User.id.in_(user_ids), Instrument.id.in_(instrument_ids))
+    )
+    db.execute(
+        dialect_insert(user_instrument_permission)
+        .from_select(["user_id", "instrument_id"], matrix)
+        .on_conflict_do_nothing()
+    )
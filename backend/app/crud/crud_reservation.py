@@ -1,36 +1,167 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional, Tuple
-from datetime import datetime
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import Select, or_, and_, func, insert, select, tuple_, update as sql_update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+from datetime import datetime, timedelta
 from datetime import date 
+from itertools import count
 
-from app.models.reservation import Reservation
-from app.schemas.reservation import ReservationCreate, ReservationUpdate
+from app.models.reservation import Reservation, ReservationStatus, NO_OVERLAP_CONSTRAINT
+from app.models.user import User
+from app.models.instrument import Instrument
+from app.schemas.reservation import (
+    RecurrenceRule, ReservationBatchCreate, ReservationBatchItem, ReservationCreate, ReservationUpdate,
+)
+from app.core import events
+from app.crud import analytics, availability, lifecycle
+from app.crud.pagination import (
+    Page, TotalMode, acount_total, count_total, decode_cursor, next_cursor,
+)
 
-def get(db: Session, id: int) -> Optional[Reservation]:
+class ReservationConflictError(Exception):
     """
-    Get a single reservation by its ID.
+    Raised when a reservation would overlap an active reservation of the same instrument.
     """
-    return db.query(Reservation).filter(Reservation.id == id).first()
+
+# --- Loader Strategies ---
+# The Reservation response schema nests a full User (including authorized_instruments)
+# and a full Instrument. Without explicit loaders, serializing a page fires one lazy
+# load per row and relationship. Each list below keeps a page at a fixed number of
+# statements, whatever its size.
+
+# Pages owned by a single user: the owner and the handful of instruments repeat on
+# every row, so a JOIN costs almost nothing and saves a round-trip.
+OWNER_PAGE_OPTIONS = (
+    joinedload(Reservation.user).selectinload(User.authorized_instruments),
+    joinedload(Reservation.instrument),
+)
+
+# Pages spanning many users (admin list, instrument schedule): joining each owner's
+# permission list would multiply the result rows, so the users and their instruments
+# are fetched with one IN query each instead.
+MIXED_PAGE_OPTIONS = (
+    selectinload(Reservation.user).selectinload(User.authorized_instruments),
+    joinedload(Reservation.instrument),
+)
+
+async def aget(db: AsyncSession, id: int, *, reload: bool = False) -> Optional[Reservation]:
+    """
+    Get a single reservation by its ID, with its user and instrument loaded.
+    `reload` refreshes an instance the session already holds, e.g. after a write.
+    """
+    statement = select(Reservation).options(*OWNER_PAGE_OPTIONS).where(Reservation.id == id)
+    if reload:
+        statement = statement.execution_options(populate_existing=True)
+    return await db.scalar(statement)
+
+def _newest_first(query, *, skip: int, limit: int, cursor: Optional[str]):
+    """
+    Order newest first by (start_time, id) and apply keyset or offset pagination.
+    With a cursor, the page starts right after the sort key the cursor encodes.
+    """
+    if cursor:
+        start_time, reservation_id = decode_cursor(cursor, (datetime, int))
+        query = query.filter(
+            tuple_(Reservation.start_time, Reservation.id) < (start_time, reservation_id)
+        )
+    query = query.order_by(Reservation.start_time.desc(), Reservation.id.desc())
+    if not cursor:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def _newest_first_key(reservation: Reservation) -> Tuple[datetime, int]:
+    return reservation.start_time, reservation.id
+
+# --- Entity Pages ---
+# The list functions below have a sync version for scripts and an async one for the
+# endpoints. Both run the same statements, built once by the _*_page helpers.
+class _PageQuery(NamedTuple):
+    filtered: Select  # the filtered rows, for the total
+    page: Select      # one page of them, with its loader options
+    limit: int
+    cache_key: Tuple[Any, ...]
+    estimate_table: Optional[str] = None
+
+def _page(db: Session, query: _PageQuery, *, total_mode: TotalMode) -> Page:
+    total = count_total(
+        db, query.filtered, mode=total_mode,
+        cache_key=query.cache_key, estimate_table=query.estimate_table,
+    )
+    data = list(db.scalars(query.page))
+    return Page(data, total, next_cursor(data, query.limit, _newest_first_key))
+
+async def _apage(db: AsyncSession, query: _PageQuery, *, total_mode: TotalMode) -> Page:
+    total = await acount_total(
+        db, query.filtered, mode=total_mode,
+        cache_key=query.cache_key, estimate_table=query.estimate_table,
+    )
+    data = list(await db.scalars(query.page))
+    return Page(data, total, next_cursor(data, query.limit, _newest_first_key))
+
+def _user_page(*, user_id: int, skip: int, limit: int, cursor: Optional[str]) -> _PageQuery:
+    statement = select(Reservation).where(Reservation.user_id == user_id)
+    return _PageQuery(
+        filtered=statement,
+        page=_newest_first(statement.options(*OWNER_PAGE_OPTIONS), skip=skip, limit=limit, cursor=cursor),
+        limit=limit,
+        cache_key=("reservations", "user", user_id),
+    )
 
 def get_multi_by_user(
-    db: Session, *, user_id: int, skip: int = 0, limit: int = 100
-) -> Tuple[List[Reservation], int]: # Return a tuple
+    db: Session,
+    *,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
     """
     Get all reservations for a specific user, with pagination and total count.
+    Pass the previous page's `next_cursor` as `cursor` to page by keyset instead of offset.
     """
-    query = db.query(Reservation).filter(Reservation.user_id == user_id)
-    
-    total = query.count()
-    
-    data = (
-        query.order_by(Reservation.start_time.desc())
+    return _page(
+        db, _user_page(user_id=user_id, skip=skip, limit=limit, cursor=cursor), total_mode=total_mode
+    )
+
+async def aget_multi_by_user(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
+    """
+    Async version of get_multi_by_user.
+    """
+    return await _apage(
+        db, _user_page(user_id=user_id, skip=skip, limit=limit, cursor=cursor), total_mode=total_mode
+    )
+
+def _upcoming_criteria(instrument_id: int) -> list:
+    """
+    Filter for the ACTIVE (confirmed or pending) reservations of an instrument from today on.
+    """
+    today = date.today()
+    return [
+        Reservation.instrument_id == instrument_id,
+        Reservation.start_time >= today,
+        # --- THIS IS THE CRUCIAL FIX ---
+        Reservation.status.in_(["confirmed", "pending"]),
+    ]
+
+def _instrument_page(*, instrument_id: int, skip: int, limit: int) -> Select:
+    return (
+        select(Reservation)
+        .options(*MIXED_PAGE_OPTIONS)
+        .where(*_upcoming_criteria(instrument_id))
+        .order_by(Reservation.start_time)
         .offset(skip)
         .limit(limit)
-        .all()
     )
-    
-    return data, total
 
 def get_multi_by_instrument(
     db: Session, *, instrument_id: int, skip: int = 0, limit: int = 100
@@ -38,19 +169,46 @@ def get_multi_by_instrument(
     """
     Get all ACTIVE (confirmed or pending) future reservations for a specific instrument.
     """
-    today = date.today()
+    return list(db.scalars(_instrument_page(instrument_id=instrument_id, skip=skip, limit=limit)))
+
+async def aget_multi_by_instrument(
+    db: AsyncSession, *, instrument_id: int, skip: int = 0, limit: int = 100
+) -> List[Reservation]:
+    """
+    Async version of get_multi_by_instrument.
+    """
+    return list(await db.scalars(_instrument_page(instrument_id=instrument_id, skip=skip, limit=limit)))
+
+def _conflict_statement(
+    db: Union[Session, AsyncSession], *, instrument_id: int, start_time: datetime, end_time: datetime
+) -> Select:
+    """
+    Select the id of one active reservation overlapping the timeslot, if any.
+    """
+    # A timeslot is unavailable if there is any existing reservation that overlaps with it.
+    # An overlap occurs if:
+    # (Existing Start < New End) AND (Existing End > New Start)
+    if _is_postgresql(db):
+        # Same predicate, phrased as a range overlap so that PostgreSQL can answer it
+        # from the GiST index behind the no-overlap exclusion constraint.
+        overlap = func.tsrange(Reservation.start_time, Reservation.end_time).op("&&")(
+            func.tsrange(start_time, end_time)
+        )
+    else:
+        overlap = and_(
+            Reservation.start_time < end_time,
+            Reservation.end_time > start_time,
+        )
+
     return (
-        db.query(Reservation)
-        .filter(
+        select(Reservation.id)
+        .where(
             Reservation.instrument_id == instrument_id,
-            Reservation.start_time >= today,
-            # --- THIS IS THE CRUCIAL FIX ---
-            Reservation.status.in_(["confirmed", "pending"])
+            # We only care about confirmed or pending reservations
+            Reservation.status.in_(["confirmed", "pending"]),
+            overlap,
         )
-        .order_by(Reservation.start_time)
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .limit(1)
     )
 
 def is_timeslot_available(
@@ -60,53 +218,281 @@ def is_timeslot_available(
     Check if a given timeslot for an instrument is available.
     Returns True if available, False if there is a conflict.
     """
-    # A timeslot is unavailable if there is any existing reservation that overlaps with it.
-    # An overlap occurs if:
-    # (Existing Start < New End) AND (Existing End > New Start)
-    conflicting_reservation = (
-        db.query(Reservation)
-        .filter(
-            Reservation.instrument_id == instrument_id,
-            # We only care about confirmed or pending reservations
-            Reservation.status.in_(["confirmed", "pending"]),
-            and_(
-                Reservation.start_time < end_time,
-                Reservation.end_time > start_time,
-            ),
-        )
-        .first()
+    return db.scalar(_conflict_statement(
+        db, instrument_id=instrument_id, start_time=start_time, end_time=end_time
+    )) is None
+
+async def ais_timeslot_available(
+    db: AsyncSession, *, instrument_id: int, start_time: datetime, end_time: datetime
+) -> bool:
+    """
+    Async version of is_timeslot_available.
+    """
+    return await db.scalar(_conflict_statement(
+        db, instrument_id=instrument_id, start_time=start_time, end_time=end_time
+    )) is None
+
+def _is_postgresql(db: Union[Session, AsyncSession]) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def _lock_statement(instrument_id: int):
+    """
+    Serialize bookings of one instrument on databases without the exclusion constraint.
+    The no-op UPDATE takes the instrument's row lock (the database write lock on SQLite),
+    so a concurrent booking waits for this transaction to finish and then sees its row.
+    """
+    return (
+        sql_update(Instrument)
+        .where(Instrument.id == instrument_id)
+        .values(id=Instrument.id)
     )
-    return conflicting_reservation is None
 
-def create_with_owner(
-    db: Session, *, obj_in: ReservationCreate, user_id: int
+async def _acommit_or_conflict(db: AsyncSession) -> None:
+    """
+    Commit, translating a violation of the no-overlap constraint into a booking conflict.
+    """
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if NO_OVERLAP_CONSTRAINT in str(exc.orig):
+            raise ReservationConflictError() from exc
+        raise
+
+def reservation_event(change: str, reservation: Reservation) -> Dict[str, Any]:
+    """
+    The change event published for a reservation (see app/core/events.py).
+    """
+    return {
+        "type": f"reservation.{change}",
+        "reservation_id": reservation.id,
+        "instrument_id": reservation.instrument_id,
+        "user_id": reservation.user_id,
+        "status": reservation.status,
+        "start_time": reservation.start_time.isoformat(),
+        "end_time": reservation.end_time.isoformat(),
+    }
+
+def _record(
+    reservation: Reservation, change: str, previous: Optional[Tuple[int, datetime, datetime]] = None
+) -> None:
+    """
+    Update the availability timelines, the lifecycle schedule and the usage rollups
+    after a commit, and publish the change. `previous` is the (instrument_id, start,
+    end) the reservation had before an update.
+    """
+    event = reservation_event(change, reservation)
+    if previous is not None and previous[0] != reservation.instrument_id:
+        availability.forget_reservation(instrument_id=previous[0], reservation_id=reservation.id)
+        event["previous_instrument_id"] = previous[0]
+    availability.record_reservation(reservation)
+    if reservation.status in availability.ACTIVE_STATUSES:
+        lifecycle.scheduler.schedule([(
+            reservation.id, reservation.instrument_id, reservation.start_time, reservation.end_time
+        )])
+    analytics.maintainer.mark(reservation.instrument_id, reservation.start_time, reservation.end_time)
+    if previous is not None:
+        analytics.maintainer.mark(*previous)
+    events.publish(event)
+
+async def acreate_with_owner(
+    db: AsyncSession, *, obj_in: ReservationCreate, user_id: int
 ) -> Reservation:
+    """
+    Create a reservation, raising ReservationConflictError if the timeslot is taken.
+    On PostgreSQL the exclusion constraint rejects overlaps at commit time; elsewhere
+    the instrument is locked and the availability re-checked inside the transaction.
+    Returns the reservation with its user and instrument loaded.
+    """
+    if not _is_postgresql(db):
+        await db.execute(_lock_statement(obj_in.instrument_id))
+        if not await ais_timeslot_available(
+            db,
+            instrument_id=obj_in.instrument_id,
+            start_time=obj_in.start_time,
+            end_time=obj_in.end_time,
+        ):
+            await db.rollback()
+            raise ReservationConflictError()
+
     db_obj = Reservation(**obj_in.dict(), user_id=user_id)
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await _acommit_or_conflict(db)
+    reservation = await aget(db, db_obj.id, reload=True)
+    _record(reservation, "created")
     
     # --- TODO: Email Notification Interface ---
     # This is the perfect place to trigger an email notification.
-    # We have the user object (via db_obj.user) and reservation details.
-    # Example: send_reservation_confirmation_email(user=db_obj.user, reservation=db_obj)
+    # We have the user object (via reservation.user) and reservation details.
+    # Example: send_reservation_confirmation_email(user=reservation.user, reservation=reservation)
     
-    return db_obj
+    return reservation
+
+# --- Batch Booking ---
+Occurrence = Tuple[datetime, datetime]
+
+def expand_occurrences(batch_in: ReservationBatchCreate, *, limit: int) -> List[Occurrence]:
+    """
+    The (start, end) of every occurrence of a batch, sorted by start: its
+    explicit slots, plus the first slot and its recurrences. Raises ValueError if
+    there are none or more than `limit`.
+    """
+    occurrences = [(slot.start_time, slot.end_time) for slot in batch_in.slots]
+    if batch_in.start_time is not None and batch_in.end_time is not None:
+        start, end = batch_in.start_time, batch_in.end_time
+        if end <= start:
+            raise ValueError("End time must be after start time")
+        if batch_in.recurrence is None:
+            occurrences.append((start, end))
+        else:
+            occurrences += _recurrences(start, end, batch_in.recurrence, limit=limit)
+    elif batch_in.recurrence is not None:
+        raise ValueError("A recurrence needs a start_time and an end_time")
+
+    if not occurrences:
+        raise ValueError("The batch has no occurrences")
+    if len(occurrences) > limit:
+        raise ValueError(f"A batch may have at most {limit} occurrences")
+    return sorted(occurrences)
+
+def _recurrences(start: datetime, end: datetime, rule: RecurrenceRule, *, limit: int) -> List[Occurrence]:
+    """
+    Expand a recurrence rule from its first occurrence, stopping one past `limit`.
+    """
+    if rule.frequency == "daily":
+        candidates = (start + timedelta(days=rule.interval * step) for step in count())
+    else:
+        weekdays = sorted(set(rule.by_weekday or [start.weekday()]))
+        week = start - timedelta(days=start.weekday())  # Monday of the first week
+        candidates = (
+            week + timedelta(weeks=rule.interval * step, days=weekday)
+            for step in count()
+            for weekday in weekdays
+        )
+
+    # Going one past the limit is enough for the caller to reject the batch.
+    most = min(rule.count, limit + 1) if rule.count else limit + 1
+    starts: List[datetime] = []
+    for candidate in candidates:
+        if candidate < start:
+            continue
+        if len(starts) == most or (rule.until is not None and candidate > rule.until):
+            break
+        starts.append(candidate)
+    return [(occurrence, occurrence + (end - start)) for occurrence in starts]
+
+def _batch_conflicts_statement(instrument_id: int, occurrences: Sequence[Occurrence]) -> Select:
+    """
+    Select every active reservation of the instrument overlapping any occurrence.
+    """
+    return select(Reservation.id, Reservation.start_time, Reservation.end_time).where(
+        Reservation.instrument_id == instrument_id,
+        Reservation.status.in_(["confirmed", "pending"]),
+        # The overall span lets the (instrument, start) indexes narrow the scan.
+        Reservation.start_time < max(end for _, end in occurrences),
+        Reservation.end_time > occurrences[0][0],
+        or_(*(
+            and_(Reservation.start_time < end, Reservation.end_time > start)
+            for start, end in occurrences
+        )),
+    ).order_by(Reservation.start_time)
+
+async def acreate_batch_with_owner(
+    db: AsyncSession,
+    *,
+    instrument_id: int,
+    occurrences: Sequence[Occurrence],
+    user_id: int,
+    atomic: bool,
+) -> List[ReservationBatchItem]:
+    """
+    Book many occurrences (sorted by start) of one instrument in one transaction.
+    Conflicts with existing reservations are found with one query, and overlaps
+    between occurrences in memory. The free occurrences are inserted with one
+    statement, unless the batch is atomic and anything conflicts, in which case
+    nothing is booked. Returns one result per occurrence, in order.
+    Raises ReservationConflictError if a concurrent booking took a slot meanwhile.
+    """
+    if not _is_postgresql(db):
+        await db.execute(_lock_statement(instrument_id))
+    existing = (await db.execute(_batch_conflicts_statement(instrument_id, occurrences))).all()
+
+    results: List[ReservationBatchItem] = []
+    previous_end: Optional[datetime] = None
+    for index, (start, end) in enumerate(occurrences):
+        conflicting = next(
+            (row.id for row in existing if row.start_time < end and row.end_time > start), None
+        )
+        overlaps_previous = previous_end is not None and start < previous_end
+        previous_end = max(previous_end or end, end)
+        results.append(ReservationBatchItem(
+            index=index,
+            start_time=start,
+            end_time=end,
+            status="conflict" if conflicting is not None or overlaps_previous else "created",
+            conflicting_reservation_id=conflicting,
+        ))
+
+    to_create = [item for item in results if item.status == "created"]
+    if atomic and len(to_create) < len(results):
+        await db.rollback()
+        for item in to_create:
+            item.status = "skipped"
+        return results
+
+    if to_create:
+        values = [
+            {"instrument_id": instrument_id, "user_id": user_id,
+             "start_time": item.start_time, "end_time": item.end_time}
+            for item in to_create
+        ]
+        # RETURNING order isn't guaranteed for batched inserts; match ids back by start.
+        inserted = dict(
+            (await db.execute(
+                insert(Reservation).returning(Reservation.start_time, Reservation.id), values
+            )).tuples().all()
+        )
+        await _acommit_or_conflict(db)
+        for item in to_create:
+            item.reservation_id = inserted[item.start_time]
+        availability.record_bookings(
+            instrument_id,
+            [(item.reservation_id, item.start_time, item.end_time) for item in to_create],
+        )
+        lifecycle.scheduler.schedule(
+            (item.reservation_id, instrument_id, item.start_time, item.end_time) for item in to_create
+        )
+        for item in to_create:
+            analytics.maintainer.mark(instrument_id, item.start_time, item.end_time)
+            events.publish({
+                "type": "reservation.created",
+                "reservation_id": item.reservation_id,
+                "instrument_id": instrument_id,
+                "user_id": user_id,
+                "status": ReservationStatus.CONFIRMED,
+                "start_time": item.start_time.isoformat(),
+                "end_time": item.end_time.isoformat(),
+            })
+    else:
+        await db.rollback()
+    return results
 
-def update(
-    db: Session, *, db_obj: Reservation, obj_in: ReservationUpdate
+async def aupdate(
+    db: AsyncSession, *, db_obj: Reservation, obj_in: ReservationUpdate
 ) -> Reservation:
     """
-    Update an existing reservation.
+    Update an existing reservation. Returns it with its user and instrument loaded.
     """
+    previous = (db_obj.instrument_id, db_obj.start_time, db_obj.end_time)
     update_data = obj_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
-        
+
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
+    await _acommit_or_conflict(db)
+    reservation = await aget(db, db_obj.id, reload=True)
+    _record(reservation, "updated", previous)
+    return reservation
 
 def remove(db: Session, *, id: int) -> Optional[Reservation]:
     """
@@ -116,8 +502,31 @@ def remove(db: Session, *, id: int) -> Optional[Reservation]:
     if db_obj:
         db.delete(db_obj)
         db.commit()
+        availability.forget_reservation(instrument_id=db_obj.instrument_id, reservation_id=db_obj.id)
+        analytics.maintainer.mark(db_obj.instrument_id, db_obj.start_time, db_obj.end_time)
+        events.publish(reservation_event("deleted", db_obj))
     return db_obj
 
+def _all_criteria(*, user_id: Optional[int], instrument_id: Optional[int]) -> list:
+    criteria = []
+    if user_id is not None:
+        criteria.append(Reservation.user_id == user_id)
+    if instrument_id is not None:
+        criteria.append(Reservation.instrument_id == instrument_id)
+    return criteria
+
+def _all_page(
+    *, user_id: Optional[int], instrument_id: Optional[int], skip: int, limit: int, cursor: Optional[str]
+) -> _PageQuery:
+    statement = select(Reservation).where(*_all_criteria(user_id=user_id, instrument_id=instrument_id))
+    return _PageQuery(
+        filtered=statement,
+        page=_newest_first(statement.options(*MIXED_PAGE_OPTIONS), skip=skip, limit=limit, cursor=cursor),
+        limit=limit,
+        cache_key=("reservations", "all", user_id, instrument_id),
+        estimate_table="reservations" if user_id is None and instrument_id is None else None,
+    )
+
 def get_multi_all(
     db: Session,
     *,
@@ -125,23 +534,144 @@ def get_multi_all(
     instrument_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-) -> Tuple[List[Reservation], int]: # Return a tuple
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
     """
     Get all reservations, with optional filters, and the total count.
+    Pass the previous page's `next_cursor` as `cursor` to page by keyset instead of offset.
     """
-    query = db.query(Reservation)
-    if user_id is not None:
-        query = query.filter(Reservation.user_id == user_id)
-    if instrument_id is not None:
-        query = query.filter(Reservation.instrument_id == instrument_id)
-    
-    total = query.count() # Get the total count BEFORE pagination
-    
-    data = (
-        query.order_by(Reservation.start_time.desc())
+    return _page(db, _all_page(
+        user_id=user_id, instrument_id=instrument_id, skip=skip, limit=limit, cursor=cursor
+    ), total_mode=total_mode)
+
+async def aget_multi_all(
+    db: AsyncSession,
+    *,
+    user_id: Optional[int] = None,
+    instrument_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
+    """
+    Async version of get_multi_all.
+    """
+    return await _apage(db, _all_page(
+        user_id=user_id, instrument_id=instrument_id, skip=skip, limit=limit, cursor=cursor
+    ), total_mode=total_mode)
+
+# --- Summary Projections ---
+# Compact list responses select only the requested columns as plain rows instead of
+# hydrating Reservation entities. Expanded relations are JOINed in and their columns
+# are nested under the relationship name ("user__email" -> {"user": {"email": ...}}).
+SUMMARY_FIELDS = ("id", "start_time", "end_time", "status", "user_id", "instrument_id")
+SUMMARY_EXPANSIONS = ("user", "instrument")
+
+_EXPANSION_COLUMNS = {
+    "user": (Reservation.user, (User.id, User.email, User.full_name, User.role)),
+    "instrument": (
+        Reservation.instrument,
+        (Instrument.id, Instrument.name, Instrument.location, Instrument.status),
+    ),
+}
+
+def _summary_statement(*, fields: Sequence[str], expand: Sequence[str]) -> Select:
+    columns = [getattr(Reservation, name).label(name) for name in fields]
+    for relation in expand:
+        _, relation_columns = _EXPANSION_COLUMNS[relation]
+        columns += [col.label(f"{relation}__{col.key}") for col in relation_columns]
+
+    statement = select(*columns).select_from(Reservation)
+    for relation in expand:
+        statement = statement.join(_EXPANSION_COLUMNS[relation][0])
+    return statement
+
+def _nest_row(row: Any) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for key, value in row._mapping.items():
+        relation, _, name = key.partition("__")
+        if name:
+            result.setdefault(relation, {})[name] = value
+        else:
+            result[key] = value
+    return result
+
+async def aget_multi_all_summary(
+    db: AsyncSession,
+    *,
+    fields: Sequence[str],
+    expand: Sequence[str] = (),
+    user_id: Optional[int] = None,
+    instrument_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
+    """
+    Summary rows for all reservations, with optional filters, and the total count.
+    """
+    criteria = _all_criteria(user_id=user_id, instrument_id=instrument_id)
+    total = await acount_total(
+        db,
+        select(Reservation).where(*criteria),
+        mode=total_mode,
+        cache_key=("reservations", "all", user_id, instrument_id),
+        estimate_table="reservations" if not criteria else None,
+    )
+    statement = _all_summary_statement(
+        fields=fields, expand=expand, criteria=criteria, skip=skip, limit=limit, cursor=cursor
+    )
+    return _all_summary_page(await db.execute(statement), fields=fields, total=total, limit=limit)
+
+def _all_summary_statement(
+    *,
+    fields: Sequence[str],
+    expand: Sequence[str],
+    criteria: list,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+) -> Select:
+    # The sort key is needed for the next cursor even when it was not requested.
+    selected = list(fields) if "start_time" in fields else [*fields, "start_time"]
+    statement = _summary_statement(fields=selected, expand=expand).where(*criteria)
+    return _newest_first(statement, skip=skip, limit=limit, cursor=cursor)
+
+def _all_summary_page(rows: Any, *, fields: Sequence[str], total: Optional[int], limit: int) -> Page:
+    data = [_nest_row(row) for row in rows]
+    cursor_out = next_cursor(data, limit, lambda row: (row["start_time"], row["id"]))
+    if "start_time" not in fields:
+        for row in data:
+            del row["start_time"]
+    return Page(data, total, cursor_out)
+
+def _instrument_summary_statement(
+    *, instrument_id: int, fields: Sequence[str], expand: Sequence[str], skip: int, limit: int
+) -> Select:
+    return (
+        _summary_statement(fields=fields, expand=expand)
+        .where(*_upcoming_criteria(instrument_id))
+        .order_by(Reservation.start_time)
         .offset(skip)
         .limit(limit)
-        .all()
     )
-    
-    return data, total
\ No newline at end of file
+
+async def aget_multi_by_instrument_summary(
+    db: AsyncSession,
+    *,
+    instrument_id: int,
+    fields: Sequence[str],
+    expand: Sequence[str] = (),
+    skip: int = 0,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """
+    Summary rows for the ACTIVE upcoming reservations of an instrument.
+    """
+    rows = await db.execute(_instrument_summary_statement(
+        instrument_id=instrument_id, fields=fields, expand=expand, skip=skip, limit=limit
+    ))
+    return [_nest_row(row) for row in rows]
@@ -0,0 +1,329 @@
+"""
+Telemetry from the instrument PCs.
+
+The desktop client sends a heartbeat every few seconds saying whether a session is
+in progress, and reports when a session starts and ends, optionally with usage
+counters. Reports go into the append-only instrument_telemetry table through a
+BatchWriter, so a few hundred PCs cost one multi-row INSERT per flush interval, not
+a transaction per heartbeat; plain heartbeats are only stored every
+TELEMETRY_HEARTBEAT_SAMPLE_SECONDS per instrument.
+
+Whether each instrument is in use is kept in memory by a PresenceTracker and only
+written to instruments.reported_in_use when it changes, or when this worker has not
+confirmed it for TELEMETRY_OFFLINE_SECONDS; the instrument's status follows it (see
+lifecycle.py). A PresenceMonitor thread clears the reported state of instruments
+whose PC went silent. It judges by the stored rows, so that heartbeats received by
+any worker count.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_instrument, lifecycle
+from app.crud.lifecycle import ChangedInstrument
+from app.db.batch_writer import BatchWriter
+from app.db.session import SessionLocal
+from app.models.instrument import Instrument
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.telemetry import InstrumentTelemetry, TelemetryKind
+
+logger = logging.getLogger(__name__)
+
+_NO_SYNC = {"synchronize_session": False}
+
+# --- Background Writer ---
+# Started and stopped with the application (see main.py), like the access log writer.
+telemetry_writer = BatchWriter(
+    InstrumentTelemetry.__table__,
+    session_factory=SessionLocal,
+    batch_size=settings.TELEMETRY_BATCH_SIZE,
+    flush_interval=settings.TELEMETRY_FLUSH_INTERVAL_SECONDS,
+    max_queue=settings.TELEMETRY_QUEUE_SIZE,
+    # Only the presence monitor thread ever waits for room; requests never block.
+    enqueue_timeout=1.0,
+    retries=settings.BATCH_WRITE_RETRIES,
+    retry_backoff=settings.BATCH_WRITE_RETRY_BACKOFF_SECONDS,
+    dead_letter_path=Path(settings.BATCH_WRITE_DEAD_LETTER_DIR) / "telemetry.jsonl",
+    name="telemetry",
+)
+
+# --- Presence ---
+class _Presence:
+    __slots__ = ("in_use", "confirmed_at", "seen_at", "stored_at")
+
+    def __init__(self) -> None:
+        self.in_use: Optional[bool] = None
+        # time.monotonic() of the last database write or check of `in_use`, the last
+        # report, and the last stored report.
+        self.confirmed_at = float("-inf")
+        self.seen_at = float("-inf")
+        self.stored_at = float("-inf")
+
+class PresenceTracker:
+    """
+    The last reported state of every instrument PC this worker heard from.
+    """
+    def __init__(self, *, offline_after: float, sample_interval: float):
+        self.offline_after = offline_after
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._presence: Dict[int, _Presence] = {}
+        self._stats = {"reports": 0, "stored": 0, "state_writes": 0, "unknown_instruments": 0}
+
+    def observe(self, instrument_id: int, *, in_use: bool, store: bool, now: float) -> Tuple[bool, bool]:
+        """
+        Note a report received at `now` (monotonic). Returns whether to store it (always
+        if `store`, otherwise once per sample interval) and whether the reported state
+        must be written to the database: when it changed, when it was last confirmed
+        long ago, or after a silence long enough for the PC to have been marked
+        offline (its last stored report may be a sample interval older than its last
+        report).
+        """
+        with self._lock:
+            presence = self._presence.get(instrument_id)
+            if presence is None:
+                presence = self._presence[instrument_id] = _Presence()
+            write = (
+                presence.in_use != in_use
+                or now - presence.confirmed_at >= self.offline_after
+                or now - presence.seen_at >= self.offline_after - self.sample_interval
+            )
+            presence.seen_at = now
+            store = store or now - presence.stored_at >= self.sample_interval
+            if store:
+                presence.stored_at = now
+            self._stats["reports"] += 1
+            self._stats["stored"] += store
+            self._stats["state_writes"] += write
+        return store, write
+
+    def confirm(self, instrument_id: int, *, in_use: bool, now: float) -> None:
+        """
+        Note that the database holds `in_use` for the instrument as of `now`.
+        """
+        with self._lock:
+            presence = self._presence.get(instrument_id)
+            if presence is not None:
+                presence.in_use = in_use
+                presence.confirmed_at = now
+
+    def forget(self, instrument_ids: Iterable[int], *, unknown: bool = False) -> None:
+        with self._lock:
+            for instrument_id in instrument_ids:
+                self._presence.pop(instrument_id, None)
+                self._stats["unknown_instruments"] += unknown
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            online = [p for p in self._presence.values() if now - p.seen_at < self.offline_after]
+            return {
+                **self._stats,
+                "tracked": len(self._presence),
+                "online": len(online),
+                "in_use": sum(1 for p in online if p.in_use),
+            }
+
+presence = PresenceTracker(
+    offline_after=settings.TELEMETRY_OFFLINE_SECONDS,
+    sample_interval=settings.TELEMETRY_HEARTBEAT_SAMPLE_SECONDS,
+)
+
+# --- Reported State ---
+def report_state(
+    db: Session, *, instrument_id: int, in_use: bool, now: datetime
+) -> Optional[List[ChangedInstrument]]:
+    """
+    Record whether the instrument's PC reports a session in progress, and bring the
+    instrument's status in line. Returns the instruments changed, or None if there is
+    no such instrument. The caller commits.
+    """
+    updated = db.execute(
+        update(Instrument)
+        .where(Instrument.id == instrument_id, Instrument.reported_in_use.is_distinct_from(in_use))
+        .values(reported_in_use=in_use)
+        .returning(Instrument.id),
+        execution_options=_NO_SYNC,
+    ).first()
+    if updated is None and db.scalar(select(Instrument.id).where(Instrument.id == instrument_id)) is None:
+        return None
+    return lifecycle.sync_instrument_status(db, now=now, instrument_ids=[instrument_id])
+
+def mark_offline(
+    db: Session, *, now: datetime, offline_after: float
+) -> Tuple[List[int], List[ChangedInstrument]]:
+    """
+    Clear the reported state of instruments with nothing stored in the last
+    `offline_after` seconds, and bring their status in line. Returns the instruments
+    gone offline and those whose status changed. The caller commits.
+    """
+    recent = exists().where(
+        InstrumentTelemetry.instrument_id == Instrument.id,
+        InstrumentTelemetry.timestamp > now - timedelta(seconds=offline_after),
+    )
+    offline = list(db.scalars(
+        update(Instrument)
+        .where(Instrument.reported_in_use.is_not(None), ~recent)
+        .values(reported_in_use=None)
+        .returning(Instrument.id),
+        execution_options=_NO_SYNC,
+    ))
+    changed = lifecycle.sync_instrument_status(db, now=now, instrument_ids=offline) if offline else []
+    return offline, changed
+
+# --- Ingestion ---
+def _booked_user_statement(instrument_id: int, now: datetime):
+    """
+    Select the owner of the instrument's confirmed reservation at `now`, if any.
+    """
+    return select(Reservation.user_id).where(
+        Reservation.instrument_id == instrument_id,
+        Reservation.status == ReservationStatus.CONFIRMED,
+        Reservation.start_time <= now,
+        Reservation.end_time > now,
+    ).limit(1)
+
+async def aingest(
+    db: AsyncSession,
+    *,
+    instrument_id: int,
+    kind: TelemetryKind,
+    in_use: bool,
+    counters: Optional[Dict[str, float]] = None,
+) -> bool:
+    """
+    Take one report of an instrument PC. Only state changes, and a periodic check
+    per instrument, reach the database inside the request; the report itself is
+    queued for the background writer. A stored report is attributed to the owner of
+    the reservation in progress. Returns False if there is no such instrument.
+    """
+    now = datetime.utcnow()
+    clock = time.monotonic()
+    store, write = presence.observe(
+        instrument_id,
+        in_use=in_use,
+        store=kind != TelemetryKind.HEARTBEAT or counters is not None,
+        now=clock,
+    )
+    if write:
+        changed = await db.run_sync(report_state, instrument_id=instrument_id, in_use=in_use, now=now)
+        if changed is None:
+            await db.rollback()
+            presence.forget([instrument_id], unknown=True)
+            return False
+        await db.commit()
+        presence.confirm(instrument_id, in_use=in_use, now=clock)
+        if changed:
+            await crud_instrument.catalog_cache.abump()
+        lifecycle.publish_instrument_changes(changed)
+    if store:
+        row = {
+            "timestamp": now,
+            "instrument_id": instrument_id,
+            "kind": kind.value,
+            "user_id": await db.scalar(_booked_user_statement(instrument_id, now)),
+            "in_use": in_use,
+            "counters": counters,
+        }
+        if not (telemetry_writer.running and telemetry_writer.submit_nowait(row)):
+            await db.execute(insert(InstrumentTelemetry.__table__), [row])
+            await db.commit()
+    return True
+
+# --- Offline Detection ---
+class PresenceMonitor:
+    """
+    Marks instruments whose PC stopped reporting as offline, from a background thread,
+    every half `offline_after` seconds. Safe to run in every worker: the UPDATE only
+    returns the instruments it actually changed.
+    """
+    def __init__(self, *, session_factory: Callable[[], Session], offline_after: float, name: str):
+        self.session_factory = session_factory
+        self.offline_after = offline_after
+        self.name = name
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {"runs": 0, "failures": 0, "went_offline": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-monitor", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: Optional[float] = 10.0) -> None:
+        if not self.running:
+            return
+        self._stopping.set()
+        assert self._thread is not None
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.offline_after / 2):
+            try:
+                self.check()
+            except Exception:
+                with self._stats_lock:
+                    self._stats["failures"] += 1
+                logger.exception("%s monitor failed", self.name)
+
+    def check(self) -> List[int]:
+        """
+        Mark the instruments gone silent as offline; returns their ids.
+        """
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            offline, changed = mark_offline(db, now=now, offline_after=self.offline_after)
+            db.commit()
+        presence.forget(offline)
+        for instrument_id in offline:
+            row = {
+                "timestamp": now,
+                "instrument_id": instrument_id,
+                "kind": TelemetryKind.OFFLINE.value,
+                "user_id": None,
+                "in_use": None,
+                "counters": None,
+            }
+            if telemetry_writer.running:
+                telemetry_writer.submit(row)
+        if changed:
+            crud_instrument.catalog_cache.bump()
+        lifecycle.publish_instrument_changes(changed)
+        with self._stats_lock:
+            self._stats["runs"] += 1
+            self._stats["went_offline"] += len(offline)
+        return offline
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {**self._stats, "running": self.running}
+
+# Started and stopped with the application (see main.py).
+presence_monitor = PresenceMonitor(
+    session_factory=SessionLocal,
+    offline_after=settings.TELEMETRY_OFFLINE_SECONDS,
+    name="telemetry",
+)
+
+def telemetry_stats() -> Dict[str, Any]:
+    return {
+        "writer": telemetry_writer.stats(),
+        "presence": presence.stats(),
+        "monitor": presence_monitor.stats(),
+    }
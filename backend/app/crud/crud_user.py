@@ -1,85 +1,305 @@
-from sqlalchemy.orm import Session
-from typing import Optional, List, cast, Tuple
+from sqlalchemy import Select, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional, List, NamedTuple, Set, cast, Tuple, Sequence, Dict, Any
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import (
+    get_password_hashes, aget_password_hash, averify_and_update_password,
+)
 from app.models.user import User, UserRole
-from app.schemas.user import UserCreate
+from app.models.instrument import Instrument
+from app.models.permission import user_instrument_permission
+from app.crud.pagination import Page, TotalMode, acount_total, decode_cursor, next_cursor
+from app.schemas.user import UserCreate, UserImportRow
 
-def get(db: Session, id: int) -> Optional[User]:
-    return db.query(User).filter(User.id == id).first()
-
-def get_user_by_email(db: Session, *, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+# Users are loaded with authorized_instruments up front, as the User response schema
+# includes it and it can't be lazily loaded once the request is serialized.
+async def aget(db: AsyncSession, id: int, *, reload: bool = False) -> Optional[User]:
+    """
+    Get a single user by ID. `reload` refreshes an instance the session already holds.
+    """
+    statement = (
+        select(User).options(selectinload(User.authorized_instruments)).where(User.id == id)
+    )
+    if reload:
+        statement = statement.execution_options(populate_existing=True)
+    return await db.scalar(statement)
 
-def create_user(db: Session, *, obj_in: UserCreate) -> User:
-    db_obj_data = obj_in.dict(exclude={"password"})
-    db_obj = User(
-        **db_obj_data,
-        hashed_password=get_password_hash(obj_in.password)
+async def aget_user_by_email(db: AsyncSession, *, email: str) -> Optional[User]:
+    return await db.scalar(
+        select(User).options(selectinload(User.authorized_instruments)).where(User.email == email)
     )
+
+# --- Principal Cache ---
+# Authenticated requests only need a few columns of the caller to authorize them.
+# They are cached per token, so most requests don't touch the users table at all.
+class Principal(NamedTuple):
+    id: int
+    role: UserRole
+    is_active: bool
+
+_principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS, name="principal"
+)
+
+async def aget_principal(
+    db: AsyncSession, *, user_id: int, token_id: Optional[str]
+) -> Optional[Principal]:
+    """
+    Return the authorization data of a user for one of their tokens, from the cache
+    when possible. Returns None (and caches nothing) if the user does not exist.
+    """
+    key = (user_id, token_id)
+    principal = _principal_cache.get(key)
+    if principal is None:
+        row = (
+            await db.execute(select(User.id, User.role, User.is_active).where(User.id == user_id))
+        ).first()
+        if row is None:
+            return None
+        principal = Principal(id=row.id, role=row.role, is_active=row.is_active)
+        _principal_cache.set(key, principal)
+    return principal
+
+def invalidate_principal(user_id: int) -> None:
+    """
+    Forget the cached authorization data of every token of a user.
+    """
+    _principal_cache.invalidate(lambda key: key[0] == user_id)
+
+def principal_cache_stats() -> dict:
+    return _principal_cache.stats()
+
+async def acreate_user(db: AsyncSession, *, obj_in: UserCreate) -> User:
+    """
+    Create a user; bcrypt runs in the hashing pool.
+    """
+    hashed_password = await aget_password_hash(obj_in.password)
+    db_obj = User(**obj_in.dict(exclude={"password"}), hashed_password=hashed_password)
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await db.commit()
+    return await aget(db, db_obj.id, reload=True)
+
+async def aset_password_hash(db: AsyncSession, *, db_obj: User, hashed_password: str) -> User:
+    """
+    Replace a user's stored hash, e.g. when it is upgraded to the current parameters.
+    """
+    db_obj.hashed_password = hashed_password
+    db.add(db_obj)
+    await db.commit()
     return db_obj
 
-def authenticate_user(db: Session, *, email: str, password: str) -> Optional[User]:
-    user = get_user_by_email(db, email=email)
+async def aauthenticate_user(db: AsyncSession, *, email: str, password: str) -> Optional[User]:
+    """
+    Return the active user with these credentials, or None; bcrypt runs in the
+    hashing pool. Outdated hashes are upgraded.
+    """
+    user = await db.scalar(select(User).where(User.email == email))
     if not user: return None
     if user.is_active is False: return None
-    if not verify_password(password, user.hashed_password): return None
+    verified, new_hash = await averify_and_update_password(password, user.hashed_password)
+    if not verified: return None
+    if new_hash: await aset_password_hash(db, db_obj=user, hashed_password=new_hash)
     return user
 
-def create_multi(db: Session, *, users_in: List[UserCreate]) -> List[User]:
-    created_users: List[User] = []
-    for user_in in users_in:
-        existing_user = get_user_by_email(db, email=user_in.email)
-        if existing_user:
-            continue
-        user = create_user(db=db, obj_in=user_in)
-        created_users.append(user)
-    return created_users
-
-def remove(db: Session, *, id: int) -> User | None:
-    user_to_delete = db.query(User).get(id)
+# --- Bulk Import ---
+EMAIL_LOOKUP_CHUNK = 10000
+
+def get_existing_emails(db: Session, *, emails: Sequence[str]) -> Set[str]:
+    """
+    Return which of `emails` are already registered, with one IN query per
+    EMAIL_LOOKUP_CHUNK addresses.
+    """
+    existing: Set[str] = set()
+    for start in range(0, len(emails), EMAIL_LOOKUP_CHUNK):
+        chunk = emails[start:start + EMAIL_LOOKUP_CHUNK]
+        existing.update(db.scalars(select(User.email).where(User.email.in_(chunk))))
+    return existing
+
+def import_users(db: Session, *, rows: Sequence[Tuple[int, UserCreate]]) -> List[UserImportRow]:
+    """
+    Create many users at once. `rows` pairs each user with its row number in the upload.
+
+    Emails that already exist, or repeat an earlier row, are skipped. The remaining
+    passwords are hashed in parallel and all users are inserted with one statement in
+    one transaction, so an import either lands completely or not at all.
+    Returns one result per row, in row order.
+    """
+    results: Dict[int, UserImportRow] = {}
+    existing = get_existing_emails(db, emails=list({user_in.email for _, user_in in rows}))
+    seen: Set[str] = set()
+    to_create: List[Tuple[int, UserCreate]] = []
+    for row, user_in in rows:
+        if user_in.email in existing:
+            results[row] = UserImportRow(row=row, email=user_in.email, status="exists")
+        elif user_in.email in seen:
+            results[row] = UserImportRow(row=row, email=user_in.email, status="duplicate")
+        else:
+            seen.add(user_in.email)
+            to_create.append((row, user_in))
+
+    if to_create:
+        hashes = get_password_hashes([user_in.password for _, user_in in to_create])
+        values = [
+            {**user_in.dict(exclude={"password"}), "hashed_password": hashed_password}
+            for (_, user_in), hashed_password in zip(to_create, hashes)
+        ]
+        try:
+            # RETURNING order isn't guaranteed for batched inserts; match ids back by email.
+            inserted = dict(
+                db.execute(insert(User).returning(User.email, User.id), values).tuples().all()
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        for row, user_in in to_create:
+            results[row] = UserImportRow(
+                row=row, email=user_in.email, status="created", id=inserted[user_in.email]
+            )
+
+    return [results[row] for row, _ in rows]
+
+async def aremove(db: AsyncSession, *, id: int) -> User | None:
+    user_to_delete = await aget(db, id)
     if user_to_delete:
-        db.delete(user_to_delete)
-        db.commit()
+        await db.delete(user_to_delete)
+        await db.commit()
+        invalidate_principal(id)
     return user_to_delete
 
-def get_multi(
-    db: Session, *, search: Optional[str] = None, skip: int = 0, limit: int = 100
-) -> Tuple[List[User], int]:
-    query = db.query(User)
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (User.full_name.ilike(search_term)) | (User.email.ilike(search_term))
-        )
-    
-    total = query.count() # Get total count before pagination
-    data = query.order_by(User.id).offset(skip).limit(limit).all()
-    
-    return data, total
+def _search_criteria(search: Optional[str]) -> list:
+    if not search:
+        return []
+    search_term = f"%{search}%"
+    return [(User.full_name.ilike(search_term)) | (User.email.ilike(search_term))]
+
+def _by_id(query, *, skip: int, limit: int, cursor: Optional[str]):
+    """
+    Order by id and apply keyset (cursor) or offset pagination.
+    """
+    if cursor:
+        (last_id,) = decode_cursor(cursor, (int,))
+        query = query.filter(User.id > last_id)
+    query = query.order_by(User.id)
+    if not cursor:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+async def aget_multi(
+    db: AsyncSession,
+    *,
+    search: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
+    """
+    Get users, optionally filtered by a name or email search, and the total count.
+    """
+    statement = select(User).where(*_search_criteria(search))
+    total = await acount_total(
+        db,
+        statement,
+        mode=total_mode,
+        cache_key=("users", search),
+        estimate_table="users" if not search else None,
+    )
+    data = list(await db.scalars(_by_id(
+        statement.options(selectinload(User.authorized_instruments)),
+        skip=skip, limit=limit, cursor=cursor,
+    )))
+    return Page(data, total, next_cursor(data, limit, lambda user: (user.id,)))
 
 from app.schemas.user import UserUpdate # Add this to your imports
 
-def update(db: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
+async def aupdate(db: AsyncSession, *, db_obj: User, obj_in: UserUpdate) -> User:
     """
-    Update a user's data.
+    Update a user's data; a new password is hashed in the hashing pool.
     """
     update_data = obj_in.dict(exclude_unset=True)
 
     if "password" in update_data and update_data["password"]:
-        hashed_password = get_password_hash(update_data["password"])
-        db_obj.hashed_password = hashed_password
-    
+        db_obj.hashed_password = await aget_password_hash(update_data["password"])
+
     if "full_name" in update_data:
         db_obj.full_name = update_data["full_name"]
-        
+
     if "role" in update_data:
         db_obj.role = UserRole(update_data["role"])
 
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
\ No newline at end of file
+    await db.commit()
+    invalidate_principal(db_obj.id)
+    return await aget(db, db_obj.id, reload=True)
+
+# --- Summary Projections ---
+# Compact list responses select only the requested user columns. When the instrument
+# list is expanded it is fetched for the whole page with a single query.
+SUMMARY_FIELDS = ("id", "email", "full_name", "role", "is_active")
+SUMMARY_EXPANSIONS = ("authorized_instruments",)
+
+async def aget_multi_summary(
+    db: AsyncSession,
+    *,
+    fields: Sequence[str],
+    expand: Sequence[str] = (),
+    search: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+) -> Page:
+    """
+    Summary rows for users, optionally filtered by a search, and the total count.
+    """
+    criteria = _search_criteria(search)
+    total = await acount_total(
+        db,
+        select(User).where(*criteria),
+        mode=total_mode,
+        cache_key=("users", search),
+        estimate_table="users" if not criteria else None,
+    )
+
+    statement = _summary_statement(fields=fields, criteria=criteria)
+    rows = await db.execute(_by_id(statement, skip=skip, limit=limit, cursor=cursor))
+    data = [dict(row._mapping) for row in rows]
+
+    if "authorized_instruments" in expand and data:
+        _attach_instruments(data, await db.execute(_instruments_statement(data)))
+
+    return Page(data, total, next_cursor(data, limit, lambda row: (row["id"],)))
+
+def _summary_statement(*, fields: Sequence[str], criteria: list) -> Select:
+    columns = [getattr(User, name).label(name) for name in fields]
+    return select(*columns).select_from(User).where(*criteria)
+
+def _instruments_statement(data: List[Dict[str, Any]]) -> Select:
+    """
+    Select the instruments of every user on a summary page with one IN query.
+    """
+    return (
+        select(
+            user_instrument_permission.c.user_id,
+            Instrument.id,
+            Instrument.name,
+            Instrument.location,
+            Instrument.status,
+        )
+        .join(Instrument, Instrument.id == user_instrument_permission.c.instrument_id)
+        .where(user_instrument_permission.c.user_id.in_([row["id"] for row in data]))
+        .order_by(Instrument.id)
+    )
+
+def _attach_instruments(data: List[Dict[str, Any]], permission_rows: Any) -> None:
+    by_user: Dict[int, List[Dict[str, Any]]] = {row["id"]: [] for row in data}
+    for user_id, instrument_id, name, location, status in permission_rows:
+        by_user[user_id].append(
+            {"id": instrument_id, "name": name, "location": location, "status": status}
+        )
+    for row in data:
+        row["authorized_instruments"] = by_user[row["id"]]
@@ -0,0 +1,407 @@
+"""
+Reservation lifecycle transitions.
+
+A reservation leaves the active (pending or confirmed) set once it has ended:
+pending ones that were never confirmed become missed. Confirmed ones become missed
+only if their instrument's PC reported during the reservation (see
+crud_telemetry.py) without a kiosk unlock or an in-use heartbeat; all others,
+including every reservation of an instrument whose PC reports nothing, are
+completed. While an active reservation is running its instrument is marked in use,
+and available again afterwards, unless the PC reports whether it is in use, which
+then decides; instruments under maintenance are left alone.
+
+Each API worker runs a LifecycleScheduler thread (started in main.py). It keeps the
+starts and ends due within RESERVATION_LIFECYCLE_HORIZON_SECONDS in a heap, sleeps
+until the earliest one and applies everything due with a few batched UPDATEs. Every
+UPDATE re-checks status and time in its WHERE clause, so an event applied twice, by
+a restarted worker or by several workers, changes nothing the second time; on
+PostgreSQL an advisory lock keeps the workers from applying them at the same moment.
+Whenever the horizon is reloaded, a sweep catches up on whatever came due while no
+worker was running.
+"""
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core import events
+from app.core.config import settings
+from app.crud import analytics, availability, crud_instrument
+from app.db.session import SessionLocal
+from app.models.instrument import Instrument, InstrumentStatus
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.telemetry import InstrumentTelemetry, TelemetryKind
+
+logger = logging.getLogger(__name__)
+
+# Key of the PostgreSQL advisory lock serializing transitions across workers.
+ADVISORY_LOCK_KEY = 0x52455356  # "RESV"
+
+# After a failure, the schedule is reloaded (and the missed events swept) this soon.
+_RETRY_SECONDS = 30
+
+
+_NO_SYNC = {"synchronize_session": False}
+
+class Event(NamedTuple):
+    due: datetime
+    kind: str  # "start" or "end"
+    reservation_id: int
+    instrument_id: int
+
+class EndedReservation(NamedTuple):
+    id: int
+    instrument_id: int
+    user_id: int
+    status: ReservationStatus
+    start_time: datetime
+    end_time: datetime
+
+class ChangedInstrument(NamedTuple):
+    id: int
+    status: InstrumentStatus
+    is_active: bool
+
+# --- Transitions ---
+def _end_transitions() -> List[Tuple[ReservationStatus, ReservationStatus, List[Any]]]:
+    """
+    How ended reservations move out of the active set: (old status, new status,
+    further conditions).
+    """
+    transitions: List[Tuple[ReservationStatus, ReservationStatus, List[Any]]] = [
+        (ReservationStatus.PENDING, ReservationStatus.MISSED, []),
+    ]
+    if not settings.TELEMETRY_INGEST_KEY:
+        return transitions + [(ReservationStatus.CONFIRMED, ReservationStatus.COMPLETED, [])]
+    during = [
+        InstrumentTelemetry.instrument_id == Reservation.instrument_id,
+        InstrumentTelemetry.timestamp >= Reservation.start_time,
+        InstrumentTelemetry.timestamp < Reservation.end_time,
+    ]
+    # The instrument PC was reporting while the reservation ran; without that, an
+    # instrument with no kiosk (or a PC that was off) would turn every booking missed.
+    reported = exists().where(*during, InstrumentTelemetry.kind != TelemetryKind.OFFLINE.value)
+    # A kiosk unlock or an in-use report of the instrument while the reservation ran.
+    used = exists().where(
+        *during,
+        or_(
+            InstrumentTelemetry.kind == TelemetryKind.SESSION_START.value,
+            InstrumentTelemetry.in_use.is_(True),
+        ),
+    )
+    return transitions + [
+        (ReservationStatus.CONFIRMED, ReservationStatus.COMPLETED, [or_(used, ~reported)]),
+        (ReservationStatus.CONFIRMED, ReservationStatus.MISSED, [reported, ~used]),
+    ]
+
+def end_reservations(
+    db: Session, *, reservation_ids: Sequence[int], now: datetime
+) -> List[EndedReservation]:
+    """
+    Move the given reservations out of the active set if they have ended by `now`.
+    Reservations that have not ended or are no longer active are left alone.
+    """
+    ended: List[EndedReservation] = []
+    for old_status, new_status, condition in _end_transitions():
+        rows = db.execute(
+            update(Reservation)
+            .where(
+                Reservation.id.in_(reservation_ids),
+                Reservation.status == old_status,
+                Reservation.end_time <= now,
+                *condition,
+            )
+            .values(status=new_status)
+            .returning(
+                Reservation.id, Reservation.instrument_id, Reservation.user_id, Reservation.status,
+                Reservation.start_time, Reservation.end_time,
+            ),
+            execution_options=_NO_SYNC,
+        )
+        ended += [EndedReservation(*row) for row in rows]
+    return ended
+
+def sync_instrument_status(
+    db: Session, *, now: datetime, instrument_ids: Optional[Iterable[int]] = None
+) -> List[ChangedInstrument]:
+    """
+    Mark available instruments that are in use as such, and in-use instruments that
+    are not as available again; all instruments if no ids are given. An instrument
+    is in use while its PC reports so, or, while the PC reports nothing, while an
+    active reservation of it is running. Returns the instruments changed.
+    """
+    running = exists().where(
+        Reservation.instrument_id == Instrument.id,
+        Reservation.status.in_(availability.ACTIVE_STATUSES),
+        Reservation.start_time <= now,
+        Reservation.end_time > now,
+    )
+    unreported = Instrument.reported_in_use.is_(None)
+    in_use = or_(Instrument.reported_in_use.is_(True), and_(unreported, running))
+    not_in_use = or_(Instrument.reported_in_use.is_(False), and_(unreported, ~running))
+    scope = [] if instrument_ids is None else [Instrument.id.in_(list(instrument_ids))]
+    changed: List[ChangedInstrument] = []
+    for old_status, new_status, condition in (
+        (InstrumentStatus.AVAILABLE, InstrumentStatus.IN_USE, in_use),
+        (InstrumentStatus.IN_USE, InstrumentStatus.AVAILABLE, not_in_use),
+    ):
+        rows = db.execute(
+            update(Instrument)
+            .where(*scope, Instrument.status == old_status, condition)
+            .values(status=new_status)
+            .returning(Instrument.id, Instrument.status, Instrument.is_active),
+            execution_options=_NO_SYNC,
+        )
+        changed += [ChangedInstrument(*row) for row in rows]
+    return changed
+
+def publish_instrument_changes(changed: List[ChangedInstrument]) -> None:
+    """
+    Publish the status changes once they are committed.
+    """
+    for instrument in changed:
+        events.publish({
+            "type": "instrument.updated",
+            "instrument_id": instrument.id,
+            "status": instrument.status,
+            "is_active": instrument.is_active,
+        })
+
+def _lock_transitions(db: Session) -> None:
+    """
+    Wait for other workers applying transitions; released when the transaction ends.
+    Elsewhere the database's write lock serializes them.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_KEY)))
+
+# --- Scheduler ---
+class LifecycleScheduler:
+    """
+    Applies reservation starts and ends when they come due, from a background thread.
+
+    The upcoming events are re-read from the database every `horizon` seconds, which
+    is how long bookings made through other workers can take to be scheduled here
+    (the sweep at each reload still applies them). Bookings made through this worker
+    are scheduled at once with `schedule`.
+    """
+    def __init__(
+        self,
+        *,
+        session_factory: Callable[[], Session],
+        horizon: float,
+        batch_size: int,
+        name: str,
+    ):
+        self.session_factory = session_factory
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.name = name
+
+        self._heap: List[Event] = []
+        self._wakeup = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "runs": 0,
+            "sweeps": 0,
+            "failures": 0,
+            "completed_or_missed": 0,
+            "instrument_changes": 0,
+            "last_run_seconds": None,
+        }
+
+    # --- Lifecycle ---
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-scheduler", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: Optional[float] = 10.0) -> None:
+        if not self.running:
+            return
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify()
+        assert self._thread is not None
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Producer side ---
+    def schedule(self, bookings: Iterable[Tuple[int, int, datetime, datetime]]) -> None:
+        """
+        Schedule the start and end of newly booked or moved active reservations,
+        given as (id, instrument_id, start, end), if they come due before the next reload.
+        """
+        if not self.running:
+            return
+        until = datetime.utcnow() + timedelta(seconds=self.horizon)
+        upcoming = [
+            Event(due, kind, reservation_id, instrument_id)
+            for reservation_id, instrument_id, start, end in bookings
+            for due, kind in ((start, "start"), (end, "end"))
+            if due <= until
+        ]
+        if upcoming:
+            with self._wakeup:
+                for event in upcoming:
+                    heapq.heappush(self._heap, event)
+                self._wakeup.notify()
+
+    # --- Worker side ---
+    def _run(self) -> None:
+        next_reload = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() >= next_reload:
+                    next_reload = time.monotonic() + self.horizon
+                    self._reload()
+                due = self._pop_due(datetime.utcnow())
+                if due:
+                    self._apply(due)
+            except Exception:
+                self._count("failures")
+                logger.exception("%s scheduler failed; retrying with a sweep", self.name)
+                next_reload = min(next_reload, time.monotonic() + _RETRY_SECONDS)
+            with self._wakeup:
+                timeout = next_reload - time.monotonic()
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0].due - datetime.utcnow()).total_seconds())
+                if timeout > 0 and not self._stopping.is_set():
+                    self._wakeup.wait(timeout)
+
+    def _pop_due(self, now: datetime) -> List[Event]:
+        due: List[Event] = []
+        with self._wakeup:
+            while self._heap and self._heap[0].due <= now:
+                due.append(heapq.heappop(self._heap))
+        return due
+
+    def _reload(self) -> None:
+        """
+        Apply everything already due, then load the events of the next horizon.
+        """
+        self.sweep()
+        now = datetime.utcnow()
+        until = now + timedelta(seconds=self.horizon)
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(
+                    Reservation.id, Reservation.instrument_id, Reservation.start_time, Reservation.end_time
+                ).where(
+                    Reservation.status.in_(availability.ACTIVE_STATUSES),
+                    Reservation.start_time <= until,
+                    Reservation.end_time > now,
+                )
+            ).all()
+        heap = [
+            Event(due, kind, reservation_id, instrument_id)
+            for reservation_id, instrument_id, start, end in rows
+            for due, kind in ((start, "start"), (end, "end"))
+            if now < due <= until
+        ]
+        heapq.heapify(heap)
+        with self._wakeup:
+            self._heap = heap
+
+    def sweep(self) -> None:
+        """
+        End every active reservation that is over, in batches of `batch_size`, and
+        bring every instrument's status in line with its running reservations.
+        """
+        started = time.perf_counter()
+        ended: List[EndedReservation] = []
+        with self.session_factory() as db:
+            while True:
+                _lock_transitions(db)
+                now = datetime.utcnow()
+                ids = list(db.scalars(
+                    select(Reservation.id)
+                    .where(
+                        Reservation.status.in_(availability.ACTIVE_STATUSES),
+                        Reservation.end_time <= now,
+                    )
+                    .limit(self.batch_size)
+                ))
+                if ids:
+                    ended += end_reservations(db, reservation_ids=ids, now=now)
+                if len(ids) < self.batch_size:
+                    changed = sync_instrument_status(db, now=now)
+                    db.commit()
+                    break
+                db.commit()
+        self._count("sweeps")
+        self._applied(ended, changed, started)
+
+    def _apply(self, events: List[Event]) -> None:
+        started = time.perf_counter()
+        ended: List[EndedReservation] = []
+        end_ids = sorted({event.reservation_id for event in events if event.kind == "end"})
+        with self.session_factory() as db:
+            _lock_transitions(db)
+            now = datetime.utcnow()
+            for first in range(0, len(end_ids), self.batch_size):
+                ended += end_reservations(
+                    db, reservation_ids=end_ids[first:first + self.batch_size], now=now
+                )
+            changed = sync_instrument_status(
+                db, now=now, instrument_ids={event.instrument_id for event in events}
+            )
+            db.commit()
+        self._count("runs")
+        self._applied(ended, changed, started)
+
+    def _applied(
+        self, ended: List[EndedReservation], changed: List[ChangedInstrument], started: float
+    ) -> None:
+        for reservation in ended:
+            availability.forget_reservation(
+                instrument_id=reservation.instrument_id, reservation_id=reservation.id
+            )
+            analytics.maintainer.mark(reservation.instrument_id, reservation.start_time, reservation.end_time)
+            events.publish({
+                "type": "reservation.updated",
+                "reservation_id": reservation.id,
+                "instrument_id": reservation.instrument_id,
+                "user_id": reservation.user_id,
+                "status": reservation.status,
+            })
+        if changed:
+            crud_instrument.catalog_cache.bump()
+        publish_instrument_changes(changed)
+        with self._stats_lock:
+            self._stats["completed_or_missed"] += len(ended)
+            self._stats["instrument_changes"] += len(changed)
+            self._stats["last_run_seconds"] = round(time.perf_counter() - started, 6)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._wakeup:
+            stats["scheduled_events"] = len(self._heap)
+            stats["next_event"] = self._heap[0].due.isoformat() if self._heap else None
+        return {**stats, "running": self.running}
+
+# Started and stopped with the application (see main.py).
+scheduler = LifecycleScheduler(
+    session_factory=SessionLocal,
+    horizon=settings.RESERVATION_LIFECYCLE_HORIZON_SECONDS,
+    batch_size=settings.RESERVATION_LIFECYCLE_BATCH_SIZE,
+    name="lifecycle",
+)
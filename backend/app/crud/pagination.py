@@ -0,0 +1,142 @@
+"""
+Shared helpers for paginated list queries.
+
+Lists support two styles of pagination:
+- OFFSET/LIMIT through `skip` and `limit`, as before.
+- Keyset pagination, where the client passes back the opaque `next_cursor` of the
+  previous page. The query seeks straight past the last sort key it returned, so a
+  deep page costs the same as the first one.
+"""
+import base64
+import enum
+import json
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded.
+    """
+
+class TotalMode(str, enum.Enum):
+    EXACT = "exact"              # COUNT(*) on every request
+    CACHED = "cached"            # COUNT(*) reused for COUNT_CACHE_TTL_SECONDS
+    APPROXIMATE = "approximate"  # planner estimate for unfiltered lists on PostgreSQL
+    NONE = "none"                # no total at all
+
+class Page(NamedTuple):
+    data: List[Any]
+    total: Optional[int]
+    next_cursor: Optional[str] = None
+
+# --- Cursors ---
+def encode_cursor(key: Sequence[Any]) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by `encode_cursor` back into a sort key of the given types.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Invalid pagination cursor") from exc
+
+def next_cursor(rows: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]) -> Optional[str]:
+    """
+    Return the cursor of the page after `rows`, or None if this was the last page.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor(key(rows[-1]))
+
+# --- Totals ---
+_count_cache = TTLCache(maxsize=1024, ttl=settings.COUNT_CACHE_TTL_SECONDS, name="count")
+
+_ESTIMATE = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)")
+
+def _count_statement(statement: Select) -> Select:
+    return select(func.count()).select_from(statement.order_by(None).subquery())
+
+def _estimate(value: Optional[int]) -> Optional[int]:
+    # reltuples is -1 until the table has been analyzed for the first time.
+    return int(value) if value is not None and value >= 0 else None
+
+def _estimated(db: Union[Session, AsyncSession], mode: TotalMode, estimate_table: Optional[str]) -> bool:
+    return (
+        mode is TotalMode.APPROXIMATE
+        and estimate_table is not None
+        and db.get_bind().dialect.name == "postgresql"
+    )
+
+def count_total(
+    db: Session,
+    statement: Select,
+    *,
+    mode: TotalMode,
+    cache_key: Tuple[Any, ...],
+    estimate_table: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Count the rows of a list select() statement according to `mode`.
+    `estimate_table` names the table to estimate from, and is only given for unfiltered
+    lists; filtered lists fall back to a cached count in APPROXIMATE mode.
+    """
+    if mode is TotalMode.NONE:
+        return None
+    count_statement = _count_statement(statement)
+    if mode is TotalMode.EXACT:
+        return db.scalar(count_statement)
+    if _estimated(db, mode, estimate_table):
+        estimate = _estimate(db.scalar(_ESTIMATE, {"table": estimate_table}))
+        if estimate is not None:
+            return estimate
+    return _count_cache.get_or_set(cache_key, lambda: db.scalar(count_statement))
+
+async def acount_total(
+    db: AsyncSession,
+    statement: Select,
+    *,
+    mode: TotalMode,
+    cache_key: Tuple[Any, ...],
+    estimate_table: Optional[str] = None,
+) -> Optional[int]:
+    """
+    Async version of count_total.
+    """
+    if mode is TotalMode.NONE:
+        return None
+    count_statement = _count_statement(statement)
+    if mode is TotalMode.EXACT:
+        return await db.scalar(count_statement)
+    if _estimated(db, mode, estimate_table):
+        estimate = _estimate(await db.scalar(_ESTIMATE, {"table": estimate_table}))
+        if estimate is not None:
+            return estimate
+    total = _count_cache.get(cache_key)
+    if total is None:
+        total = await db.scalar(count_statement)
+        _count_cache.set(cache_key, total)
+    return total
+
+def count_cache_stats() -> dict:
+    return _count_cache.stats()
@@ -0,0 +1,322 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from sqlalchemy import DateTime, Table, insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+class _FlushRequest:
+    """
+    Queue marker asking the worker to write what it has and signal when done.
+    """
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+class BatchWriter:
+    """
+    Buffers rows for one table and writes them from a background thread.
+
+    Rows wait in a bounded in-process queue and are written with one multi-row INSERT
+    as soon as `batch_size` rows are waiting or `flush_interval` seconds have passed.
+    When the queue is full, `submit` waits up to `enqueue_timeout` seconds and then
+    writes the row itself, so a slow database pushes back on callers instead of
+    losing rows.
+
+    A batch that fails to write is retried up to `retries` times, waiting
+    `retry_backoff` seconds and twice as long after each further failure; a batch the
+    database rejects as invalid is written row by row instead. Rows that still can't
+    be written are appended to the JSON-lines file `dead_letter_path`, from which
+    `replay_dead_letters` (scripts/replay_dead_letters.py) writes them once the
+    database is back.
+    """
+    def __init__(
+        self,
+        table: Table,
+        *,
+        session_factory: Callable[[], Session],
+        batch_size: int,
+        flush_interval: float,
+        max_queue: int,
+        enqueue_timeout: float,
+        retries: int,
+        retry_backoff: float,
+        dead_letter_path: Union[str, Path],
+        name: str,
+    ):
+        self.table = table
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = Path(dead_letter_path)
+        self.name = name
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._dead_letter_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "submitted": 0,
+            "written": 0,
+            "retries": 0,
+            "dead_lettered": 0,
+            "replayed": 0,
+            "lost": 0,
+            "batches": 0,
+            "backpressure_waits": 0,
+            "overflow_writes": 0,
+            "max_queue_depth": 0,
+            "last_batch_seconds": None,
+        }
+        # Scripts and workers that exit without the shutdown hook still drain the queue.
+        # Registered once: shutdown does nothing while the writer isn't running.
+        atexit.register(self.shutdown)
+
+    # --- Lifecycle ---
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every row submitted so far has been written.
+        Returns False if the writer did not finish within `timeout` seconds.
+        """
+        if not self.running:
+            return self._queue.empty()
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def shutdown(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Write everything that is still queued and stop the background thread.
+        """
+        if not self.running:
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._queue.put(_FlushRequest())  # wake the worker up
+        assert self._thread is not None
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Producer side ---
+    def submit(self, row: Dict[str, Any]) -> None:
+        """
+        Queue one row for writing. Blocks briefly, then writes inline, if the queue is full.
+        """
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("backpressure_waits")
+            try:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._count("overflow_writes")
+                # The caller is waiting: no retries, straight to the dead-letter file
+                # if the database refuses the row.
+                self._write([row], retries=0)
+                return
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+
+    def submit_nowait(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue one row without ever blocking. Returns False if the queue is full, in
+        which case the caller must write the row itself (used from the event loop);
+        that write is counted as an overflow write, as in `submit`.
+        """
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("backpressure_waits")
+            self._count("overflow_writes")
+            return False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        return True
+
+    # --- Worker side ---
+    def _run(self) -> None:
+        while True:
+            batch, flush_requests = self._collect()
+            if batch:
+                self._write(batch)
+            for request in flush_requests:
+                request.done.set()
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+    def _collect(self) -> "tuple[List[Dict[str, Any]], List[_FlushRequest]]":
+        """
+        Take rows off the queue until the batch is full, the interval is over,
+        or somebody asked for a flush.
+        """
+        batch: List[Dict[str, Any]] = []
+        flush_requests: List[_FlushRequest] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if isinstance(item, _FlushRequest):
+                flush_requests.append(item)
+                break
+            batch.append(item)
+        return batch, flush_requests
+
+    def _write(self, rows: List[Dict[str, Any]], *, retries: Optional[int] = None) -> None:
+        """
+        Write rows, retrying with backoff, and dead-letter them if every attempt fails.
+        When the database rejects the data itself rather than being unreachable, the
+        rows are written one by one instead, and only the rejected ones dead-lettered.
+        """
+        retries = self.retries if retries is None else retries
+        delay = self.retry_backoff
+        for attempt in range(retries + 1):
+            try:
+                self._insert(rows)
+            except (IntegrityError, DataError):
+                logger.exception("%s writer: database rejected a batch of %d row(s)", self.name, len(rows))
+                if len(rows) > 1:
+                    for row in rows:
+                        self._write([row], retries=0)
+                    return
+                break
+            except Exception:
+                if attempt == retries:
+                    logger.exception(
+                        "%s writer failed to write %d row(s), giving up after %d attempt(s)",
+                        self.name, len(rows), attempt + 1,
+                    )
+                    break
+                logger.warning(
+                    "%s writer failed to write %d row(s), retrying in %.1fs",
+                    self.name, len(rows), delay, exc_info=True,
+                )
+                self._count("retries")
+                time.sleep(delay)
+                delay *= 2
+                continue
+            return
+        self._dead_letter(rows)
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            db.execute(insert(self.table), rows)
+            db.commit()
+        with self._stats_lock:
+            self._stats["written"] += len(rows)
+            self._stats["batches"] += 1
+            self._stats["last_batch_seconds"] = round(time.perf_counter() - started, 6)
+
+    # --- Dead letters ---
+    def _dead_letter(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Append rows that could not be written to the dead-letter file, one JSON
+        object per line. The rows are only lost if the file can't be written either,
+        and then they are logged in full.
+        """
+        try:
+            lines = "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+            with self._dead_letter_lock:
+                self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+                # One write in append mode, so lines of several workers never interleave.
+                with open(self.dead_letter_path, "a", encoding="utf-8") as file:
+                    file.write(lines)
+                    file.flush()
+                    os.fsync(file.fileno())
+        except (OSError, TypeError, ValueError):
+            self._count("lost", len(rows))
+            logger.exception(
+                "%s writer lost %d row(s), could not write them to %s: %r",
+                self.name, len(rows), self.dead_letter_path, rows,
+            )
+            return
+        self._count("dead_lettered", len(rows))
+        logger.error("%s writer dead-lettered %d row(s) to %s", self.name, len(rows), self.dead_letter_path)
+
+    def replay_dead_letters(self) -> int:
+        """
+        Write the rows of the dead-letter file to the table in one transaction and
+        remove the file. Returns the number of rows written. The file is renamed
+        first, so rows dead-lettered meanwhile start a new file, and a replay that
+        fails leaves it in place for the next attempt.
+        """
+        replaying = self.dead_letter_path.with_name(self.dead_letter_path.name + ".replaying")
+        with self._dead_letter_lock:
+            # A replay that failed before left its file renamed already.
+            if not replaying.exists():
+                try:
+                    os.replace(self.dead_letter_path, replaying)
+                except FileNotFoundError:
+                    return 0
+
+        with open(replaying, encoding="utf-8") as file:
+            rows = [self._decode(json.loads(line)) for line in file if line.strip()]
+        with self.session_factory() as db:
+            for start in range(0, len(rows), self.batch_size):
+                db.execute(insert(self.table), rows[start:start + self.batch_size])
+            db.commit()
+        replaying.unlink()
+        self._count("replayed", len(rows))
+        logger.info("%s writer replayed %d dead-lettered row(s)", self.name, len(rows))
+        return len(rows)
+
+    def _decode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        # JSON has no datetimes: those columns were stored in ISO format.
+        for key, value in row.items():
+            if isinstance(value, str) and isinstance(self.table.c[key].type, DateTime):
+                row[key] = datetime.fromisoformat(value)
+        return row
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                **self._stats,
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "dead_letter_file": str(self.dead_letter_path) if self.dead_letter_path.exists() else None,
+            }
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
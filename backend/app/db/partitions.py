@@ -0,0 +1,129 @@
+"""
+Monthly partitions of the access log on PostgreSQL.
+
+Migration 0005 partitions `access_logs` by range of `timestamp`: one partition per
+calendar month (access_logs_y2026m10 holds October 2026), plus a default partition
+for rows outside every month created so far. The coming months' partitions are
+created on startup and by the archive job (scripts/archive_access_logs.py), which
+also exports old months and drops their partitions, so retention never deletes rows
+from, or leaves anything to vacuum in, the partitions being written.
+
+On other databases `access_logs` is a plain table and there are no partitions.
+"""
+import logging
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+TABLE = "access_logs"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+# Serializes partition changes of concurrently starting workers.
+PARTITION_LOCK_KEY = 0x4C4F4750  # "LOGP"
+
+_PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+class Partition(NamedTuple):
+    name: str
+    # First moment of the month it holds.
+    month: datetime
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.scalar(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": TABLE},
+    ))
+
+def list_partitions(connection: Connection) -> List[Partition]:
+    """
+    The monthly partitions of the access log, oldest first; empty when it isn't partitioned.
+    """
+    if not is_partitioned(connection):
+        return []
+    names = connection.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": TABLE},
+    )
+    partitions = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append(Partition(name, datetime(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda partition: partition.month)
+
+def ensure_partitions(connection: Connection, *, first: datetime, last: datetime) -> List[str]:
+    """
+    Create the missing monthly partitions from the month of `first` through the month
+    of `last`, inside the caller's transaction. Returns the names created.
+
+    A month that already has rows in the default partition is skipped with a warning:
+    PostgreSQL can't create a partition over rows in the default one. Creating months
+    ahead of time keeps that from happening.
+    """
+    if not is_partitioned(connection):
+        return []
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    existing = {partition.name for partition in list_partitions(connection)}
+    created = []
+    month = month_start(first)
+    while month <= last:
+        name, following = partition_name(month), add_months(month, 1)
+        if name not in existing:
+            if _default_has_rows(connection, month, following):
+                logger.warning(
+                    "%s has rows for %s; not creating %s", DEFAULT_PARTITION, f"{month:%Y-%m}", name
+                )
+            else:
+                connection.exec_driver_sql(
+                    f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+                )
+                created.append(name)
+        month = following
+    return created
+
+def ensure_upcoming_partitions(connection: Connection, *, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the partitions of this month and the next `months_ahead` ones.
+    """
+    now = now or datetime.utcnow()
+    return ensure_partitions(connection, first=now, last=add_months(month_start(now), months_ahead))
+
+def _default_has_rows(connection: Connection, start: datetime, end: datetime) -> bool:
+    return bool(connection.scalar(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE timestamp >= :start AND timestamp < :end)"
+        ),
+        {"start": start, "end": end},
+    ))
+
+def drop_partition(connection: Connection, name: str) -> None:
+    """
+    Detach a monthly partition and drop it with its rows, inside the caller's transaction.
+    """
+    if not _PARTITION_NAME.match(name):
+        raise ValueError(f"Not a monthly partition of {TABLE}: {name}")
+    connection.exec_driver_sql(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+    connection.exec_driver_sql(f"DROP TABLE {name}")
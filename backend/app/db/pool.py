@@ -0,0 +1,149 @@
+"""
+Connection pool configuration and instrumentation.
+
+Both engines (see db/session.py) use a QueuePool sized from the DB_POOL_* settings.
+The pool class is wrapped so that every checkout is timed, and pool events are
+counted, which tells pool starvation apart from slow queries: starvation shows up as
+long checkout waits while every connection is checked out.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Type
+from uuid import uuid4
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PoolStats:
+    """
+    Counters and recent checkout wait times of one engine's pool.
+    """
+    def __init__(self, name: str, samples: int = 2048):
+        self.name = name
+        self.pool: Pool | None = None
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=samples)
+        self._counts: Dict[str, int] = {
+            "checkouts": 0,
+            "checkins": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "timeouts": 0,
+            "slow_checkouts": 0,
+        }
+        self._max_wait = 0.0
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._waits.append(seconds)
+            self._max_wait = max(self._max_wait, seconds)
+        if seconds * 1000 >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+            self.count("slow_checkouts")
+            logger.warning(
+                "%s pool: checkout took %.1f ms (%s)", self.name, seconds * 1000, self._usage()
+            )
+
+    def _usage(self) -> str:
+        pool = self.pool
+        if not isinstance(pool, QueuePool):
+            return "unsized pool"
+        return f"checked out {pool.checkedout()}, size {pool.size()}, overflow {pool.overflow()}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            result: Dict[str, Any] = dict(self._counts)
+            max_wait = self._max_wait
+
+        def ms(value: float) -> float:
+            return round(value * 1000, 3)
+
+        result["checkout_wait_ms"] = {
+            "samples": len(waits),
+            "mean": ms(sum(waits) / len(waits)) if waits else None,
+            "p50": ms(waits[len(waits) // 2]) if waits else None,
+            "p99": ms(waits[min(len(waits) - 1, int(len(waits) * 0.99))]) if waits else None,
+            "max": ms(max_wait),
+        }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            # overflow() counts down from -size while the pool fills up; only positive
+            # values are connections beyond the pool size.
+            result.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow_in_use": max(pool.overflow(), 0),
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+            })
+        return result
+
+def _instrumented(base: Type[QueuePool], stats: PoolStats) -> Type[QueuePool]:
+    """
+    Subclass `base` so that every checkout is timed. The time includes waiting for a
+    free connection, opening a new one and the pre-ping, i.e. what a request waits.
+    """
+    class InstrumentedPool(base):  # type: ignore[valid-type, misc]
+        def connect(self):  # type: ignore[no-untyped-def]
+            stats.pool = self
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                stats.count("timeouts")
+                stats.record_wait(time.perf_counter() - started)
+                raise
+            stats.record_wait(time.perf_counter() - started)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+def pool_options(url: str, *, stats: PoolStats, is_async: bool) -> Dict[str, Any]:
+    """
+    Keyword arguments for create_engine / create_async_engine from the pool settings.
+    In-memory SQLite databases keep SQLAlchemy's default single-connection pool.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": _instrumented(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def pgbouncer_connect_args() -> Dict[str, Any]:
+    """
+    asyncpg arguments for PgBouncer in transaction pooling mode, where consecutive
+    transactions may run on different server connections: don't cache prepared
+    statements, and give every statement a unique name.
+    """
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+def attach_stats(engine: Engine, stats: PoolStats) -> None:
+    """
+    Count pool events of a (sync) engine; pass `async_engine.sync_engine` for async ones.
+    """
+    event.listen(engine, "checkout", lambda *args: stats.count("checkouts"))
+    event.listen(engine, "checkin", lambda *args: stats.count("checkins"))
+    event.listen(engine, "connect", lambda *args: stats.count("connects"))
+    event.listen(engine, "invalidate", lambda *args: stats.count("invalidations"))
@@ -1,6 +1,11 @@
+from typing import AsyncIterator, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import PoolStats, attach_stats, pgbouncer_connect_args, pool_options
 
 db_url = settings.SQLALCHEMY_DATABASE_URI
 if db_url is None:
@@ -12,11 +17,13 @@ directly to the underlying database driver (psycopg2), forcing it
 to use 'utf8' for the client encoding at the lowest connection level.
 """
 
+sync_pool_stats = PoolStats("sync")
 engine = create_engine(
     db_url,
-    pool_pre_ping=True,
-    connect_args={"client_encoding": "utf8"}
+    **pool_options(db_url, stats=sync_pool_stats, is_async=False),
+    connect_args={"client_encoding": "utf8"} if db_url.startswith("postgresql") else {}
 )
+attach_stats(engine, sync_pool_stats)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -30,4 +37,70 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Async Engine ---
+# The API endpoints use an asyncio driver so that a waiting query doesn't hold one of
+# Starlette's worker threads. Scripts, migrations and background jobs keep the sync
+# engine above.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _async_url(url: str) -> str:
+    sync_url = make_url(url)
+    backend = sync_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}' databases")
+    return sync_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def _create_async_engine(url: str, stats: PoolStats) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url,
+        **pool_options(url, stats=stats, is_async=True),
+        connect_args=(
+            pgbouncer_connect_args()
+            if settings.DB_PGBOUNCER and make_url(url).drivername == "postgresql+asyncpg"
+            else {}
+        ),
+    )
+    attach_stats(new_engine.sync_engine, stats)
+    return new_engine
+
+async_pool_stats = PoolStats("async")
+async_engine = _create_async_engine(
+    settings.ASYNC_SQLALCHEMY_DATABASE_URI or _async_url(db_url), async_pool_stats
+)
+
+# expire_on_commit=False: objects stay readable after commit, since attributes can't
+# be lazily refreshed outside of an await.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    FastAPI dependency that provides an async database session for each request,
+    closed after the request is finished.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# --- Read Replica ---
+# GET endpoints read through get_read_db (see api/deps.py), which uses the replica
+# when one is configured. Without one, reads share the primary's engine.
+replica_pool_stats: Optional[PoolStats] = None
+async_replica_engine: Optional[AsyncEngine] = None
+AsyncReadSessionLocal = AsyncSessionLocal
+
+if settings.READ_REPLICA_DATABASE_URI:
+    replica_pool_stats = PoolStats("replica")
+    async_replica_engine = _create_async_engine(
+        _async_url(settings.READ_REPLICA_DATABASE_URI), replica_pool_stats
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_replica_engine, autoflush=False, expire_on_commit=False
+    )
@@ -26,6 +26,9 @@ class Instrument(Base):
     
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False, comment="Is available for booking")
     status: Mapped[InstrumentStatus] = mapped_column(Enum(InstrumentStatus), nullable=False, default=InstrumentStatus.AVAILABLE)
+    # Whether the instrument PC reports a session in progress; NULL while it sends no
+    # heartbeats. When set, it decides between AVAILABLE and IN_USE (see lifecycle.py).
+    reported_in_use: Mapped[bool | None] = mapped_column(Boolean, nullable=True, comment="In use as reported by the instrument PC")
     
     ip_address: Mapped[str | None] = mapped_column(String, unique=True, nullable=True, comment="Static IP address")
     mac_address: Mapped[str | None] = mapped_column(String, unique=True, nullable=True, comment="MAC address")
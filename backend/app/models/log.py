@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy import Integer, String, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import TYPE_CHECKING, Optional, List # <-- 1. Import 'Optional' and 'List'
 
@@ -15,10 +15,18 @@ class AccessLog(Base):
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
-    action: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    action: Mapped[str] = mapped_column(String, nullable=False)
     
     # --- FIX: Use Optional[dict] for better compatibility ---
     details: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
 
     # --- Relationship ---
-    user: Mapped[Optional["User"]] = relationship("User", back_populates="logs")
\ No newline at end of file
+    user: Mapped[Optional["User"]] = relationship("User", back_populates="logs")
+
+# --- Indexes ---
+# The log only grows; audit queries filter by time range, and by user or action within
+# a time range. On PostgreSQL the table is partitioned by month of `timestamp` (see
+# app/db/partitions.py) and its primary key is (id, timestamp).
+Index("ix_access_logs_timestamp", AccessLog.timestamp)
+Index("ix_access_logs_user_timestamp", AccessLog.user_id, AccessLog.timestamp)
+Index("ix_access_logs_action_timestamp", AccessLog.action, AccessLog.timestamp)
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey
+from sqlalchemy import Table, Column, Integer, ForeignKey, Index
 from app.db.base import Base
 
 # This is an "association table" for the many-to-many relationship
@@ -8,4 +8,6 @@ user_instrument_permission = Table(
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
     Column("instrument_id", Integer, ForeignKey("instruments.id"), primary_key=True),
+    # The primary key serves lookups by user; this serves lookups by instrument.
+    Index("ix_user_instrument_permission_instrument", "instrument_id", "user_id"),
 )
\ No newline at end of file
@@ -1,6 +1,7 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, DDL, Index, event, func, column, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.db.base import Base
@@ -18,8 +19,25 @@ class ReservationStatus(str, enum.Enum):
     COMPLETED = "completed"
     MISSED = "missed"
 
+# Name of the PostgreSQL constraint that rejects overlapping active reservations.
+# The CRUD layer maps violations of it to a booking conflict.
+NO_OVERLAP_CONSTRAINT = "reservations_no_overlap"
+
 class Reservation(Base):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Two active (pending or confirmed) reservations of the same instrument may not
+        # overlap. The database enforces this, so concurrent bookings cannot both pass
+        # the availability check. The backing GiST index also serves overlap lookups.
+        # Only PostgreSQL supports this; other databases rely on locking in the CRUD layer.
+        ExcludeConstraint(
+            (column("instrument_id"), "="),
+            (func.tsrange(column("start_time"), column("end_time")), "&&"),
+            name=NO_OVERLAP_CONSTRAINT,
+            using="gist",
+            where=text("status IN ('PENDING', 'CONFIRMED')"),
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     start_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -34,4 +52,43 @@ class Reservation(Base):
     # The 'user' who made this reservation
     user: Mapped["User"] = relationship("User", back_populates="reservations")
     # The 'instrument' being reserved
-    instrument: Mapped["Instrument"] = relationship("Instrument", back_populates="reservations")
\ No newline at end of file
+    instrument: Mapped["Instrument"] = relationship("Instrument", back_populates="reservations")
+
+# --- Hot-Path Indexes ---
+# Booking checks and the instrument schedule filter on instrument, status and start time.
+Index(
+    "ix_reservations_instrument_status_start",
+    Reservation.instrument_id,
+    Reservation.status,
+    Reservation.start_time,
+)
+# "My reservations" pages list one user's bookings, newest first.
+Index(
+    "ix_reservations_user_start",
+    Reservation.user_id,
+    Reservation.start_time.desc(),
+)
+# Admin pages walk the whole table newest first, seeking by (start_time, id) keyset.
+Index(
+    "ix_reservations_start_id",
+    Reservation.start_time,
+    Reservation.id,
+)
+# Only pending and confirmed rows take part in conflict checks and the public schedule,
+# so a partial index over them stays small as cancelled and past rows pile up.
+_ACTIVE_STATUSES = [ReservationStatus.PENDING, ReservationStatus.CONFIRMED]
+Index(
+    "ix_reservations_active_instrument_start",
+    Reservation.instrument_id,
+    Reservation.start_time,
+    Reservation.end_time,
+    postgresql_where=Reservation.status.in_(_ACTIVE_STATUSES),
+    sqlite_where=Reservation.status.in_(_ACTIVE_STATUSES),
+)
+
+# The '=' operator on an integer column inside a GiST constraint needs btree_gist.
+event.listen(
+    Reservation.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
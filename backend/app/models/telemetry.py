@@ -0,0 +1,40 @@
+import enum
+from datetime import datetime
+from sqlalchemy import Boolean, DateTime, Index, Integer, JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+
+from app.db.base import Base
+
+class TelemetryKind(str, enum.Enum):
+    HEARTBEAT = "heartbeat"
+    SESSION_START = "session_start"
+    SESSION_END = "session_end"
+    # Written by the server when an instrument PC stops sending heartbeats.
+    OFFLINE = "offline"
+
+class InstrumentTelemetry(Base):
+    """
+    What the instrument PCs report, append-only. Rows are written in batches (see
+    app/crud/crud_telemetry.py) and never updated, and there are no foreign keys, so
+    an insert touches nothing but this table and its indexes.
+    """
+    __tablename__ = "instrument_telemetry"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # When the server received the report; the PCs' clocks are not trusted.
+    timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    instrument_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    # The owner of the reservation in progress when the report arrived, if any.
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    in_use: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    # Optional usage counters sent with the report, e.g. {"acquisitions": 3}.
+    counters: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+
+# --- Indexes ---
+# Queries read one instrument's recent reports, or a time range of all of them. Rows
+# arrive in timestamp order, so on PostgreSQL a tiny BRIN index serves time ranges.
+Index("ix_instrument_telemetry_instrument_timestamp",
+      InstrumentTelemetry.instrument_id, InstrumentTelemetry.timestamp)
+Index("ix_instrument_telemetry_timestamp", InstrumentTelemetry.timestamp, postgresql_using="brin")
@@ -0,0 +1,51 @@
+from sqlalchemy import Table, Column, Date, Integer, Index
+from typing import List
+
+from app.db.base import Base
+
+def hour_column(hour: int) -> str:
+    return f"hour_{hour:02d}_seconds"
+
+def _measures() -> List[Column]:
+    return [
+        Column("booked_seconds", Integer, nullable=False),
+        Column("reservations", Integer, nullable=False),
+        Column("completed", Integer, nullable=False),
+        Column("missed", Integer, nullable=False),
+        Column("cancelled", Integer, nullable=False),
+        # Booked seconds within each hour of the day (UTC), summed up for peak hours.
+        *[Column(hour_column(hour), Integer, nullable=False) for hour in range(24)],
+    ]
+
+# Utilization rollups: one row per instrument and UTC day, or week, with any
+# reservation, kept up to date by app/crud/analytics.py and rebuilt by
+# scripts/rebuild_usage_rollups.py. Analytics read these rows instead of the
+# reservations, and the weekly rows for the whole weeks of a range. Booked time counts
+# every reservation that was not cancelled (a missed one was booked all the same);
+# the reservation counts are by start day.
+instrument_usage_daily = Table(
+    "instrument_usage_daily",
+    Base.metadata,
+    Column("instrument_id", Integer, primary_key=True),
+    Column("day", Date, primary_key=True),
+    # The Monday of the day's week, so that weeks group the same way everywhere.
+    Column("week", Date, nullable=False),
+    *_measures(),
+    # The primary key serves one instrument's range; this serves all instruments'.
+    Index("ix_instrument_usage_daily_day", "day"),
+)
+
+# The sums of the daily rows of each week (starting Monday).
+instrument_usage_weekly = Table(
+    "instrument_usage_weekly",
+    Base.metadata,
+    Column("instrument_id", Integer, primary_key=True),
+    Column("week", Date, primary_key=True),
+    *_measures(),
+    # Holds every column of the utilization query, which reads a range of weeks of all
+    # instruments from this index alone.
+    Index(
+        "ix_instrument_usage_weekly_week_totals",
+        "week", "instrument_id", "booked_seconds", "reservations", "completed", "missed", "cancelled",
+    ),
+)
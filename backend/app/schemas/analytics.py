@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Literal, Optional
+
+# --- Schemas for API Output ---
+# Utilization comes as columns rather than one object per row: a year of weeks for
+# every instrument is many thousands of rows, and charts take columns anyway. The
+# i-th entries of all lists belong to the same instrument and period.
+class UtilizationSeries(BaseModel):
+    granularity: Literal["day", "week"]
+    instrument_id: List[int]
+    # The day, or the Monday of the week
+    period_start: List[date]
+    # Days of the period within the requested range
+    days: List[int]
+    booked_hours: List[float]
+    # Booked share of the period's hours, 0 to 1
+    utilization: List[float]
+    # Reservations starting in the period: not cancelled, completed, missed, cancelled
+    reservations: List[int]
+    completed: List[int]
+    missed: List[int]
+    cancelled: List[int]
+    # missed / (completed + missed); null before any of them ended, and throughout
+    # without instrument telemetry, which is what tells no-shows apart
+    no_show_rate: List[Optional[float]]
+
+class HourProfile(BaseModel):
+    # Null for all instruments together
+    instrument_id: Optional[int] = None
+    # Booked hours within each hour of the day (UTC), 0 to 23
+    booked_hours: List[float]
+    # The busiest hours of the day, busiest first
+    peak_hours: List[int]
+
+class PeakHours(BaseModel):
+    overall: HourProfile
+    instruments: List[HourProfile]
@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 # Import the InstrumentStatus enum from our model to ensure data consistency
 from app.models.instrument import InstrumentStatus
@@ -43,4 +44,36 @@ class Instrument(InstrumentBase):
 
     class Config:
         # Pydantic V2 uses 'from_attributes' to enable ORM model mapping
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- Schema for Compact API Output ---
+# A slim view used when list endpoints are asked for a projection (`fields=` / `expand=`).
+class InstrumentSummary(BaseModel):
+    id: int
+    name: Optional[str] = None
+    location: Optional[str] = None
+    status: Optional[InstrumentStatus] = None
+
+# --- Schemas for Availability Output ---
+class TimeWindow(BaseModel):
+    start: datetime
+    end: datetime
+
+class InstrumentAvailability(BaseModel):
+    instrument_id: int
+    start: datetime
+    end: datetime
+    granularity_minutes: int
+    # Booked time, widened to whole slots and merged
+    busy: List[TimeWindow]
+    # Bookable windows between them, on slot boundaries
+    free: List[TimeWindow]
+
+class FreeSlot(BaseModel):
+    instrument_id: int
+    instrument_name: str
+    location: str
+    start: datetime
+    end: datetime
+    # End of the free window the slot lies in
+    free_until: datetime
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+# --- Schema for API Output ---
+class AccessLog(BaseModel):
+    id: int
+    timestamp: datetime
+    user_id: Optional[int] = None
+    action: str
+    details: Optional[Dict[str, Any]] = None
+
+    class Config:
+        from_attributes = True
+
+class AccessLogList(BaseModel):
+    data: List[AccessLog]
+    next_cursor: Optional[str] = None
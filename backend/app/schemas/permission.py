@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from typing import List, Literal, Tuple
 
 class PermissionBase(BaseModel):
     instrument_id: int
@@ -6,6 +7,24 @@ class PermissionBase(BaseModel):
 class PermissionGrant(PermissionBase):
     user_id: int
 
+# The response of a single grant or revoke
+class PermissionChange(PermissionGrant):
+    # False if the user already had (grant) or didn't have (revoke) the permission
+    changed: bool
+
 # We keep the original for internal use if needed, though not required by the API now
 class PermissionCreate(PermissionBase):
-    user_id: int
\ No newline at end of file
+    user_id: int
+
+# -- Schemas for Bulk Changes --
+class PermissionBulkChange(BaseModel):
+    user_ids: List[int]
+    instrument_ids: List[int]
+    # grant: add every user x instrument pair; revoke: remove them;
+    # replace: give each listed user exactly these instruments
+    action: Literal["grant", "revoke", "replace"]
+
+class PermissionDiff(BaseModel):
+    # [user_id, instrument_id] pairs that were actually added or removed
+    granted: List[Tuple[int, int]]
+    revoked: List[Tuple[int, int]]
@@ -1,11 +1,20 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 # Import the model enum and the schemas for related objects
+from app.crud.availability import naive_utc
 from app.models.reservation import ReservationStatus
-from .user import User
-from .instrument import Instrument
+from .user import User, UserSummary
+from .instrument import Instrument, InstrumentSummary
+
+# Reservation times are stored in UTC without a zone. Every input converts times that
+# carry a zone on the way in, so that all endpoints store and compare the same values.
+def _in_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+    return naive_utc(v) if v is not None else v
+
+def _utc_validator(*fields: str):
+    return validator(*fields, allow_reuse=True)(_in_utc)
 
 # --- Base Schema ---
 # Shared properties for a reservation.
@@ -14,6 +23,8 @@ class ReservationBase(BaseModel):
     end_time: datetime
     instrument_id: int
 
+    _utc_times = _utc_validator("start_time", "end_time")
+
     # A custom validator to ensure end_time is after start_time
     @validator("end_time")
     def end_time_must_be_after_start_time(cls, v, values):
@@ -28,6 +39,73 @@ class ReservationCreate(ReservationBase):
     pass
 
 
+# --- Schemas for Batch Creation ---
+# RRULE-style recurrence (RFC 5545 FREQ, INTERVAL, COUNT, UNTIL, BYDAY), limited to
+# daily and weekly repetition.
+class RecurrenceRule(BaseModel):
+    frequency: Literal["daily", "weekly"]
+    # Repeat every `interval` days or weeks
+    interval: int = Field(1, ge=1)
+    # Stop after this many occurrences, or at the last one starting by `until`
+    count: Optional[int] = Field(None, ge=1)
+    until: Optional[datetime] = None
+    # Weekly only: weekdays to book, 0 = Monday. Defaults to the first start's weekday.
+    by_weekday: Optional[List[int]] = None
+
+    _utc_until = _utc_validator("until")
+
+    @validator("until", always=True)
+    def count_or_until(cls, v, values):
+        if v is None and values.get("count") is None:
+            raise ValueError("A recurrence needs a count or an until date")
+        return v
+
+    @validator("by_weekday")
+    def weekdays_in_range(cls, v):
+        if v is not None and not all(0 <= day <= 6 for day in v):
+            raise ValueError("Weekdays run from 0 (Monday) to 6 (Sunday)")
+        return v
+
+class ReservationSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+    _utc_times = _utc_validator("start_time", "end_time")
+
+    @validator("end_time")
+    def end_time_must_be_after_start_time(cls, v, values):
+        if "start_time" in values and v <= values["start_time"]:
+            raise ValueError("End time must be after start time")
+        return v
+
+class ReservationBatchCreate(BaseModel):
+    instrument_id: int
+    # Either explicit slots, or a first slot repeated by a recurrence rule
+    slots: List[ReservationSlot] = []
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    recurrence: Optional[RecurrenceRule] = None
+    # True: book every occurrence or none. False: book the free ones, skip the rest.
+    atomic: bool = True
+
+    _utc_times = _utc_validator("start_time", "end_time")
+
+class ReservationBatchItem(BaseModel):
+    index: int  # position of the occurrence, in start time order
+    start_time: datetime
+    end_time: datetime
+    # created: booked; conflict: overlaps an existing booking or an earlier occurrence;
+    # skipped: free, but not booked because the batch was atomic and had conflicts
+    status: Literal["created", "conflict", "skipped"]
+    reservation_id: Optional[int] = None
+    conflicting_reservation_id: Optional[int] = None
+
+class ReservationBatchResult(BaseModel):
+    created: int
+    conflicts: int
+    results: List[ReservationBatchItem]
+
+
 # --- Schema for API Input (Update) ---
 # Properties to receive via API on reservation update (e.g., by an admin).
 class ReservationUpdate(BaseModel):
@@ -35,6 +113,8 @@ class ReservationUpdate(BaseModel):
     end_time: Optional[datetime] = None
     status: Optional[ReservationStatus] = None
 
+    _utc_times = _utc_validator("start_time", "end_time")
+
 
 # --- Schema for API Output ---
 # This is the main schema for returning reservation data to the client.
@@ -55,4 +135,26 @@ class Reservation(ReservationBase):
 
 class ReservationList(BaseModel):
     data: List[Reservation]
-    total: int
\ No newline at end of file
+    # None when the client asked for `total=none`
+    total: Optional[int]
+    # Pass back as `cursor` to fetch the following page; None on the last page
+    next_cursor: Optional[str] = None
+
+# --- Schemas for Compact API Output ---
+# Returned when a list is requested with `fields=` / `expand=`. The nested user and
+# instrument are only present when expanded, and unset fields are left out.
+class ReservationSummary(BaseModel):
+    id: int
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    status: Optional[ReservationStatus] = None
+    user_id: Optional[int] = None
+    instrument_id: Optional[int] = None
+
+    user: Optional[UserSummary] = None
+    instrument: Optional[InstrumentSummary] = None
+
+class ReservationSummaryList(BaseModel):
+    data: List[ReservationSummary]
+    total: Optional[int]
+    next_cursor: Optional[str] = None
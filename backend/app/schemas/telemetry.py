@@ -0,0 +1,43 @@
+from pydantic import BaseModel, validator
+from typing import Dict, Optional
+
+from app.models.telemetry import TelemetryKind
+
+# Usage counters accepted per report.
+MAX_COUNTERS = 32
+
+# --- Schema for API Input ---
+# What an instrument PC reports: a heartbeat every few seconds, and the start and end
+# of each session. Which user is at the instrument is not taken from the report, as
+# every PC holds the same key; the server looks up the reservation in progress.
+class TelemetryReport(BaseModel):
+    instrument_id: int
+    kind: TelemetryKind = TelemetryKind.HEARTBEAT
+    # Whether a session is in progress. Required for heartbeats; implied otherwise.
+    in_use: Optional[bool] = None
+    # Optional usage counters, e.g. {"acquisitions": 3, "lamp_hours": 1201.5}
+    counters: Optional[Dict[str, float]] = None
+
+    @validator("kind")
+    def kind_is_reported(cls, v):
+        if v == TelemetryKind.OFFLINE:
+            raise ValueError("Offline reports are recorded by the server")
+        return v
+
+    @validator("in_use", always=True)
+    def in_use_is_known(cls, v, values):
+        implied = {
+            TelemetryKind.SESSION_START: True,
+            TelemetryKind.SESSION_END: False,
+        }.get(values.get("kind"))
+        if implied is not None:
+            return implied
+        if v is None:
+            raise ValueError("A heartbeat must say whether the instrument is in use")
+        return v
+
+    @validator("counters")
+    def few_counters(cls, v):
+        if v is not None and len(v) > MAX_COUNTERS:
+            raise ValueError(f"At most {MAX_COUNTERS} counters per report")
+        return v
@@ -1,8 +1,8 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 from app.models.user import UserRole
-from .instrument import Instrument
+from .instrument import Instrument, InstrumentSummary
 
 # -- Base Schemas --
 class UserBase(BaseModel):
@@ -50,6 +50,37 @@ class User(UserBase):
 class UserBulkCreate(BaseModel):
     users: List[UserCreate]
 
+class UserImportRow(BaseModel):
+    row: int  # 1-based position in the upload, not counting a CSV header
+    email: Optional[str] = None
+    # created: inserted; exists: email already registered; duplicate: email repeated
+    # earlier in the upload; invalid: the row failed validation
+    status: Literal["created", "exists", "duplicate", "invalid"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class UserImportResult(BaseModel):
+    created: int
+    skipped: int
+    results: List[UserImportRow]
+
 class UserList(BaseModel):
     data: List[User]
-    total: int
\ No newline at end of file
+    total: Optional[int]
+    next_cursor: Optional[str] = None
+
+# -- Schemas for Compact API Output --
+# Returned when a list is requested with `fields=` / `expand=`. Only the requested
+# fields are set, and unset fields are left out of the response.
+class UserSummary(BaseModel):
+    id: int
+    email: Optional[str] = None
+    full_name: Optional[str] = None
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+    authorized_instruments: Optional[List[InstrumentSummary]] = None
+
+class UserSummaryList(BaseModel):
+    data: List[UserSummary]
+    total: Optional[int]
+    next_cursor: Optional[str] = None
@@ -1,24 +1,77 @@
-from fastapi import FastAPI, APIRouter
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from app.api import deps
+from app.core import events
 from app.core.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.security import shutdown_hash_pool
+from app.crud import analytics, crud_log, crud_telemetry, lifecycle
+from app.db import partitions
+from app.db.session import async_engine, async_replica_engine, engine
+from app.crud.pagination import InvalidCursorError
 
-# --- 1. CRUCIAL: Import ALL models so create_all knows about them ---
-from app.models import user, instrument, reservation, log, permission
+# --- 1. CRUCIAL: Import ALL models so that every mapper relationship can be resolved ---
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
 
 # --- Import API Routers ---
 from app.api.v1.endpoints import users as users_router
 from app.api.v1.endpoints import instruments as instruments_router
 from app.api.v1.endpoints import reservations as reservations_router
 from app.api.v1.endpoints import permissions as permissions_router
+from app.api.v1.endpoints import logs as logs_router
+from app.api.v1.endpoints import system as system_router
+from app.api.v1.endpoints import events as events_router
+from app.api.v1.endpoints import telemetry as telemetry_router
+from app.api.v1.endpoints import analytics as analytics_router
+
+def run_migrations():
+    """
+    Brings the database schema up to date by applying any pending Alembic migrations.
+    The schema itself is defined by the revisions in backend/alembic/versions.
+    """
+    alembic_cfg = Config(str(Path(__file__).resolve().parent / "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", str(Path(__file__).resolve().parent / "alembic"))
+    # Keep the server's logging configuration instead of alembic.ini's.
+    alembic_cfg.attributes["configure_logger"] = False
+    command.upgrade(alembic_cfg, "head")
 
-def create_tables():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """
-    Creates all database tables defined in the imported models.
+    Starts background services with the application and stops them on shutdown.
     """
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        partitions.ensure_upcoming_partitions(
+            connection, months_ahead=settings.ACCESS_LOG_PARTITIONS_AHEAD
+        )
+    if settings.ACCESS_LOG_ASYNC:
+        crud_log.log_writer.start()
+    if settings.RESERVATION_LIFECYCLE_ENABLED:
+        lifecycle.scheduler.start()
+    analytics.maintainer.start()
+    if settings.TELEMETRY_INGEST_KEY:
+        crud_telemetry.telemetry_writer.start()
+        crud_telemetry.presence_monitor.start()
+    await events.broker.start()
+    yield
+    await events.broker.stop()
+    crud_telemetry.presence_monitor.shutdown()
+    crud_telemetry.telemetry_writer.shutdown()
+    lifecycle.scheduler.shutdown()
+    # Refresh the rollups of the last changes before the worker exits.
+    analytics.maintainer.shutdown()
+    # Synchronously write every queued log entry before the worker exits.
+    crud_log.log_writer.shutdown()
+    shutdown_hash_pool()
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
 
 def create_app() -> FastAPI:
     """
@@ -26,7 +79,8 @@ def create_app() -> FastAPI:
     """
     app = FastAPI(
         title=settings.PROJECT_NAME,
-        openapi_url=f"{settings.API_V1_STR}/openapi.json"
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        lifespan=lifespan,
     )
 
     # --- Add the CORS middleware ---
@@ -42,6 +96,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Pins the reads of a user who just wrote to the primary (see deps.pin_reads_to_primary)
+    app.add_middleware(deps.ReadYourWritesMiddleware)
+
     # --- Include API Routers ---
     api_router = APIRouter()
     
@@ -50,14 +107,25 @@ def create_app() -> FastAPI:
     api_router.include_router(instruments_router.router, prefix="/instruments", tags=["Instruments"])
     api_router.include_router(reservations_router.router, prefix="/reservations", tags=["Reservations"])
     api_router.include_router(permissions_router.router, prefix="/permissions", tags=["Permissions"])
+    api_router.include_router(logs_router.router, prefix="/logs", tags=["Logs"])
+    api_router.include_router(system_router.router, prefix="/system", tags=["System"])
+    api_router.include_router(events_router.router, prefix="/events", tags=["Events"])
+    api_router.include_router(telemetry_router.router, prefix="/telemetry", tags=["Telemetry"])
+    api_router.include_router(analytics_router.router, prefix="/analytics", tags=["Analytics"])
     
     # Mount the main v1 router to the app
     app.include_router(api_router, prefix=settings.API_V1_STR)
+
+    # --- Error Handlers ---
+    @app.exception_handler(InvalidCursorError)
+    async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+        return JSONResponse(status_code=400, content={"detail": str(exc)})
     
     return app
 
-# Create the tables on startup
-create_tables()
+# Bring the schema up to date on startup
+if settings.RUN_MIGRATIONS_ON_STARTUP:
+    run_migrations()
 
 # Create the FastAPI app instance
 app = create_app()
@@ -0,0 +1,171 @@
+"""
+Export access-log months older than the retention period to compressed files, then
+remove them from the database.
+
+Each month is written to <output-dir>/access_logs_2025-01.ndjson.gz (one JSON object
+per line) or access_logs_2025-01.parquet (needs pyarrow), streamed through a
+temporary file that is renamed once complete. Only then is the month removed: on
+PostgreSQL by detaching and dropping its partition, which is as quick for a big
+month as for a small one and leaves nothing to vacuum; elsewhere, and for stray rows
+in the default partition, with a DELETE. A month that fails to export stays in the
+database and is retried on the next run. The job also creates the partitions of the
+coming months.
+
+Run from the backend/ directory, e.g. daily from cron:
+    python -m scripts.archive_access_logs --output-dir /var/archive/access_logs
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Connection
+
+# Import ALL models so that every relationship can be resolved.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.core.config import settings
+from app.db import partitions
+from app.db.session import engine
+from app.models.log import AccessLog
+
+BATCH_SIZE = 10_000
+
+log_table = AccessLog.__table__
+
+def months_to_archive(connection: Connection, cutoff: datetime) -> List[datetime]:
+    """
+    The months before `cutoff` (a month start) with entries or a partition, oldest first.
+    """
+    months = {partition.month for partition in partitions.list_partitions(connection)
+              if partition.month < cutoff}
+    oldest = connection.scalar(select(func.min(log_table.c.timestamp)))
+    if oldest is not None and oldest < cutoff:
+        month = partitions.month_start(oldest)
+        while month < cutoff:
+            months.add(month)
+            month = partitions.add_months(month, 1)
+    return sorted(months)
+
+def read_month(connection: Connection, month: datetime) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream one month of entries in batches, oldest first.
+    """
+    result = connection.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(
+        select(log_table)
+        .where(
+            log_table.c.timestamp >= month,
+            log_table.c.timestamp < partitions.add_months(month, 1),
+        )
+        .order_by(log_table.c.timestamp, log_table.c.id)
+    )
+    for rows in result.mappings().partitions():
+        yield [dict(row) for row in rows]
+
+def write_ndjson(path: Path, batches: Iterator[List[Dict[str, Any]]]) -> int:
+    written = 0
+    with gzip.open(path, "wt", encoding="utf-8") as output:
+        for batch in batches:
+            for row in batch:
+                output.write(json.dumps(row, default=datetime.isoformat, separators=(",", ":")))
+                output.write("\n")
+            written += len(batch)
+    return written
+
+def write_parquet(path: Path, batches: Iterator[List[Dict[str, Any]]]) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("--format parquet needs the `pyarrow` package (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("user_id", pa.int64()),
+        ("action", pa.string()),
+        # Free-form JSON, kept as text.
+        ("details", pa.string()),
+    ])
+    written = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for batch in batches:
+            for row in batch:
+                row["details"] = None if row["details"] is None else json.dumps(row["details"])
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            written += len(batch)
+    return written
+
+WRITERS = {"ndjson": (".ndjson.gz", write_ndjson), "parquet": (".parquet", write_parquet)}
+
+def archive_month(month: datetime, *, output_dir: Path, file_format: str) -> int:
+    """
+    Export one month and remove it from the database. Returns the number of entries.
+    """
+    suffix, write = WRITERS[file_format]
+    path = output_dir / f"{partitions.TABLE}_{month:%Y-%m}{suffix}"
+    temporary = path.with_name(path.name + ".tmp")
+    # Old months get no new entries, so reading them outside the removing transaction is safe.
+    with engine.connect() as connection:
+        count = write(temporary, read_month(connection, month))
+    with open(temporary, "rb") as written:
+        os.fsync(written.fileno())
+    os.replace(temporary, path)
+
+    following = partitions.add_months(month, 1)
+    with engine.begin() as connection:
+        if partitions.partition_name(month) in {
+            partition.name for partition in partitions.list_partitions(connection)
+        }:
+            partitions.drop_partition(connection, partitions.partition_name(month))
+        # Rows of the month outside its partition (or in the only table elsewhere).
+        connection.execute(
+            delete(log_table).where(log_table.c.timestamp >= month, log_table.c.timestamp < following)
+        )
+    return count
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--retention-months", type=int, default=settings.ACCESS_LOG_RETENTION_MONTHS,
+                        help="months kept in the database, besides the current one")
+    parser.add_argument("--output-dir", type=Path, default=Path(settings.ACCESS_LOG_ARCHIVE_DIR))
+    parser.add_argument("--format", choices=sorted(WRITERS), default="ndjson")
+    parser.add_argument("--dry-run", action="store_true", help="only list the months to archive")
+    args = parser.parse_args(argv)
+
+    now = datetime.utcnow()
+    cutoff = partitions.add_months(partitions.month_start(now), -args.retention_months)
+    with engine.begin() as connection:
+        created = partitions.ensure_upcoming_partitions(
+            connection, months_ahead=settings.ACCESS_LOG_PARTITIONS_AHEAD, now=now
+        )
+        months = months_to_archive(connection, cutoff)
+    for name in created:
+        print(f"created partition {name}")
+    if not months:
+        print(f"Nothing older than {cutoff:%Y-%m} to archive.")
+        return 0
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    failures = 0
+    for month in months:
+        if args.dry_run:
+            print(f"would archive {month:%Y-%m}")
+            continue
+        try:
+            count = archive_month(month, output_dir=args.output_dir, file_format=args.format)
+        except Exception as exc:
+            failures += 1
+            print(f"FAIL  {month:%Y-%m}: {exc}", file=sys.stderr)
+            continue
+        print(f"archived {month:%Y-%m}: {count} entries")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Check that the hot reservation and access-log queries are answered from indexes.
+
+The script seeds a large synthetic dataset inside a transaction, runs the real CRUD
+queries while capturing the SQL they emit, and EXPLAINs every captured statement.
+It exits with status 1 if any plan falls back to a sequential scan of a checked
+table. The transaction is rolled back at the end, so the database is left as it was.
+
+Run from the backend/ directory against a migrated database:
+    python -m scripts.check_query_plans --reservations 200000 --logs 200000
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# Import ALL models before the CRUD modules so that every relationship can be resolved.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.crud import crud_reservation, crud_log
+from app.crud.pagination import TotalMode, encode_cursor
+from app.db import partitions
+from app.db.session import engine
+from app.models.instrument import Instrument, InstrumentStatus
+from app.models.log import AccessLog
+from app.models.permission import user_instrument_permission
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.user import User, UserRole
+
+CHECKED_TABLES = {"reservations", "access_logs", "user_instrument_permission"}
+BATCH_SIZE = 10_000
+
+def seed(connection: Connection, *, users: int, instruments: int, reservations: int, logs: int) -> None:
+    """
+    Insert a synthetic dataset spread over a year around today.
+    """
+    rng = random.Random(42)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    user_ids = list(range(1, users + 1))
+    instrument_ids = list(range(1, instruments + 1))
+    # Explicit ids keep the seed independent of whatever rows already exist.
+    id_offset = 10_000_000
+
+    connection.execute(insert(User), [
+        {"id": id_offset + i, "email": f"plan-check-{i}@example.com", "hashed_password": "x",
+         "full_name": f"Plan Check {i}", "role": UserRole.STUDENT, "is_active": True}
+        for i in user_ids
+    ])
+    connection.execute(insert(Instrument), [
+        {"id": id_offset + i, "name": f"Instrument {i}", "location": f"Lab {i % 20}",
+         "is_active": True, "status": InstrumentStatus.AVAILABLE}
+        for i in instrument_ids
+    ])
+    connection.execute(insert(user_instrument_permission), [
+        {"user_id": id_offset + u, "instrument_id": id_offset + i}
+        for u in user_ids for i in rng.sample(instrument_ids, k=min(5, instruments))
+    ])
+
+    # Most rows are history, as in a long-running deployment. Upcoming rows are active
+    # and laid out back to back per instrument, so they never overlap.
+    past_statuses = [ReservationStatus.COMPLETED] * 3 + [ReservationStatus.MISSED, ReservationStatus.CANCELLED]
+    upcoming = reservations // 10
+    next_free = {i: now for i in instrument_ids}
+    rows: List[Dict[str, Any]] = []
+    for n in range(reservations):
+        instrument_id = rng.choice(instrument_ids)
+        if n < upcoming:
+            start = next_free[instrument_id] + timedelta(hours=rng.randint(0, 6))
+            status = ReservationStatus.CONFIRMED
+        else:
+            start = now - timedelta(hours=rng.randint(5, 24 * 300))
+            status = rng.choice(past_statuses)
+        end = start + timedelta(hours=rng.randint(1, 4))
+        if n < upcoming:
+            next_free[instrument_id] = end
+        rows.append({
+            "start_time": start,
+            "end_time": end,
+            "status": status,
+            "user_id": id_offset + rng.choice(user_ids),
+            "instrument_id": id_offset + instrument_id,
+        })
+        if len(rows) >= BATCH_SIZE:
+            connection.execute(insert(Reservation), rows)
+            rows = []
+    if rows:
+        connection.execute(insert(Reservation), rows)
+
+    # Seeded entries go into their monthly partitions, not the default one.
+    partitions.ensure_partitions(connection, first=now - timedelta(days=366), last=now)
+    rows = []
+    for _ in range(logs):
+        rows.append({
+            "timestamp": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+            "user_id": id_offset + rng.choice(user_ids),
+            "action": rng.choice(["USER_LOGIN", "RESERVATION_CREATED", "RESERVATION_CANCELLED"]),
+            "details": None,
+        })
+        if len(rows) >= BATCH_SIZE:
+            connection.execute(insert(AccessLog), rows)
+            rows = []
+    if rows:
+        connection.execute(insert(AccessLog), rows)
+
+def hot_queries(id_offset: int) -> List[Tuple[str, Callable[[Session], Any]]]:
+    """
+    The queries behind the booking check, schedule and list endpoints.
+    """
+    now = datetime.utcnow()
+    user_id = id_offset + 1
+    instrument_id = id_offset + 1
+    return [
+        ("is_timeslot_available", lambda db: crud_reservation.is_timeslot_available(
+            db, instrument_id=instrument_id, start_time=now, end_time=now + timedelta(hours=2))),
+        ("get_multi_by_instrument", lambda db: crud_reservation.get_multi_by_instrument(
+            db, instrument_id=instrument_id)),
+        ("get_multi_by_user", lambda db: crud_reservation.get_multi_by_user(
+            db, user_id=user_id, limit=10)),
+        ("get_multi_all(user_id)", lambda db: crud_reservation.get_multi_all(
+            db, user_id=user_id)),
+        ("get_multi_all(instrument_id)", lambda db: crud_reservation.get_multi_all(
+            db, instrument_id=instrument_id)),
+        ("get_multi_all(cursor)", lambda db: crud_reservation.get_multi_all(
+            db, cursor=encode_cursor((now - timedelta(days=200), 0)), total_mode=TotalMode.NONE)),
+        ("crud_log.get_multi(cursor)", lambda db: crud_log.get_multi(
+            db, cursor=encode_cursor((now - timedelta(days=200), 0)))),
+        ("access_logs by user and time", lambda db: db.query(AccessLog)
+            .filter(AccessLog.user_id == user_id, AccessLog.timestamp >= now - timedelta(days=7))
+            .order_by(AccessLog.timestamp.desc()).limit(50).all()),
+        ("access_logs by time", lambda db: db.query(AccessLog)
+            .filter(AccessLog.timestamp >= now - timedelta(hours=1))
+            .order_by(AccessLog.timestamp.desc()).limit(50).all()),
+        ("crud_log.get_multi(user_id, time range)", lambda db: crud_log.get_multi(
+            db, user_id=user_id, start=now - timedelta(days=30), end=now)),
+        ("crud_log.get_multi(action, time range)", lambda db: crud_log.get_multi(
+            db, action="RESERVATION_CANCELLED", start=now - timedelta(days=30), end=now)),
+    ]
+
+def sequential_scans(connection: Connection, statement: str, parameters: Any) -> List[str]:
+    """
+    EXPLAIN a statement and return the checked tables it reads with a sequential scan.
+    """
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        found: List[str] = []
+        stack = [plan[0]["Plan"]]
+        while stack:
+            node = stack.pop()
+            relation = node.get("Relation Name", "")
+            # Monthly partitions are reported by their own names.
+            if relation.startswith(partitions.TABLE + "_"):
+                relation = partitions.TABLE
+            if node.get("Node Type") == "Seq Scan" and relation in CHECKED_TABLES:
+                found.append(node["Relation Name"])
+            stack.extend(node.get("Plans", []))
+        return found
+
+    # SQLite: "SCAN <table>" without an index is a full table scan.
+    found = []
+    for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+        detail = row[-1].split()
+        if len(detail) >= 2 and detail[0] == "SCAN" and detail[1] in CHECKED_TABLES \
+                and "INDEX" not in detail:
+            found.append(detail[1])
+    return found
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--instruments", type=int, default=300)
+    parser.add_argument("--reservations", type=int, default=200_000)
+    parser.add_argument("--logs", type=int, default=200_000)
+    args = parser.parse_args()
+
+    failures = 0
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            print(f"Seeding {args.reservations} reservations and {args.logs} log entries...")
+            seed(connection, users=args.users, instruments=args.instruments,
+                 reservations=args.reservations, logs=args.logs)
+            connection.exec_driver_sql("ANALYZE")
+
+            captured: List[Tuple[str, Any]] = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    captured.append((statement, parameters))
+
+            db = Session(bind=connection)
+            for label, run in hot_queries(id_offset=10_000_000):
+                captured.clear()
+                event.listen(connection, "before_cursor_execute", capture)
+                try:
+                    run(db)
+                finally:
+                    event.remove(connection, "before_cursor_execute", capture)
+                failed = False
+                for statement, parameters in list(captured):
+                    scans = sequential_scans(connection, statement, parameters)
+                    if scans:
+                        failed = True
+                        failures += 1
+                        print(f"FAIL  {label}: sequential scan on {', '.join(sorted(set(scans)))}")
+                        print("      " + " ".join(statement.split()))
+                if not failed:
+                    print(f"ok    {label}")
+        finally:
+            transaction.rollback()
+
+    if failures:
+        print(f"{failures} statement(s) fell back to a sequential scan.")
+        return 1
+    print("All hot queries use indexes.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
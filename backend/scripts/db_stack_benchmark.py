@@ -0,0 +1,154 @@
+"""
+Compare request throughput of the sync and the async database stacks.
+
+Both runs replay the same read-heavy request mix against the configured database
+through the real CRUD functions: a page of a user's reservations, an instrument's
+upcoming schedule and an availability check. `--concurrency` clients send requests
+back to back. The sync run serves them from a thread pool of `--threads` workers,
+as Starlette does for sync endpoints (40 threads by default); the async run serves
+them from the event loop. The database pool is sized the same for both.
+
+Use PostgreSQL: on SQLite, aiosqlite runs every connection on a thread of its own
+and opens a new one per session, so the async numbers say nothing about asyncpg.
+
+Run from the backend/ directory against a database with some data in it:
+    python -m scripts.db_stack_benchmark --concurrency 400 --requests 20000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+# Import ALL models before the CRUD modules so that every relationship can be resolved.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.crud import crud_reservation
+from app.crud.pagination import TotalMode
+from app.db.session import _async_url, db_url
+from app.models.instrument import Instrument
+from app.models.user import User
+
+# (user id, instrument id, start of the checked timeslot)
+Item = Tuple[int, int, datetime]
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def report(label: str, latencies: List[float], elapsed: float) -> None:
+    print(
+        f"{label:<6} {len(latencies) / elapsed:8.1f} req/s   "
+        f"p50={percentile(latencies, 50):7.1f} ms  p99={percentile(latencies, 99):7.1f} ms  "
+        f"mean={statistics.fmean(latencies):7.1f} ms"
+    )
+
+def pick_workload(count: int, user_ids: List[int], instrument_ids: List[int]) -> List[Item]:
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    return [
+        (rng.choice(user_ids), rng.choice(instrument_ids), now + timedelta(hours=rng.randint(1, 24 * 60)))
+        for _ in range(count)
+    ]
+
+def pool_options(args: argparse.Namespace) -> dict:
+    # SQLite engines don't take a sized pool; it is only meaningful on PostgreSQL anyway.
+    if db_url.startswith("sqlite"):
+        return {}
+    return {"pool_size": args.pool_size, "max_overflow": 0}
+
+async def drive(
+    label: str, args: argparse.Namespace, workload: List[Item], handle: Callable[[Item], Awaitable[None]]
+) -> None:
+    """
+    Let `--concurrency` clients send the workload back to back and report how it went.
+    Latency is measured from the moment a client sends a request, so it includes
+    waiting for a thread or a connection.
+    """
+    pending = iter(workload)
+    latencies: List[float] = []
+
+    async def client() -> None:
+        for item in pending:
+            started = time.perf_counter()
+            await handle(item)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    report(label, latencies, time.perf_counter() - started)
+
+async def run_sync(args: argparse.Namespace, workload: List[Item]) -> None:
+    engine = create_engine(db_url, **pool_options(args))
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    def handle_in_thread(item: Item) -> None:
+        user_id, instrument_id, start = item
+        with Session() as db:
+            crud_reservation.get_multi_by_user(db, user_id=user_id, limit=10, total_mode=TotalMode.NONE)
+            crud_reservation.get_multi_by_instrument(db, instrument_id=instrument_id, limit=20)
+            crud_reservation.is_timeslot_available(
+                db, instrument_id=instrument_id, start_time=start, end_time=start + timedelta(hours=1)
+            )
+
+    # Sync endpoints run in a bounded thread pool, as Starlette does.
+    threads = ThreadPoolExecutor(max_workers=args.threads)
+    loop = asyncio.get_running_loop()
+
+    async def handle(item: Item) -> None:
+        await loop.run_in_executor(threads, handle_in_thread, item)
+
+    await drive("sync", args, workload, handle)
+    threads.shutdown()
+    engine.dispose()
+
+async def run_async(args: argparse.Namespace, workload: List[Item]) -> None:
+    engine = create_async_engine(_async_url(db_url), **pool_options(args))
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def handle(item: Item) -> None:
+        user_id, instrument_id, start = item
+        async with Session() as db:
+            await crud_reservation.aget_multi_by_user(
+                db, user_id=user_id, limit=10, total_mode=TotalMode.NONE
+            )
+            await crud_reservation.aget_multi_by_instrument(db, instrument_id=instrument_id, limit=20)
+            await crud_reservation.ais_timeslot_available(
+                db, instrument_id=instrument_id, start_time=start, end_time=start + timedelta(hours=1)
+            )
+
+    await drive("async", args, workload, handle)
+    await engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=400, help="simulated concurrent clients")
+    parser.add_argument("--threads", type=int, default=40, help="thread pool size of the sync run")
+    parser.add_argument("--pool-size", type=int, default=20, help="database connections per run")
+    args = parser.parse_args()
+
+    engine = create_engine(db_url)
+    with engine.connect() as connection:
+        user_ids = list(connection.scalars(select(User.id)))
+        instrument_ids = list(connection.scalars(select(Instrument.id)))
+    engine.dispose()
+    if not user_ids or not instrument_ids:
+        raise SystemExit("The database needs at least one user and one instrument.")
+
+    workload = pick_workload(args.requests, user_ids, instrument_ids)
+    print(
+        f"{args.requests} requests, {args.concurrency} clients, "
+        f"{args.threads} sync threads, {args.pool_size} connections"
+    )
+    asyncio.run(run_sync(args, workload))
+    asyncio.run(run_async(args, workload))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Load-test the API endpoints and record throughput and latency per route.
+
+`--concurrency` clients, each logged in as a different synthetic user (see
+scripts/synthetic_data.py), send a weighted mix of requests back to back for
+`--duration` seconds:
+    login                POST /users/login/access-token
+    book                 POST /reservations/ (a free-looking slot of a permitted instrument)
+    my_reservations      GET  /reservations/my-reservations
+    instrument_schedule  GET  /reservations/instrument/{id}
+    catalog              GET  /instruments/
+Requests of the first `--warmup` seconds are not counted. A booking answered 409
+counts as served: some clients pick a taken slot.
+
+By default the app runs in this process, through httpx's ASGI transport, which is
+enough to tell whether a change made a route slower. For numbers like production,
+start uvicorn with its workers and pass `--base-url`. Either way the accounts are
+read from the configured database, so point both at the same one.
+
+Results are written as JSON to `--output`; `--compare` prints the change of every
+route against an earlier result file.
+
+Run from the backend/ directory against a seeded database:
+    python -m scripts.endpoint_benchmark --concurrency 50 --duration 60
+    python -m scripts.endpoint_benchmark --compare benchmark_results/before.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+import numpy as np
+from sqlalchemy import func, select
+
+# Import ALL models so that every relationship can be resolved.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.core.config import settings
+from app.db.session import engine
+from app.models.instrument import Instrument
+from app.models.log import AccessLog
+from app.models.permission import user_instrument_permission
+from app.models.reservation import Reservation
+from app.models.user import User, UserRole
+from scripts.synthetic_data import DEFAULT_PASSWORD, EMAIL_DOMAIN
+
+DEFAULT_MIX = "login=1,book=2,my_reservations=4,instrument_schedule=4,catalog=6"
+PERCENTILES = (50, 90, 95, 99)
+
+class Account(NamedTuple):
+    email: str
+    instrument_ids: List[int]
+
+class Sample(NamedTuple):
+    route: str
+    started: float
+    latency_ms: float
+    status: str
+    ok: bool
+
+class Client:
+    """
+    One simulated user: its token and the instruments it may book.
+    """
+    def __init__(self, http: httpx.AsyncClient, account: Account, password: str, rng: random.Random):
+        self.http = http
+        self.account = account
+        self.password = password
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+
+    async def login(self) -> httpx.Response:
+        response = await self.http.post(
+            f"{settings.API_V1_STR}/users/login/access-token",
+            data={"username": self.account.email, "password": self.password},
+        )
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return response
+
+    async def book(self) -> httpx.Response:
+        # Hour slots 400 to 765 days ahead, beyond the seeded schedule: mostly free.
+        start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(
+            hours=self.rng.randint(400 * 24, 765 * 24)
+        )
+        return await self.http.post(
+            f"{settings.API_V1_STR}/reservations/",
+            headers=self.headers,
+            json={
+                "instrument_id": self.rng.choice(self.account.instrument_ids),
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=1)).isoformat(),
+            },
+        )
+
+    async def my_reservations(self) -> httpx.Response:
+        return await self.http.get(
+            f"{settings.API_V1_STR}/reservations/my-reservations",
+            headers=self.headers,
+            params={"limit": 10},
+        )
+
+    async def instrument_schedule(self) -> httpx.Response:
+        instrument_id = self.rng.choice(self.account.instrument_ids)
+        return await self.http.get(
+            f"{settings.API_V1_STR}/reservations/instrument/{instrument_id}", params={"limit": 20}
+        )
+
+    async def catalog(self) -> httpx.Response:
+        return await self.http.get(f"{settings.API_V1_STR}/instruments/", headers=self.headers)
+
+# Statuses that count as served, per route.
+ROUTES: Dict[str, Tuple[Callable[[Client], Awaitable[httpx.Response]], Tuple[int, ...]]] = {
+    "login": (Client.login, (200,)),
+    "book": (Client.book, (201, 409)),
+    "my_reservations": (Client.my_reservations, (200,)),
+    "instrument_schedule": (Client.instrument_schedule, (200,)),
+    "catalog": (Client.catalog, (200,)),
+}
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for part in mix.split(","):
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in ROUTES:
+            raise SystemExit(f"Unknown route in --mix: {route!r} (known: {', '.join(ROUTES)})")
+        weights[route] = float(weight or 1)
+    return {route: weight for route, weight in weights.items() if weight > 0}
+
+def load_accounts(count: int) -> List[Account]:
+    """
+    Pick `count` synthetic non-admin users at random, with their permitted instruments.
+    """
+    with engine.connect() as connection:
+        user_rows = connection.execute(
+            select(User.id, User.email)
+            .where(User.email.like(f"%@{EMAIL_DOMAIN}"), User.role != UserRole.ADMIN, User.is_active)
+            .order_by(func.random())
+            .limit(count)
+        ).all()
+        permitted: Dict[int, List[int]] = {}
+        for user_id, instrument_id in connection.execute(
+            select(user_instrument_permission.c.user_id, user_instrument_permission.c.instrument_id)
+            .where(user_instrument_permission.c.user_id.in_([row.id for row in user_rows]))
+        ):
+            permitted.setdefault(user_id, []).append(instrument_id)
+    accounts = [Account(row.email, permitted[row.id]) for row in user_rows if row.id in permitted]
+    if not accounts:
+        raise SystemExit("No synthetic users found; seed the database with scripts.synthetic_data first.")
+    return accounts
+
+def dataset_summary() -> Dict[str, Any]:
+    with engine.connect() as connection:
+        summary: Dict[str, Any] = {"database": connection.dialect.name}
+        for name, model in (("users", User), ("instruments", Instrument),
+                            ("reservations", Reservation), ("access_logs", AccessLog)):
+            summary[name] = connection.scalar(select(func.count()).select_from(model))
+    return summary
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def drive(clients: List[Client], weights: Dict[str, float], stop_at: float) -> List[Sample]:
+    """
+    Let every client send requests back to back until `stop_at`.
+    """
+    routes, route_weights = list(weights), list(weights.values())
+    samples: List[Sample] = []
+
+    async def send_requests(client: Client) -> None:
+        while time.perf_counter() < stop_at:
+            route = client.rng.choices(routes, route_weights)[0]
+            send, served = ROUTES[route]
+            started = time.perf_counter()
+            try:
+                response = await send(client)
+                status, ok = str(response.status_code), response.status_code in served
+            except httpx.HTTPError as exc:
+                status, ok = type(exc).__name__, False
+            samples.append(Sample(route, started, (time.perf_counter() - started) * 1000, status, ok))
+
+    await asyncio.gather(*(send_requests(client) for client in clients))
+    return samples
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[sample.status] = statuses.get(sample.status, 0) + 1
+    latencies = np.array([sample.latency_ms for sample in samples], dtype=np.float64)
+    summary: Dict[str, Any] = {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample.ok),
+        "throughput": round(len(samples) / elapsed, 2),
+        "statuses": dict(sorted(statuses.items())),
+    }
+    if len(latencies):
+        points = np.percentile(latencies, PERCENTILES)
+        summary["latency_ms"] = {
+            "mean": round(float(latencies.mean()), 2),
+            **{f"p{pct}": round(float(value), 2) for pct, value in zip(PERCENTILES, points)},
+            "max": round(float(latencies.max()), 2),
+        }
+    return summary
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    weights = parse_mix(args.mix)
+    started_at = datetime.utcnow()
+    accounts = load_accounts(args.concurrency)
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            http = httpx.AsyncClient(
+                base_url=args.base_url,
+                limits=httpx.Limits(max_connections=args.concurrency + 10),
+                timeout=args.timeout,
+            )
+        else:
+            import main
+
+            # The ASGI transport doesn't run the lifespan; the background services should run.
+            await stack.enter_async_context(main.app.router.lifespan_context(main.app))
+            http = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark", timeout=args.timeout
+            )
+        await stack.enter_async_context(http)
+
+        clients = [
+            Client(http, accounts[n % len(accounts)], args.password, random.Random(args.seed + n))
+            for n in range(args.concurrency)
+        ]
+        logins = await asyncio.gather(*(client.login() for client in clients))
+        failed = [response.status_code for response in logins if response.status_code != 200]
+        if failed:
+            raise SystemExit(f"{len(failed)} of {len(clients)} clients could not log in (statuses {sorted(set(failed))}).")
+
+        started = time.perf_counter()
+        measured_from = started + args.warmup
+        samples = await drive(clients, weights, measured_from + args.duration)
+        elapsed = time.perf_counter() - measured_from
+
+    measured = [sample for sample in samples if sample.started >= measured_from]
+    return {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "target": args.base_url or "in-process",
+        "dataset": dataset_summary(),
+        "parameters": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "mix": weights,
+            "seed": args.seed,
+        },
+        "total": summarize(measured, elapsed),
+        "routes": {
+            route: summarize([sample for sample in measured if sample.route == route], elapsed)
+            for route in weights
+        },
+    }
+
+def _cell(summary: Dict[str, Any], before: Optional[Dict[str, Any]], key: str) -> str:
+    """
+    One figure of a route, with its change against the baseline if there is one.
+    """
+    def figure(source: Optional[Dict[str, Any]]) -> Optional[float]:
+        if not source:
+            return None
+        return source["throughput"] if key == "req/s" else source.get("latency_ms", {}).get(key)
+
+    now, earlier = figure(summary), figure(before)
+    if now is None:
+        return "-"
+    if not earlier:
+        return f"{now:.1f}"
+    return f"{now:.1f} ({(now - earlier) / earlier * 100:+.0f}%)"
+
+def report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    keys = ("req/s", "p50", "p99")
+    print(f"{'route':<20}" + "".join(f"{key:>18}" for key in keys) + f"{'errors':>8}")
+    rows = [*result["routes"].items(), ("total", result["total"])]
+    for route, summary in rows:
+        if baseline is None:
+            before = None
+        elif route == "total":
+            before = baseline.get("total")
+        else:
+            before = baseline.get("routes", {}).get(route)
+        print(
+            f"{route:<20}" + "".join(f"{_cell(summary, before, key):>18}" for key in keys)
+            + f"{summary['errors']:>8}"
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="benchmark a running server instead of the app in this process")
+    parser.add_argument("--concurrency", type=int, default=20, help="simulated concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route weights, e.g. catalog=6,book=1")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="password of the synthetic users")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="result file (default: benchmark_results/<time>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    result = asyncio.run(run(args))
+    report(result, baseline)
+
+    output = args.output or Path("benchmark_results") / f"endpoints-{datetime.utcnow():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
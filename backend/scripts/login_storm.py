@@ -0,0 +1,100 @@
+"""
+Measure login throughput, and the latency of an unrelated endpoint, during a login storm.
+
+`--concurrency` clients log in back to back for `--duration` seconds, like kiosks at
+shift change, while one probe client keeps requesting `--probe-path` with an admin
+token. The script reports logins per second and the p50/p99 latency of the probe,
+first without the storm (baseline) and then during it.
+
+Run against a running server, with existing accounts:
+    python -m scripts.login_storm --base-url http://localhost:8000 \\
+        --email kiosk@example.com --password secret \\
+        --admin-email admin@example.com --admin-password secret
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+LOGIN_PATH = "/api/v1/users/login/access-token"
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> httpx.Response:
+    return await client.post(LOGIN_PATH, data={"username": email, "password": password})
+
+async def storm_worker(
+    client: httpx.AsyncClient, email: str, password: str, stop_at: float, counts: Dict[str, int]
+) -> None:
+    while time.perf_counter() < stop_at:
+        response = await login(client, email, password)
+        counts["ok" if response.status_code == 200 else "failed"] += 1
+
+async def probe(client: httpx.AsyncClient, path: str, headers: Dict[str, str], stop_at: float) -> List[float]:
+    latencies: List[float] = []
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+def report(label: str, latencies: List[float]) -> None:
+    print(
+        f"{label:<10} probe requests={len(latencies):>5} "
+        f"p50={percentile(latencies, 50):8.1f} ms  p99={percentile(latencies, 99):8.1f} ms  "
+        f"mean={statistics.fmean(latencies) if latencies else float('nan'):8.1f} ms"
+    )
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        response = await login(client, args.admin_email, args.admin_password)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        baseline = await probe(client, args.probe_path, headers, time.perf_counter() + args.baseline)
+        report("baseline", baseline)
+
+        counts = {"ok": 0, "failed": 0}
+        started = time.perf_counter()
+        stop_at = started + args.duration
+        workers = [
+            storm_worker(client, args.email, args.password, stop_at, counts)
+            for _ in range(args.concurrency)
+        ]
+        _, during = await asyncio.gather(
+            asyncio.gather(*workers), probe(client, args.probe_path, headers, stop_at)
+        )
+        elapsed = time.perf_counter() - started
+        report("storm", during)
+        print(
+            f"logins     ok={counts['ok']} failed={counts['failed']} "
+            f"rate={counts['ok'] / elapsed:.1f}/s over {elapsed:.1f} s "
+            f"with {args.concurrency} concurrent clients"
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True, help="account used by the storming clients")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--admin-email", required=True, help="admin account used by the probe")
+    parser.add_argument("--admin-password", required=True)
+    parser.add_argument("--probe-path", default="/api/v1/instruments/")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--baseline", type=float, default=5.0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Rebuild the daily utilization rollups (instrument_usage_daily) from the reservations.
+
+The API keeps the rollups up to date as reservations change; run this after
+upgrading to the rollup schema, after bulk changes made directly in the database, or
+nightly from cron to put right any refresh a worker lost when it was killed. The
+range is rebuilt one month at a time, each in a transaction of its own, so a
+rebuild of years of reservations holds no lock for long and can be interrupted.
+
+Run from the backend/ directory, e.g.:
+    python -m scripts.rebuild_usage_rollups                 # everything
+    python -m scripts.rebuild_usage_rollups --from 2026-01-01 --to 2026-02-01
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select
+
+# Import ALL models so that every relationship can be resolved.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.crud import analytics
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation
+
+def _month_after(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="first day to rebuild (default: the first reservation's)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat,
+                        help="day after the last one to rebuild (default: after the last reservation)")
+    parser.add_argument("--instrument-id", type=int, action="append", dest="instrument_ids",
+                        help="only rebuild this instrument (repeatable)")
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        first, last = db.execute(
+            select(func.min(Reservation.start_time), func.max(Reservation.end_time))
+        ).one()
+    if args.start is None and first is None:
+        print("No reservations to roll up.")
+        return 0
+    start = args.start or first.date()
+    end = args.end or (last.date() + timedelta(days=1))
+    if end <= start:
+        print("--to must be after --from", file=sys.stderr)
+        return 2
+
+    total = 0
+    started = time.perf_counter()
+    window_start = start
+    while window_start < end:
+        window_end = min(_month_after(window_start), end)
+        window_started = time.perf_counter()
+        with SessionLocal() as db:
+            written = analytics.rebuild(
+                db, start=window_start, end=window_end, instrument_ids=args.instrument_ids
+            )
+            db.commit()
+        total += written
+        print(f"{window_start:%Y-%m}: {written} rows in {time.perf_counter() - window_started:.2f}s")
+        window_start = window_end
+    print(f"Rebuilt {start} to {end}: {total} rows in {time.perf_counter() - started:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Write the access log entries and telemetry reports that the background writers
+could not write, once the database is reachable again.
+
+A batch that keeps failing after its retries is appended to a dead-letter file in
+BATCH_WRITE_DEAD_LETTER_DIR (access_log.jsonl, telemetry.jsonl; one row per line)
+instead of being dropped. Each file is replayed in one transaction and removed
+afterwards; a file that fails to replay stays in place for the next run. Running
+workers keep dead-lettering into a new file meanwhile.
+
+Run from the backend/ directory, e.g. after an outage or from cron:
+    python -m scripts.replay_dead_letters
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+# Import ALL models so that every relationship can be resolved.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.crud import crud_log, crud_telemetry
+
+WRITERS = {
+    "access-log": crud_log.log_writer,
+    "telemetry": crud_telemetry.telemetry_writer,
+}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--writer", choices=sorted(WRITERS), action="append", dest="writers",
+                        help="only replay this writer's file (repeatable)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for name in args.writers or sorted(WRITERS):
+        writer = WRITERS[name]
+        try:
+            count = writer.replay_dead_letters()
+        except Exception as exc:
+            failures += 1
+            print(f"FAIL  {name}: {exc}", file=sys.stderr)
+            continue
+        print(f"{name}: replayed {count} row(s) from {writer.dead_letter_path}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
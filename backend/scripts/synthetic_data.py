@@ -0,0 +1,275 @@
+"""
+Seed an empty database with a synthetic dataset for benchmarks.
+
+Generates users, instruments, booking permissions, reservations and access-log
+entries from a fixed random seed, so two databases seeded with the same arguments
+hold the same data. On PostgreSQL rows are streamed with COPY ... FROM STDIN, which
+loads millions of rows in minutes; other databases (SQLite) get batched multi-row
+INSERTs.
+
+The shape follows a long-running deployment: most reservations are history
+(completed, some missed or cancelled), the rest upcoming, back to back per
+instrument so that they never overlap. Every user may book a few instruments and
+only books those. All users share one password (--password), so that the endpoint
+benchmark can log in as any of them; user 1 is an admin.
+
+Run from the backend/ directory against a migrated database:
+    python -m scripts.synthetic_data --users 20000 --reservations 2000000 --logs 5000000
+then `python -m scripts.rebuild_usage_rollups` if the analytics endpoints matter.
+"""
+import argparse
+import csv
+import enum
+import io
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+
+# Import ALL models so that every table is known to the metadata.
+from app.models import user, instrument, reservation, log, permission, telemetry, usage
+from app.core.security import get_password_hash
+from app.db import partitions
+from app.db.base import Base
+from app.db.session import engine
+from app.models.instrument import InstrumentStatus
+from app.models.reservation import ReservationStatus
+from app.models.user import User, UserRole
+
+EMAIL_DOMAIN = "bench.example.com"
+DEFAULT_PASSWORD = "benchmark"
+
+BATCH_SIZE = 10_000
+COPY_BATCH_SIZE = 100_000
+
+# Emptied by --reset, children first.
+TABLES = [
+    "instrument_usage_weekly",
+    "instrument_usage_daily",
+    "instrument_telemetry",
+    "access_logs",
+    "reservations",
+    "user_instrument_permission",
+    "instruments",
+    "users",
+]
+
+Row = Tuple[Any, ...]
+
+def email_for(user_id: int) -> str:
+    return f"user{user_id}@{EMAIL_DOMAIN}"
+
+# --- Generators ---
+# Each yields tuples in the column order given next to it in `seed`.
+def user_rows(count: int, hashed_password: str) -> Iterator[Row]:
+    for user_id in range(1, count + 1):
+        if user_id == 1:
+            role = UserRole.ADMIN
+        elif user_id % 20 == 0:
+            role = UserRole.TEACHER
+        else:
+            role = UserRole.STUDENT
+        yield user_id, email_for(user_id), hashed_password, f"User {user_id}", role, True
+
+def instrument_rows(count: int) -> Iterator[Row]:
+    for instrument_id in range(1, count + 1):
+        yield (
+            instrument_id,
+            f"Instrument {instrument_id}",
+            f"Model {instrument_id % 12}",
+            f"Lab {instrument_id % 40}",
+            True,
+            InstrumentStatus.AVAILABLE,
+        )
+
+def permission_rows(permitted: Dict[int, List[int]]) -> Iterator[Row]:
+    for user_id, instrument_ids in permitted.items():
+        for instrument_id in instrument_ids:
+            yield user_id, instrument_id
+
+def reservation_rows(
+    count: int, permitted: Dict[int, List[int]], *, now: datetime, history_days: int, rng: random.Random
+) -> Iterator[Row]:
+    """
+    A tenth upcoming and confirmed, the rest spread over the last `history_days`.
+    """
+    past_statuses = [ReservationStatus.COMPLETED] * 8 + [ReservationStatus.MISSED, ReservationStatus.CANCELLED]
+    user_ids = list(permitted)
+    upcoming = count // 10
+    next_free: Dict[int, datetime] = {}
+    for n in range(count):
+        user_id = rng.choice(user_ids)
+        instrument_id = rng.choice(permitted[user_id])
+        duration = timedelta(minutes=30 * rng.randint(1, 8))
+        if n < upcoming:
+            start = next_free.get(instrument_id, now) + timedelta(minutes=30 * rng.randint(0, 12))
+            next_free[instrument_id] = start + duration
+            status = ReservationStatus.CONFIRMED
+        else:
+            start = now - timedelta(minutes=30 * rng.randint(8, history_days * 48))
+            status = rng.choice(past_statuses)
+        yield start, start + duration, status, user_id, instrument_id
+
+def log_rows(count: int, user_count: int, *, now: datetime, history_days: int, rng: random.Random) -> Iterator[Row]:
+    actions = ["USER_LOGIN"] * 3 + ["RESERVATION_CREATED"] * 2 + ["RESERVATION_CANCELLED"]
+    for _ in range(count):
+        user_id = rng.randint(1, user_count)
+        action = rng.choice(actions)
+        details = {"message": f"{email_for(user_id)} logged in"} if action == "USER_LOGIN" else {
+            "reservation_id": rng.randint(1, 1_000_000),
+            "instrument_id": rng.randint(1, 500),
+        }
+        yield now - timedelta(seconds=rng.randint(0, history_days * 86400)), user_id, action, details
+
+# --- Loading ---
+def _batches(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _csv_value(value: Any) -> Any:
+    # Enum columns store member names; JSON columns their text.
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+def copy_rows(connection: Connection, table: str, columns: Sequence[str], rows: Iterable[Row]) -> int:
+    """
+    Stream rows into a PostgreSQL table with COPY, one COPY per batch.
+    """
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.cursor()
+    count = 0
+    for batch in _batches(rows, COPY_BATCH_SIZE):
+        buffer = io.StringIO()
+        # None is written as an unquoted empty field, which CSV COPY reads as NULL.
+        csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in batch)
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        count += len(batch)
+    cursor.close()
+    return count
+
+def insert_rows(connection: Connection, table: str, columns: Sequence[str], rows: Iterable[Row]) -> int:
+    count = 0
+    for batch in _batches(rows, BATCH_SIZE):
+        connection.execute(insert(Base.metadata.tables[table]), [dict(zip(columns, row)) for row in batch])
+        count += len(batch)
+    return count
+
+def load(connection: Connection, table: str, columns: Sequence[str], rows: Iterable[Row]) -> int:
+    started = time.perf_counter()
+    if connection.dialect.name == "postgresql":
+        count = copy_rows(connection, table, columns, rows)
+    else:
+        count = insert_rows(connection, table, columns, rows)
+    elapsed = time.perf_counter() - started
+    print(f"{table:<28} {count:>10} rows in {elapsed:6.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+    return count
+
+def reset(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY")
+    else:
+        for table in TABLES:
+            connection.execute(Base.metadata.tables[table].delete())
+
+def seed(
+    connection: Connection,
+    *,
+    users: int,
+    instruments: int,
+    permissions_per_user: int,
+    reservations: int,
+    logs: int,
+    history_days: int,
+    password: str,
+    random_seed: int,
+) -> Dict[str, int]:
+    """
+    Load the synthetic dataset inside the caller's transaction. Returns the number
+    of rows per table.
+    """
+    rng = random.Random(random_seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    per_user = min(permissions_per_user, instruments)
+    permitted = {
+        user_id: rng.sample(range(1, instruments + 1), k=per_user) for user_id in range(1, users + 1)
+    }
+
+    counts = {
+        "users": load(connection, "users",
+                      ["id", "email", "hashed_password", "full_name", "role", "is_active"],
+                      user_rows(users, get_password_hash(password))),
+        "instruments": load(connection, "instruments",
+                            ["id", "name", "model", "location", "is_active", "status"],
+                            instrument_rows(instruments)),
+        "user_instrument_permission": load(connection, "user_instrument_permission",
+                                           ["user_id", "instrument_id"], permission_rows(permitted)),
+        "reservations": load(connection, "reservations",
+                             ["start_time", "end_time", "status", "user_id", "instrument_id"],
+                             reservation_rows(reservations, permitted, now=now,
+                                              history_days=history_days, rng=rng)),
+    }
+    # Entries go into their monthly partitions, not the default one.
+    partitions.ensure_partitions(connection, first=now - timedelta(days=history_days), last=now)
+    counts["access_logs"] = load(connection, "access_logs", ["timestamp", "user_id", "action", "details"],
+                                 log_rows(logs, users, now=now, history_days=history_days, rng=rng))
+
+    if connection.dialect.name == "postgresql":
+        # Users and instruments were loaded with explicit ids.
+        for table in ("users", "instruments"):
+            connection.exec_driver_sql(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+            )
+    return counts
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--instruments", type=int, default=300)
+    parser.add_argument("--permissions-per-user", type=int, default=5, help="instruments each user may book")
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="password of every synthetic user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="empty the seeded tables first")
+    args = parser.parse_args()
+
+    if min(args.users, args.instruments, args.permissions_per_user) < 1:
+        raise SystemExit("--users, --instruments and --permissions-per-user must be at least 1.")
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        if args.reset:
+            reset(connection)
+        elif connection.scalar(select(func.count()).select_from(User)):
+            raise SystemExit("The database already has users; pass --reset to replace them.")
+        seed(
+            connection,
+            users=args.users,
+            instruments=args.instruments,
+            permissions_per_user=args.permissions_per_user,
+            reservations=args.reservations,
+            logs=args.logs,
+            history_days=args.history_days,
+            password=args.password,
+            random_seed=args.seed,
+        )
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("ANALYZE")
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Shared fixtures. The app runs against a SQLite database file in a temporary
+directory, created from the models rather than by the migrations, so that several
+connections can work on it concurrently like on a real server.
+
+Run from the backend/ directory:
+    python -m pytest
+"""
+import asyncio
+import itertools
+import os
+import shutil
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+_database_dir = tempfile.mkdtemp(prefix="device-control-tests-")
+
+# Settings are read when app.core.config is first imported, so the environment has to
+# be ready before anything from the app is.
+os.environ.update({
+    "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(_database_dir, 'test.db')}",
+    "ASYNC_SQLALCHEMY_DATABASE_URI": "",
+    "READ_REPLICA_DATABASE_URI": "",
+    "RUN_MIGRATIONS_ON_STARTUP": "false",
+})
+for name, value in {
+    "POSTGRES_SERVER": "unused",
+    "POSTGRES_USER": "unused",
+    "POSTGRES_PASSWORD": "unused",
+    "POSTGRES_DB": "unused",
+    "SECRET_KEY": "test-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import main
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.instrument import Instrument
+from app.models.user import User, UserRole
+
+_sequence = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def app() -> FastAPI:
+    Base.metadata.create_all(engine)
+    yield main.app
+    engine.dispose()
+    shutil.rmtree(_database_dir, ignore_errors=True)
+
+@pytest.fixture
+def run_async(app: FastAPI) -> Callable[[Awaitable[Any]], Any]:
+    """
+    Run a coroutine on a fresh event loop. The async engine's connections belong to
+    that loop, so they are closed before it is.
+    """
+    def run(coroutine: Awaitable[Any]) -> Any:
+        async def main_task() -> Any:
+            try:
+                return await coroutine
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main_task())
+    return run
+
+@pytest.fixture
+def client_factory(app: FastAPI) -> Callable[[], httpx.AsyncClient]:
+    """
+    An async client that calls the app in-process. Concurrent requests through it
+    run concurrently, each with its own database session.
+    """
+    def factory() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    return factory
+
+# --- Data ---
+# Every test creates its own rows with unique names and never deletes any, so that
+# ids are never reused while the in-process caches still know them.
+@pytest.fixture
+def make_instrument(app: FastAPI) -> Callable[..., Instrument]:
+    def make(**fields: Any) -> Instrument:
+        with SessionLocal() as db:
+            instrument = Instrument(
+                **{"name": f"Instrument {next(_sequence)}", "location": "Lab", **fields}
+            )
+            db.add(instrument)
+            db.commit()
+            db.refresh(instrument)
+            return instrument
+    return make
+
+@pytest.fixture
+def make_user(app: FastAPI) -> Callable[..., User]:
+    def make(
+        *, role: UserRole = UserRole.STUDENT, instruments: Sequence[Instrument] = ()
+    ) -> User:
+        with SessionLocal() as db:
+            user = User(
+                email=f"user{next(_sequence)}@example.com",
+                hashed_password="unused",
+                role=role,
+                authorized_instruments=[db.merge(instrument) for instrument in instruments],
+            )
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            return user
+    return make
+
+@pytest.fixture
+def auth_headers() -> Callable[[User], Dict[str, str]]:
+    def headers(user: User) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+    return headers
@@ -0,0 +1,60 @@
+"""
+Cached availability timelines follow changes made through this worker and, through
+the events broker, through the others.
+"""
+import json
+from datetime import datetime, timedelta
+
+from app.core import events
+from app.crud import availability, crud_reservation
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation
+
+def _book(instrument_id: int, user_id: int) -> Reservation:
+    start = datetime(2098, 3, 1, 9)
+    with SessionLocal() as db:
+        reservation = Reservation(
+            start_time=start, end_time=start + timedelta(hours=1),
+            user_id=user_id, instrument_id=instrument_id,
+        )
+        db.add(reservation)
+        db.commit()
+        db.refresh(reservation)
+        return reservation
+
+def _cached_length(instrument_id: int) -> int:
+    with SessionLocal() as db:
+        return len(availability.get_timelines(db, instrument_ids=[instrument_id])[instrument_id])
+
+def test_events_from_other_workers_drop_the_timeline(make_instrument, make_user):
+    instrument = make_instrument()
+    assert _cached_length(instrument.id) == 0
+    # Booked through "another worker": the cached timeline doesn't know it yet.
+    reservation = _book(instrument.id, make_user().id)
+    assert _cached_length(instrument.id) == 0
+
+    broker = events.PostgresBroker("postgresql://unused", channel="unused", queue_size=10)
+    broker.on_remote_event(availability._forget_remote_change)
+    event = {"type": "reservation.created", "reservation_id": reservation.id, "instrument_id": instrument.id}
+
+    broker._received(None, 0, "unused", json.dumps({**event, "origin": broker.origin}))
+    assert _cached_length(instrument.id) == 0
+
+    broker._received(None, 0, "unused", json.dumps({**event, "origin": "another worker"}))
+    assert _cached_length(instrument.id) == 1
+
+def test_a_moved_reservation_leaves_its_previous_timeline(make_instrument, make_user):
+    first, second = make_instrument(), make_instrument()
+    reservation = _book(first.id, make_user().id)
+    assert _cached_length(first.id) == 1
+
+    with SessionLocal() as db:
+        moved = db.get(Reservation, reservation.id)
+        previous = (moved.instrument_id, moved.start_time, moved.end_time)
+        moved.instrument_id = second.id
+        db.commit()
+        db.refresh(moved)
+        crud_reservation._record(moved, "updated", previous)
+
+    assert _cached_length(first.id) == 0
+    assert _cached_length(second.id) == 1
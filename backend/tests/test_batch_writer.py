@@ -0,0 +1,137 @@
+"""
+A batch the database refuses is retried, and dead-lettered to a file rather than
+dropped once the retries are used up; replaying the file writes it after all.
+"""
+import itertools
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.db.batch_writer import BatchWriter
+from app.db.session import SessionLocal
+from app.models.log import AccessLog
+
+_sequence = itertools.count(1)
+
+def _failing_sessions(failures: int):
+    """
+    A session factory whose first `failures` sessions can't reach the database.
+    """
+    remaining = [failures]
+
+    def factory():
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            raise OperationalError("INSERT INTO access_logs ...", {}, Exception("database is down"))
+        return SessionLocal()
+    return factory
+
+def _writer(tmp_path, *, failures: int, retries: int = 2) -> BatchWriter:
+    return BatchWriter(
+        AccessLog.__table__,
+        session_factory=_failing_sessions(failures),
+        batch_size=10,
+        flush_interval=0.01,
+        max_queue=100,
+        enqueue_timeout=0.01,
+        retries=retries,
+        retry_backoff=0.001,
+        dead_letter_path=tmp_path / "dead_letters" / "access_log.jsonl",
+        name="test",
+    )
+
+def _rows(count: int):
+    action = f"TEST_{next(_sequence)}"
+    return action, [
+        {"timestamp": datetime(2030, 1, 1, 12, 0, n), "user_id": None, "action": action, "details": {"n": n}}
+        for n in range(count)
+    ]
+
+def _stored(action: str):
+    with SessionLocal() as db:
+        return db.scalars(select(AccessLog).where(AccessLog.action == action).order_by(AccessLog.timestamp)).all()
+
+def test_a_batch_is_retried_until_it_is_written(app, tmp_path):
+    writer = _writer(tmp_path, failures=2)
+    action, rows = _rows(3)
+
+    writer._write(rows)
+
+    assert len(_stored(action)) == 3
+    assert writer.stats()["retries"] == 2
+    assert writer.stats()["dead_lettered"] == 0
+    assert not writer.dead_letter_path.exists()
+
+def test_a_batch_that_keeps_failing_is_dead_lettered_and_replayed(app, tmp_path):
+    writer = _writer(tmp_path, failures=3)
+    action, rows = _rows(3)
+
+    writer._write(rows)
+
+    assert _stored(action) == []
+    assert writer.stats()["dead_lettered"] == 3
+    assert writer.stats()["lost"] == 0
+    assert len(writer.dead_letter_path.read_text().splitlines()) == 3
+
+    assert writer.replay_dead_letters() == 3
+
+    stored = _stored(action)
+    assert [(entry.timestamp, entry.details) for entry in stored] == [
+        (row["timestamp"], row["details"]) for row in rows
+    ]
+    assert not writer.dead_letter_path.exists()
+    assert writer.replay_dead_letters() == 0
+
+def test_a_failed_replay_keeps_the_file(app, tmp_path):
+    writer = _writer(tmp_path, failures=1, retries=0)
+    action, rows = _rows(2)
+    writer._write(rows)
+    writer.session_factory = _failing_sessions(1)
+
+    with pytest.raises(OperationalError):
+        writer.replay_dead_letters()
+    # Rows dead-lettered meanwhile go to a new file; both are replayed next time.
+    later_action, later_rows = _rows(1)
+    writer.session_factory = _failing_sessions(1)
+    writer._write(later_rows)
+
+    assert writer.replay_dead_letters() == 2
+    assert writer.replay_dead_letters() == 1
+    assert len(_stored(action)) == 2
+    assert len(_stored(later_action)) == 1
+
+def test_rows_the_database_rejects_do_not_hold_back_the_batch(app, tmp_path):
+    writer = _writer(tmp_path, failures=0)
+    action, rows = _rows(3)
+    rows[1]["action"] = None  # violates NOT NULL
+
+    writer._write(rows)
+
+    assert len(_stored(action)) == 2
+    assert writer.stats()["dead_lettered"] == 1
+    assert '"action": null' in writer.dead_letter_path.read_text()
+
+def test_rows_written_by_the_caller_are_counted(app, tmp_path):
+    writer = _writer(tmp_path, failures=0)
+    writer._queue.maxsize = 1
+    _, rows = _rows(2)
+
+    assert writer.submit_nowait(rows[0])
+    assert not writer.submit_nowait(rows[1])
+
+    stats = writer.stats()
+    assert stats["submitted"] == 2
+    assert stats["overflow_writes"] == 1
+
+def test_the_exit_hook_is_registered_once(app, tmp_path, monkeypatch):
+    hooks = []
+    monkeypatch.setattr("app.db.batch_writer.atexit.register", hooks.append)
+    writer = _writer(tmp_path, failures=0)
+
+    for _ in range(3):
+        writer.start()
+        writer.shutdown()
+
+    assert hooks == [writer.shutdown]
@@ -0,0 +1,74 @@
+"""
+Ended confirmed reservations are completed, or missed when the instrument PC reported
+during them without being used. Instruments whose PC reports nothing never produce
+no-shows.
+"""
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.crud import lifecycle
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.telemetry import InstrumentTelemetry, TelemetryKind
+
+START = datetime(2030, 3, 4, 9)
+END = START + timedelta(hours=1)
+
+def _reserve(db, user, instrument, hours_later: int = 0) -> Reservation:
+    reservation = Reservation(
+        start_time=START + timedelta(hours=hours_later),
+        end_time=END + timedelta(hours=hours_later),
+        status=ReservationStatus.CONFIRMED,
+        user_id=user.id,
+        instrument_id=instrument.id,
+    )
+    db.add(reservation)
+    db.flush()
+    return reservation
+
+def _report(db, instrument, kind: TelemetryKind, *, minutes: int, in_use=None) -> None:
+    db.add(InstrumentTelemetry(
+        timestamp=START + timedelta(minutes=minutes),
+        instrument_id=instrument.id,
+        kind=kind.value,
+        in_use=in_use,
+    ))
+
+def _end(db, reservations):
+    lifecycle.end_reservations(db, reservation_ids=[r.id for r in reservations], now=END + timedelta(days=1))
+    db.commit()
+    return [db.get(Reservation, r.id).status for r in reservations]
+
+def test_only_instruments_that_report_produce_no_shows(monkeypatch, make_instrument, make_user):
+    monkeypatch.setattr(settings, "TELEMETRY_INGEST_KEY", "kiosk-key")
+    reporting, silent = make_instrument(), make_instrument()
+    user = make_user()
+    with SessionLocal() as db:
+        idle = _reserve(db, user, reporting)
+        _report(db, reporting, TelemetryKind.HEARTBEAT, minutes=10, in_use=False)
+        used = _reserve(db, user, reporting, hours_later=2)
+        _report(db, reporting, TelemetryKind.SESSION_START, minutes=125)
+        # Offline markers are the server's, not a report of the PC.
+        offline = _reserve(db, user, reporting, hours_later=4)
+        _report(db, reporting, TelemetryKind.OFFLINE, minutes=245)
+        unmonitored = _reserve(db, user, silent)
+
+        statuses = _end(db, [idle, used, offline, unmonitored])
+
+    assert statuses == [
+        ReservationStatus.MISSED,
+        ReservationStatus.COMPLETED,
+        ReservationStatus.COMPLETED,
+        ReservationStatus.COMPLETED,
+    ]
+
+def test_without_telemetry_confirmed_reservations_complete(monkeypatch, make_instrument, make_user):
+    monkeypatch.setattr(settings, "TELEMETRY_INGEST_KEY", None)
+    instrument, user = make_instrument(), make_user()
+    with SessionLocal() as db:
+        reservation = _reserve(db, user, instrument)
+        _report(db, instrument, TelemetryKind.HEARTBEAT, minutes=10, in_use=False)
+
+        assert _end(db, [reservation]) == [ReservationStatus.COMPLETED]
+        # Ending it again changes nothing.
+        assert lifecycle.end_reservations(db, reservation_ids=[reservation.id], now=END) == []
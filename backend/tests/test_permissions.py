@@ -0,0 +1,30 @@
+"""
+Single grants and revokes answer with the changed pair, not the whole user.
+"""
+from app.models.user import UserRole
+
+def test_grant_and_revoke_return_the_changed_pair(
+    run_async, client_factory, make_instrument, make_user, auth_headers
+):
+    instrument, user = make_instrument(), make_user()
+    headers = auth_headers(make_user(role=UserRole.ADMIN))
+    pair = {"user_id": user.id, "instrument_id": instrument.id}
+
+    async def change():
+        async with client_factory() as client:
+            return [
+                await client.post(f"/api/v1/permissions/{action}", json=body, headers=headers)
+                for action, body in (
+                    ("grant", pair), ("grant", pair), ("revoke", pair), ("revoke", pair),
+                    ("grant", {**pair, "instrument_id": instrument.id + 10_000}),
+                )
+            ]
+
+    *changes, missing = run_async(change())
+
+    assert [response.status_code for response in changes] == [200] * 4
+    assert [response.json() for response in changes] == [
+        {**pair, "changed": True}, {**pair, "changed": False},
+        {**pair, "changed": True}, {**pair, "changed": False},
+    ]
+    assert missing.status_code == 404
@@ -0,0 +1,58 @@
+"""
+Read-your-writes pinning: a successful write pins the writer's reads to the primary,
+through a signed cookie and the per-worker pin; a rejected write pins nothing.
+"""
+import time
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from app.api import deps
+
+def _request(cookie: str) -> Request:
+    headers = [(b"cookie", f"{deps.PRIMARY_READS_COOKIE}={cookie}".encode())]
+    return Request({"type": "http", "headers": headers})
+
+def _booking(instrument_id: int) -> dict:
+    start = datetime(2099, 6, 1) + timedelta(hours=instrument_id)
+    return {
+        "instrument_id": instrument_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+    }
+
+def test_only_successful_writes_pin_reads(
+    run_async, client_factory, make_instrument, make_user, auth_headers
+):
+    instrument = make_instrument()
+    writer, rejected = make_user(instruments=[instrument]), make_user()
+
+    async def write():
+        async with client_factory() as client:
+            denied = await client.post(
+                "/api/v1/reservations/", json=_booking(instrument.id), headers=auth_headers(rejected)
+            )
+            booked = await client.post(
+                "/api/v1/reservations/", json=_booking(instrument.id), headers=auth_headers(writer)
+            )
+            return denied, booked
+
+    denied, booked = run_async(write())
+
+    assert denied.status_code == 403, denied.text
+    assert deps.PRIMARY_READS_COOKIE not in denied.cookies
+    assert not deps._primary_pins.get(rejected.id, False)
+
+    assert booked.status_code == 201, booked.text
+    assert deps._cookie_pinned(booked.cookies[deps.PRIMARY_READS_COOKIE])
+    assert deps._primary_pins.get(writer.id, False)
+
+def test_forged_cookies_do_not_pin_reads():
+    until = f"{time.time() + 3600:.3f}"
+
+    assert not deps._reads_pinned(_request(cookie=until))
+    assert not deps._reads_pinned(_request(cookie=f"{until}.{'0' * 64}"))
+    assert deps._reads_pinned(_request(cookie=f"{until}.{deps._cookie_signature(until)}"))
+
+    expired = f"{time.time() - 1:.3f}"
+    assert not deps._reads_pinned(_request(cookie=f"{expired}.{deps._cookie_signature(expired)}"))
@@ -0,0 +1,92 @@
+"""
+Single and batch bookings store times the same way, so they conflict with each other
+whatever zone the times were sent in; a batch that books nothing is a conflict.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation
+
+BOOK = "/api/v1/reservations/"
+BOOK_BATCH = "/api/v1/reservations/batch"
+
+# 10:00 UTC on a Monday, sent as 12:00 in UTC+2 or without a zone.
+START = datetime(2031, 6, 2, 10)
+AWARE_START = START.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+
+def test_aware_booking_conflicts_with_naive_batch_of_the_same_slot(
+    run_async, client_factory, make_instrument, make_user, auth_headers
+):
+    instrument = make_instrument()
+    headers = auth_headers(make_user(instruments=[instrument]))
+    batch = {
+        "instrument_id": instrument.id,
+        "slots": [{"start_time": START.isoformat(), "end_time": (START + timedelta(hours=1)).isoformat()}],
+    }
+    single = {
+        "instrument_id": instrument.id,
+        "start_time": AWARE_START.isoformat(),
+        "end_time": (AWARE_START + timedelta(hours=1)).isoformat(),
+    }
+
+    async def book():
+        async with client_factory() as client:
+            batch_response = await client.post(BOOK_BATCH, json=batch, headers=headers)
+            single_response = await client.post(BOOK, json=single, headers=headers)
+            return batch_response, single_response
+
+    batch_response, single_response = run_async(book())
+
+    assert batch_response.status_code == 201, batch_response.text
+    assert single_response.status_code == 409, single_response.text
+    with SessionLocal() as db:
+        stored = db.scalars(select(Reservation.start_time).where(Reservation.instrument_id == instrument.id)).all()
+    assert stored == [START]
+
+def test_aware_and_naive_single_bookings_store_the_same_time(
+    run_async, client_factory, make_instrument, make_user, auth_headers
+):
+    instrument = make_instrument()
+    headers = auth_headers(make_user(instruments=[instrument]))
+    body = {
+        "instrument_id": instrument.id,
+        "start_time": AWARE_START.isoformat(),
+        "end_time": (AWARE_START + timedelta(hours=1)).isoformat(),
+    }
+
+    async def book():
+        async with client_factory() as client:
+            return await client.post(BOOK, json=body, headers=headers)
+
+    response = run_async(book())
+
+    assert response.status_code == 201, response.text
+    assert response.json()["start_time"] == START.isoformat()
+
+def test_non_atomic_batch_without_free_occurrences_is_a_conflict(
+    run_async, client_factory, make_instrument, make_user, auth_headers
+):
+    instrument = make_instrument()
+    headers = auth_headers(make_user(instruments=[instrument]))
+    slot = {"start_time": START.isoformat(), "end_time": (START + timedelta(hours=1)).isoformat()}
+
+    async def book():
+        async with client_factory() as client:
+            first = await client.post(
+                BOOK_BATCH, json={"instrument_id": instrument.id, "slots": [slot]}, headers=headers
+            )
+            again = await client.post(
+                BOOK_BATCH,
+                json={"instrument_id": instrument.id, "slots": [slot], "atomic": False},
+                headers=headers,
+            )
+            return first, again
+
+    first, again = run_async(book())
+
+    assert first.status_code == 201, first.text
+    assert again.status_code == 409, again.text
+    assert again.json()["detail"]["created"] == 0
+    assert again.json()["detail"]["conflicts"] == 1
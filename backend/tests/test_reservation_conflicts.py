@@ -0,0 +1,77 @@
+"""
+Concurrent bookings of one timeslot: exactly one may succeed. On SQLite this rests on
+the instrument lock and availability re-check in acreate_with_owner, not on the
+up-front availability check of the endpoint. On PostgreSQL it rests on the exclusion
+constraint, whose violation _acommit_or_conflict turns into a conflict (409).
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.crud import crud_reservation
+from app.db.session import SessionLocal
+from app.models.reservation import NO_OVERLAP_CONSTRAINT, Reservation
+
+CONCURRENT_BOOKINGS = 8
+
+def _slot():
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(days=7)
+    return start, start + timedelta(hours=1)
+
+def _reservation_count(instrument_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(
+            select(func.count()).select_from(Reservation).where(Reservation.instrument_id == instrument_id)
+        )
+
+def test_concurrent_posts_of_one_slot_book_it_once(
+    run_async, client_factory, make_instrument, make_user, auth_headers
+):
+    instrument = make_instrument()
+    users = [make_user(instruments=[instrument]) for _ in range(CONCURRENT_BOOKINGS)]
+    start, end = _slot()
+    body = {"instrument_id": instrument.id, "start_time": start.isoformat(), "end_time": end.isoformat()}
+
+    async def book_all():
+        async with client_factory() as client:
+            return await asyncio.gather(*(
+                client.post("/api/v1/reservations/", json=body, headers=auth_headers(user))
+                for user in users
+            ))
+
+    responses = run_async(book_all())
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] + [409] * (CONCURRENT_BOOKINGS - 1), [r.text for r in responses]
+    assert _reservation_count(instrument.id) == 1
+
+class _FailingCommitSession:
+    """
+    Stands in for a PostgreSQL session whose commit hits a constraint.
+    """
+    def __init__(self, message: str):
+        self.message = message
+        self.rolled_back = False
+
+    async def commit(self):
+        raise IntegrityError("INSERT INTO reservations ...", {}, Exception(self.message))
+
+    async def rollback(self):
+        self.rolled_back = True
+
+def test_overlap_constraint_violation_is_a_conflict(run_async):
+    db = _FailingCommitSession(
+        f'conflicting key value violates exclusion constraint "{NO_OVERLAP_CONSTRAINT}"'
+    )
+    with pytest.raises(crud_reservation.ReservationConflictError):
+        run_async(crud_reservation._acommit_or_conflict(db))
+    assert db.rolled_back
+
+def test_other_integrity_errors_are_not_conflicts(run_async):
+    db = _FailingCommitSession('insert or update violates foreign key constraint "reservations_user_id_fkey"')
+    with pytest.raises(IntegrityError):
+        run_async(crud_reservation._acommit_or_conflict(db))
+    assert db.rolled_back
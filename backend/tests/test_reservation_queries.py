@@ -0,0 +1,108 @@
+"""
+Reservation pages are loaded with a fixed number of SQL statements, whatever their
+size: the loader options in OWNER_PAGE_OPTIONS / MIXED_PAGE_OPTIONS must keep the
+nested users, their authorized instruments and the instruments from being loaded
+one row at a time while the response is serialized.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.crud import crud_reservation
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.reservation import Reservation
+from app.models.user import UserRole
+from app.schemas.reservation import Reservation as ReservationSchema
+
+SMALL_PAGE = 3
+LARGE_PAGE = 24
+# The total, the page and one IN query per collection the page doesn't join. The
+# principal is answered from its cache after the first request.
+MAX_STATEMENTS = 4
+
+@contextmanager
+def count_statements(target: Engine) -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(target, "before_cursor_execute", record)
+
+@pytest.fixture
+def booked(make_instrument, make_user):
+    """
+    Users who may book several instruments each. The first one books every
+    instrument, the others one each, alternately, so that a larger page holds more
+    distinct users and instruments.
+    """
+    instruments = [make_instrument() for _ in range(LARGE_PAGE)]
+    users = [make_user(instruments=instruments[k:k + 3]) for k in range(LARGE_PAGE)]
+    # Later than any other test's reservations, so that these head the admin list.
+    start = datetime(2100, 1, 1)
+    with SessionLocal() as db:
+        for n, instrument in enumerate(instruments):
+            for hour, user in ((2 * n, users[0]), (2 * n + 1, users[n])):
+                db.add(Reservation(
+                    start_time=start + timedelta(hours=hour),
+                    end_time=start + timedelta(hours=hour, minutes=30),
+                    user_id=user.id,
+                    instrument_id=instrument.id,
+                ))
+        db.commit()
+    return users
+
+@pytest.mark.parametrize("path, role", [
+    ("/api/v1/reservations/all", UserRole.ADMIN),
+    ("/api/v1/reservations/my-reservations", UserRole.STUDENT),
+])
+def test_page_statements_do_not_grow_with_page_size(
+    path, role, booked, run_async, client_factory, make_user, auth_headers
+):
+    reader = make_user(role=UserRole.ADMIN) if role == UserRole.ADMIN else booked[0]
+    headers = auth_headers(reader)
+
+    async def read_pages():
+        counts = {}
+        async with client_factory() as client:
+            # The first request of a user also fills the principal cache.
+            (await client.get(path, params={"limit": 1}, headers=headers)).raise_for_status()
+            for limit in (SMALL_PAGE, LARGE_PAGE):
+                with count_statements(async_engine.sync_engine) as statements:
+                    response = await client.get(path, params={"limit": limit}, headers=headers)
+                response.raise_for_status()
+                data = response.json()["data"]
+                assert len(data) == limit
+                assert all(row["user"]["authorized_instruments"] for row in data)
+                counts[limit] = statements
+        return counts
+
+    counts = run_async(read_pages())
+
+    assert len(counts[SMALL_PAGE]) == len(counts[LARGE_PAGE]), counts
+    assert len(counts[LARGE_PAGE]) <= MAX_STATEMENTS, counts[LARGE_PAGE]
+
+# The sync versions would not fail on a lazy load, only slow down.
+@pytest.mark.parametrize("read_page", [
+    lambda db, user, limit: crud_reservation.get_multi_all(db, limit=limit),
+    lambda db, user, limit: crud_reservation.get_multi_by_user(db, user_id=user.id, limit=limit),
+], ids=["get_multi_all", "get_multi_by_user"])
+def test_sync_page_statements_do_not_grow_with_page_size(read_page, booked):
+    counts = {}
+    for limit in (SMALL_PAGE, LARGE_PAGE):
+        with SessionLocal() as db, count_statements(engine) as statements:
+            page = read_page(db, booked[0], limit)
+            serialized = [ReservationSchema.model_validate(row, from_attributes=True) for row in page.data]
+        assert len(serialized) == limit
+        counts[limit] = statements
+
+    assert len(counts[SMALL_PAGE]) == len(counts[LARGE_PAGE]), counts
+    assert len(counts[LARGE_PAGE]) <= MAX_STATEMENTS, counts[LARGE_PAGE]
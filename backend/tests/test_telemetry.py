@@ -0,0 +1,52 @@
+"""
+Telemetry reports are attributed to the owner of the reservation in progress, never
+to a user the PC names, since every PC holds the same key.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.reservation import Reservation, ReservationStatus
+from app.models.telemetry import InstrumentTelemetry
+
+def _stored_users(instrument_id: int):
+    with SessionLocal() as db:
+        return list(db.scalars(
+            select(InstrumentTelemetry.user_id).where(InstrumentTelemetry.instrument_id == instrument_id)
+        ))
+
+def test_reports_belong_to_the_reservation_in_progress(
+    monkeypatch, run_async, client_factory, make_instrument, make_user
+):
+    monkeypatch.setattr(settings, "TELEMETRY_INGEST_KEY", "kiosk-key")
+    booked, free = make_instrument(), make_instrument()
+    owner, claimed = make_user(), make_user()
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add(Reservation(
+            start_time=now - timedelta(minutes=30),
+            end_time=now + timedelta(minutes=30),
+            status=ReservationStatus.CONFIRMED,
+            user_id=owner.id,
+            instrument_id=booked.id,
+        ))
+        db.commit()
+
+    async def report():
+        async with client_factory() as client:
+            return [
+                await client.post(
+                    "/api/v1/telemetry/",
+                    json={"instrument_id": instrument.id, "kind": "session_start", "user_id": claimed.id},
+                    headers={"X-Telemetry-Key": "kiosk-key"},
+                )
+                for instrument in (booked, free)
+            ]
+
+    responses = run_async(report())
+
+    assert [response.status_code for response in responses] == [204, 204], [r.text for r in responses]
+    assert _stored_users(booked.id) == [owner.id]
+    assert _stored_users(free.id) == [None]
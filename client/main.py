@@ -1,41 +1,384 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
 from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
+
+# Configuration (each value can be overridden with the environment variable of the same name)
+API_URL = os.environ.get("API_URL", "http://localhost:8000/api/v1")
+INSTRUMENT_ID = int(os.environ.get("INSTRUMENT_ID", "1"))  # This should be configured per machine
+# How far ahead the reservation schedule is cached, and how often it is refreshed.
+SCHEDULE_HOURS = int(os.environ.get("SCHEDULE_HOURS", "12"))
+SCHEDULE_REFRESH_SECONDS = int(os.environ.get("SCHEDULE_REFRESH_SECONDS", "60"))
+# A reservation unlocks the instrument this many minutes before it starts.
+EARLY_UNLOCK_MINUTES = int(os.environ.get("EARLY_UNLOCK_MINUTES", "5"))
+# Admins are not bound to a reservation; their session locks again after this long.
+ADMIN_SESSION_MINUTES = int(os.environ.get("ADMIN_SESSION_MINUTES", "60"))
+# While the API can't be reached, users who logged in online on this machine within
+# this many hours can still unlock with the same password.
+OFFLINE_LOGIN_HOURS = int(os.environ.get("OFFLINE_LOGIN_HOURS", "24"))
+CACHE_DIR = Path(os.environ.get("CACHE_DIR", Path.home() / ".instrument_client"))
+# Heartbeats tell the server whether this instrument is in use; they are only sent
+# when the server's telemetry key is configured.
+TELEMETRY_KEY = os.environ.get("TELEMETRY_KEY")
+HEARTBEAT_SECONDS = int(os.environ.get("HEARTBEAT_SECONDS", "10"))
+
+# (connect, read) timeouts: fail fast so an outage falls back to the cache quickly.
+REQUEST_TIMEOUT = (3.05, 5)
+
+logger = logging.getLogger("instrument_client")
+
+class InvalidCredentials(Exception):
+    """
+    Raised when the API rejects an email and password.
+    """
+
+# --- API Client ---
+class ApiClient:
+    """
+    Calls the backend through one pooled, keep-alive requests.Session. Its methods
+    block, so they are only ever called from worker threads, never the UI thread.
+    """
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def login(self, email: str, password: str) -> str:
+        """
+        Return an access token, or raise InvalidCredentials.
+        """
+        response = self.session.post(
+            f"{self.base_url}/users/login/access-token",
+            data={"username": email, "password": password},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code == 401:
+            raise InvalidCredentials()
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    def current_user(self, token: str) -> Dict[str, Any]:
+        response = self.session.get(
+            f"{self.base_url}/users/me",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def instrument_schedule(self, instrument_id: int) -> List[Dict[str, Any]]:
+        """
+        The instrument's active reservations from today on, as compact summaries.
+        """
+        response = self.session.get(
+            f"{self.base_url}/reservations/instrument/{instrument_id}",
+            params={"fields": "id,start_time,end_time,status,user_id", "limit": 500},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        body = response.json()
+        return body["data"] if isinstance(body, dict) else body
+
+    def report_telemetry(self, report: Dict[str, Any]) -> None:
+        """
+        Send a heartbeat or a session start or end of this instrument PC.
+        """
+        response = self.session.post(
+            f"{self.base_url}/telemetry/",
+            json=report,
+            headers={"X-Telemetry-Key": TELEMETRY_KEY or ""},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+
+# --- Local Cache ---
+@dataclass
+class Decision:
+    allowed: bool
+    message: str
+    # When the unlocked session ends.
+    until: Optional[datetime] = None
+    offline: bool = False
+    user_id: Optional[int] = None
+
+def _parse_time(value: str) -> datetime:
+    # The API returns naive UTC times.
+    return datetime.fromisoformat(value.replace("Z", "")).replace(tzinfo=None)
+
+def _password_hash(password: str, salt: bytes) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 200_000).hex()
+
+class ScheduleCache:
+    """
+    The next SCHEDULE_HOURS of reservations of this instrument, and the users who
+    recently logged in here, kept in memory and in a JSON file so that unlock
+    decisions need no round-trip and survive short outages and restarts.
+
+    Passwords are never stored: a login only leaves a salted PBKDF2 hash behind,
+    which is enough to recognize the same password while the API is unreachable.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reservations: List[Dict[str, Any]] = []
+        self._fetched_at: Optional[datetime] = None
+        self._logins: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self._reservations = data.get("reservations", [])
+        self._fetched_at = _parse_time(data["fetched_at"]) if data.get("fetched_at") else None
+        self._logins = data.get("logins", {})
+
+    def _save(self) -> None:
+        """
+        Write the cache atomically; call with the lock held.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_text(json.dumps({
+            "reservations": self._reservations,
+            "fetched_at": self._fetched_at.isoformat() if self._fetched_at else None,
+            "logins": self._logins,
+        }), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+    @property
+    def fetched_at(self) -> Optional[datetime]:
+        with self._lock:
+            return self._fetched_at
+
+    def refresh(self, api: ApiClient) -> None:
+        """
+        Fetch the schedule (blocking; call from a worker thread).
+        """
+        now = datetime.utcnow()
+        horizon = now + timedelta(hours=SCHEDULE_HOURS)
+        reservations = [
+            reservation for reservation in api.instrument_schedule(INSTRUMENT_ID)
+            if _parse_time(reservation["end_time"]) > now and _parse_time(reservation["start_time"]) < horizon
+        ]
+        with self._lock:
+            self._reservations = reservations
+            self._fetched_at = now
+            self._save()
+
+    def current_reservation(self, user_id: int, now: datetime) -> Optional[Dict[str, Any]]:
+        """
+        The user's confirmed reservation running now (or starting within
+        EARLY_UNLOCK_MINUTES), if the cached schedule covers now.
+        """
+        early = timedelta(minutes=EARLY_UNLOCK_MINUTES)
+        with self._lock:
+            if self._fetched_at is None or now > self._fetched_at + timedelta(hours=SCHEDULE_HOURS):
+                return None
+            for reservation in self._reservations:
+                if (
+                    reservation.get("user_id") == user_id
+                    and reservation.get("status") == "confirmed"
+                    and _parse_time(reservation["start_time"]) - early <= now < _parse_time(reservation["end_time"])
+                ):
+                    return reservation
+        return None
+
+    def remember_login(self, email: str, password: str, user: Dict[str, Any]) -> None:
+        salt = secrets.token_bytes(16)
+        with self._lock:
+            self._logins[email.lower()] = {
+                "salt": salt.hex(),
+                "hash": _password_hash(password, salt),
+                "user_id": user["id"],
+                "role": user["role"],
+                "verified_at": datetime.utcnow().isoformat(),
+            }
+            self._save()
+
+    def forget_login(self, email: str, password: str) -> None:
+        """
+        Forget a login whose password the API just rejected, i.e. one that changed.
+        """
+        if self.offline_user(email, password, max_age=None) is None:
+            return
+        with self._lock:
+            self._logins.pop(email.lower(), None)
+            self._save()
+
+    def offline_user(
+        self, email: str, password: str, max_age: Optional[timedelta] = timedelta(hours=OFFLINE_LOGIN_HOURS)
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The user behind a recent online login with the same email and password.
+        """
+        with self._lock:
+            login = self._logins.get(email.lower())
+        if login is None:
+            return None
+        if max_age is not None and datetime.utcnow() - _parse_time(login["verified_at"]) > max_age:
+            return None
+        if not hmac.compare_digest(login["hash"], _password_hash(password, bytes.fromhex(login["salt"]))):
+            return None
+        return {"id": login["user_id"], "role": login["role"]}
+
+# --- Unlock Decision ---
+class AccessGate:
+    """
+    Decides whether a login unlocks this instrument. Runs on worker threads.
+    """
+    def __init__(self, api: ApiClient, cache: ScheduleCache):
+        self.api = api
+        self.cache = cache
+
+    def authorize(self, email: str, password: str) -> Decision:
+        offline = False
+        try:
+            token = self.api.login(email, password)
+            user = self.api.current_user(token)
+            self.cache.remember_login(email, password, user)
+        except InvalidCredentials:
+            self.cache.forget_login(email, password)
+            return Decision(False, "Invalid email or password.")
+        except requests.RequestException:
+            logger.warning("API unreachable; checking the login against the local cache", exc_info=True)
+            user = self.cache.offline_user(email, password)
+            if user is None:
+                return Decision(False, "The server can't be reached and this login isn't known offline.")
+            offline = True
+
+        now = datetime.utcnow()
+        if user["role"] == "admin":
+            return Decision(
+                True, "Admin session", now + timedelta(minutes=ADMIN_SESSION_MINUTES), offline, user["id"]
+            )
+
+        reservation = self.cache.current_reservation(user["id"], now)
+        if reservation is None and not offline:
+            # The booking may be newer than the cached schedule.
+            try:
+                self.cache.refresh(self.api)
+            except requests.RequestException:
+                logger.warning("Schedule refresh failed", exc_info=True)
+            reservation = self.cache.current_reservation(user["id"], now)
+        if reservation is None:
+            return Decision(False, "No confirmed reservation for this instrument right now.", offline=offline)
+        return Decision(True, "Reservation session", _parse_time(reservation["end_time"]), offline, user["id"])
+
+# --- Background Work ---
+class _Dispatcher(QObject):
+    """
+    Delivers worker results to callbacks on the UI thread (a queued signal).
+    """
+    finished = pyqtSignal(object, object)
+
+    def __init__(self):
+        super().__init__()
+        self.finished.connect(lambda callback, result: callback(result))
+
+class BackgroundRunner:
+    """
+    Runs blocking calls on a small thread pool and hands their results (or the
+    exception raised) back to the UI thread.
+    """
+    def __init__(self, workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._dispatcher = _Dispatcher()
 
-# Configuration
-API_URL = "http://localhost:8000/api/v1"
-INSTRUMENT_ID = 1  # This should be configured per machine
+    def submit(self, work: Callable[[], Any], callback: Callable[[Any], None]) -> None:
+        def run() -> None:
+            try:
+                result = work()
+            except Exception as exc:  # handed to the callback, which decides what to show
+                logger.exception("Background call failed")
+                result = exc
+            self._dispatcher.finished.emit(callback, result)
+        self._executor.submit(run)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 class LoginWindow(QWidget):
     def __init__(self):
         super().__init__()
+        self.api = ApiClient(API_URL)
+        self.cache = ScheduleCache(CACHE_DIR / f"schedule_{INSTRUMENT_ID}.json")
+        self.gate = AccessGate(self.api, self.cache)
+        self.runner = BackgroundRunner()
+        # Telemetry gets a thread of its own, so that reports stuck in a timeout
+        # never hold up a login.
+        self.telemetry_runner = BackgroundRunner(workers=1)
+        self._refreshing = False
+        self._reporting = False
+        # The user of the unlocked session, if any.
+        self.session_user: Optional[int] = None
+
         self.initUI()
         self.setup_lock_mode()
 
+        # Keep the schedule cache fresh in the background.
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_schedule)
+        self.refresh_timer.start(SCHEDULE_REFRESH_SECONDS * 1000)
+        self.refresh_schedule()
+
+        # Locks the screen again when the unlocked session ends.
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.timeout.connect(self.lock_system)
+
+        # Tell the server this PC is online, and whether it is in use.
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(self.send_heartbeat)
+        if TELEMETRY_KEY:
+            self.heartbeat_timer.start(HEARTBEAT_SECONDS * 1000)
+            self.send_heartbeat()
+
     def initUI(self):
         self.setWindowTitle('Instrument Access Control')
         self.setGeometry(100, 100, 400, 300)
-        
+
         layout = QVBoxLayout()
-        
+
         self.label = QLabel('Please Login to Access Instrument')
         self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(self.label)
-        
+
         self.username_input = QLineEdit()
-        self.username_input.setPlaceholderText("Username")
+        self.username_input.setPlaceholderText("Email")
         layout.addWidget(self.username_input)
-        
+
         self.password_input = QLineEdit()
         self.password_input.setPlaceholderText("Password")
         self.password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        self.password_input.returnPressed.connect(self.handle_login)
         layout.addWidget(self.password_input)
-        
+
         self.login_btn = QPushButton('Login')
         self.login_btn.clicked.connect(self.handle_login)
         layout.addWidget(self.login_btn)
-        
+
+        self.status_label = QLabel('')
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.status_label)
+
         self.setLayout(layout)
 
     def setup_lock_mode(self):
@@ -45,30 +388,109 @@ class LoginWindow(QWidget):
         """
         self.setWindowFlags(Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.FramelessWindowHint)
         # In a real deployment, you would also want to hook keyboard events to block Alt+Tab, etc.
-        # self.showFullScreen() 
+        # self.showFullScreen()
+
+    def refresh_schedule(self):
+        if self._refreshing:
+            return
+        self._refreshing = True
+        self.runner.submit(lambda: self.cache.refresh(self.api), self._schedule_refreshed)
+
+    def _schedule_refreshed(self, result):
+        self._refreshing = False
+        fetched_at = self.cache.fetched_at
+        if isinstance(result, Exception):
+            since = f" (schedule from {fetched_at:%H:%M} UTC)" if fetched_at else ""
+            self.status_label.setText(f"Offline{since}")
+        else:
+            self.status_label.setText("")
+
+    def send_heartbeat(self):
+        if self._reporting:
+            return
+        self._reporting = True
+        self.report("heartbeat", self._heartbeat_sent)
+
+    def _heartbeat_sent(self, result):
+        self._reporting = False
+
+    def report(self, kind, callback=None):
+        """
+        Send a telemetry report in the background; lost reports are not retried, the
+        next heartbeat carries the state again.
+        """
+        if not TELEMETRY_KEY:
+            return
+        report = {
+            "instrument_id": INSTRUMENT_ID,
+            "kind": kind,
+            "in_use": self.session_user is not None,
+        }
+
+        def send():
+            try:
+                self.api.report_telemetry(report)
+            except requests.RequestException as exc:
+                logger.debug("Telemetry report failed: %s", exc)
+
+        self.telemetry_runner.submit(send, callback or (lambda result: None))
 
     def handle_login(self):
-        username = self.username_input.text()
+        username = self.username_input.text().strip()
         password = self.password_input.text()
-        
-        # TODO: Call backend API to verify credentials and reservation
-        # response = requests.post(f"{API_URL}/login", json={...})
-        
-        # Mock success for now
-        if username == "admin" and password == "admin":
-            self.unlock_system()
+        if not username or not password:
+            return
+
+        self.login_btn.setEnabled(False)
+        self.label.setText('Checking...')
+        self.runner.submit(lambda: self.gate.authorize(username, password), self._login_finished)
+
+    def _login_finished(self, decision):
+        self.login_btn.setEnabled(True)
+        self.label.setText('Please Login to Access Instrument')
+        self.password_input.clear()
+        if isinstance(decision, Exception):
+            QMessageBox.warning(self, 'Error', 'Login failed, please try again.')
+        elif decision.allowed:
+            self.unlock_system(decision)
         else:
-            QMessageBox.warning(self, 'Error', 'Invalid credentials or no reservation found.')
+            QMessageBox.warning(self, 'Error', decision.message)
 
-    def unlock_system(self):
+    def unlock_system(self, decision):
         """
-        Hide the lock screen and start the monitoring timer.
+        Hide the lock screen until the session ends.
         """
         self.hide()
-        print("System Unlocked")
-        # Start background monitoring service here
+        self.session_user = decision.user_id
+        self.report("session_start")
+        remaining_ms = max(int((decision.until - datetime.utcnow()).total_seconds() * 1000), 0)
+        self.session_timer.start(remaining_ms)
+        logger.info(
+            "System unlocked (%s%s) until %s UTC",
+            decision.message, ", offline" if decision.offline else "", f"{decision.until:%H:%M}",
+        )
+
+    def lock_system(self):
+        """
+        Show the lock screen again.
+        """
+        if self.session_user is not None:
+            self.report("session_end")
+            self.session_user = None
+        self.username_input.clear()
+        self.password_input.clear()
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        logger.info("System locked")
+
+    def closeEvent(self, event):
+        self.runner.shutdown()
+        self.telemetry_runner.shutdown()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
     app = QApplication(sys.argv)
     window = LoginWindow()
     window.show()
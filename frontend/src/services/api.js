@@ -110,6 +110,16 @@ export const getInstrumentById = async (instrumentId) => {
   }
 };
 
+// Busy intervals and free windows between params.from and params.to
+export const getInstrumentAvailability = async (instrumentId, params) => {
+  try {
+    const response = await apiClient.get(`/instruments/${instrumentId}/availability`, { params });
+    return response.data;
+  } catch (error) {
+    throw error;
+  }
+};
+
 // --- Reservation Service ---
 export const getReservationsByInstrument = async (instrumentId) => {
   try {